@@ -0,0 +1,53 @@
+"""
+Benchmark: sklearn IsolationForest scoring vs the compiled NumPy forest
+Run from the aegis directory: python -m benchmarks.anomaly_scoring
+"""
+
+import time
+
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from models.compiled_forest import CompiledForest
+
+
+def bench(score, X, repeat: int = 200) -> float:
+    """Median wall time per call, in microseconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        score(X)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1e6
+
+
+def main():
+    rng = np.random.default_rng(0)
+    X_train = rng.lognormal(size=(5000, 8))
+
+    scaler = StandardScaler().fit(X_train)
+    model = IsolationForest(contamination=0.1, n_estimators=100, random_state=42)
+    model.fit(scaler.transform(X_train))
+    compiled = CompiledForest.from_sklearn(model, scaler)
+
+    def sklearn_score(X):
+        return model.score_samples(scaler.transform(X))
+
+    X_test = rng.lognormal(size=(10000, 8))
+    diff = np.abs(sklearn_score(X_test) - compiled.score_samples(X_test)).max()
+    print(f"max |score difference| over {len(X_test)} rows: {diff:.2e}")
+
+    for n in (1, 100, 1000):
+        X = X_test[:n]
+        repeat = 200 if n < 1000 else 20
+        reference = bench(sklearn_score, X, repeat)
+        fast = bench(compiled.score_samples, X, repeat)
+        print(
+            f"{n:>5} rows: sklearn {reference:9.1f} us | "
+            f"compiled {fast:8.1f} us | speedup {reference / fast:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
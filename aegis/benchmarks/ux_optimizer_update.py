@@ -0,0 +1,76 @@
+"""
+Benchmark: UXOptimizer sequential vs batch update (and their equivalence)
+Run from the aegis directory: python -m benchmarks.ux_optimizer_update
+"""
+
+import copy
+import random
+import time
+
+import numpy as np
+
+from models.ux_optimizer import UXOptimizer
+
+
+def generate_events(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    event_types = ['page_view', 'click', 'scroll', 'navigation', 'form_submit', 'wallet_connect']
+    return [
+        {
+            'eventType': rng.choice(event_types),
+            'performance': {
+                'loadTime': rng.uniform(0, 5000),
+                'interactions': rng.randint(0, 30),
+                'errorRate': rng.random() * 0.2
+            },
+            'metadata': {'sessionDuration': rng.uniform(0, 900)}
+        }
+        for _ in range(n)
+    ]
+
+
+def bench(update, events, repeat: int = 5) -> float:
+    """Best wall time of several runs, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        update(events)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def equivalent(events) -> bool:
+    """
+    Both paths give the same Q-table, bit for bit, on the same table
+    Exploration is off and every state is learned, so no random draw is used
+    """
+    sequential, batch = UXOptimizer(), UXOptimizer()
+    sequential.epsilon = batch.epsilon = 0.0
+
+    sequential.extract_batch(events)  # Interns every state
+    rows = len(sequential.q_table)
+    sequential.q_table.values[:rows] = np.random.random((rows, len(sequential.actions)))
+    batch.q_table = copy.deepcopy(sequential.q_table)
+
+    sequential.update_sequential(events)
+    batch.update_batch(events)
+    return np.array_equal(sequential.q_table.values[:rows], batch.q_table.values[:rows], equal_nan=True)
+
+
+def main():
+    np.random.seed(0)
+
+    for n in (100, 1000, 10000):
+        events = generate_events(n)
+        sequential = bench(UXOptimizer().update_sequential, events)
+        batch = bench(UXOptimizer().update_batch, events)
+
+        print(
+            f"{n:>6} events: sequential {sequential:8.2f} ms | "
+            f"batch {batch:7.2f} ms | speedup {sequential / batch:5.1f}x | "
+            f"identical {equivalent(events)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
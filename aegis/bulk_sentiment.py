@@ -0,0 +1,126 @@
+"""
+BeZhas Aegis - Bulk Sentiment CLI
+Scores large corpora offline (feedback, chat exports) with the bulk sentiment job.
+Jobs share state with the API (/aegis/v1/jobs), so either side can resume them.
+
+Examples:
+    python bulk_sentiment.py --input feedback.jsonl --output out/feedback
+    python bulk_sentiment.py --collection feedback --sink mongo
+    python bulk_sentiment.py --resume bulk_sentiment_0123456789ab
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+
+from core.jobs import JobManager
+from core.bulk_sentiment import BulkSentimentJob
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("aegis.bulk_sentiment")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline bulk sentiment scoring")
+
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input', help="JSONL or plain-text file (one text per line)")
+    source.add_argument('--collection', help="Mongo collection to read texts from")
+    source.add_argument('--resume', metavar='JOB_ID', help="Resume an interrupted job")
+
+    parser.add_argument('--text-field', default='text', help="Field holding the text (JSONL/Mongo)")
+    parser.add_argument('--id-field', help="Field holding the record id (JSONL, default: line number)")
+    parser.add_argument('--query', default='{}', help="Mongo filter as JSON")
+    parser.add_argument('--sink', choices=['parquet', 'jsonl', 'mongo'], default='parquet')
+    parser.add_argument('--output', help="Output directory (parquet/jsonl) or collection (mongo)")
+    parser.add_argument('--field', default='sentiment', help="Result field for the mongo sink")
+    parser.add_argument('--chunk-size', type=int)
+    parser.add_argument('--workers', type=int)
+
+    return parser.parse_args()
+
+
+def build_params(args) -> dict:
+    if args.input:
+        source = {'type': 'file', 'path': args.input, 'text_field': args.text_field}
+        if args.id_field:
+            source['id_field'] = args.id_field
+    else:
+        source = {
+            'type': 'mongo',
+            'collection': args.collection,
+            'text_field': args.text_field,
+            'query': json.loads(args.query)
+        }
+
+    if args.sink == 'mongo':
+        if not args.output and args.input:
+            raise SystemExit("--output (collection) is required for the mongo sink when reading a file")
+        sink = {'type': 'mongo', 'collection': args.output, 'field': args.field}
+    else:
+        if not args.output:
+            raise SystemExit("--output is required for file sinks")
+        sink = {'type': args.sink, 'path': args.output}
+
+    params = {'source': source, 'sink': sink}
+    if args.chunk_size:
+        params['chunk_size'] = args.chunk_size
+    if args.workers:
+        params['workers'] = args.workers
+
+    return params
+
+
+async def run(args) -> int:
+    db_manager = None
+    needs_mongo = args.collection or args.sink == 'mongo'
+
+    job_manager = JobManager()
+    job_manager.load()
+
+    if args.resume:
+        job = job_manager.jobs.get(args.resume)
+        if job is None:
+            logger.error(f"❌ Job {args.resume} not found in {job_manager.jobs_dir}")
+            return 1
+        needs_mongo = 'mongo' in (job.params['source'].get('type'), job.params.get('sink', {}).get('type'))
+
+    if needs_mongo:
+        from utils.database import DatabaseManager
+        db_manager = DatabaseManager()
+        await db_manager.connect()
+
+    job_manager.register(
+        'bulk_sentiment',
+        lambda job: BulkSentimentJob(db_manager).run(job)
+    )
+
+    try:
+        if args.resume:
+            job = job_manager.resume(args.resume)
+        else:
+            job = job_manager.submit('bulk_sentiment', build_params(args))
+
+        logger.info(f"📋 Job id: {job.job_id}")
+        job = await job_manager.wait(job.job_id)
+
+    except (asyncio.CancelledError, KeyboardInterrupt):
+        await job_manager.stop()
+        logger.warning(f"🛑 Interrupted; resume with --resume {job.job_id}")
+        return 130
+
+    finally:
+        if db_manager:
+            await db_manager.disconnect()
+
+    print(json.dumps(job.to_dict(), indent=2, default=str))
+    return 0 if job.status == 'completed' else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run(parse_args())))
@@ -5,5 +5,9 @@ Core Package
 from .auto_healer import AutoHealer
 from .monitor import SystemMonitor
 from .decision_engine import DecisionEngine
+from .stream_worker import StreamWorker
+from .jobs import JobManager
+from .control_state import ControlStateStore
+from .suggestions import SuggestionStore
 
-__all__ = ['AutoHealer', 'SystemMonitor', 'DecisionEngine']
+__all__ = ['AutoHealer', 'SystemMonitor', 'DecisionEngine', 'StreamWorker', 'JobManager', 'ControlStateStore', 'SuggestionStore']
@@ -0,0 +1,294 @@
+"""
+Audit Log
+Append-only record of control-plane actions (admin requests and automated
+healing), written to MongoDB by group commit and chained by hash
+"""
+
+import logging
+from typing import Dict, Any, Optional, Tuple
+from collections import deque
+from datetime import datetime
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import socket
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+GENESIS = '0' * 64
+
+# Fields covered by a record's hash
+HASHED_FIELDS = ('chain', 'seq', 'ts', 'actor', 'action', 'target', 'details', 'client', 'prev_hash')
+
+
+def record_hash(record: Dict[str, Any]) -> str:
+    """SHA-256 of the record's canonical JSON (which includes the previous hash)"""
+    canonical = json.dumps(
+        {field: record.get(field) for field in HASHED_FIELDS},
+        sort_keys=True, separators=(',', ':'), default=str
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class AuditLog:
+    """
+    Records are appended in memory, with the next sequence number and hash
+    of this process's chain, and written in batches: when `batch_size`
+    records are waiting, or `flush_interval` seconds after the first one,
+    in a single insert. An admin click or a healing action therefore costs
+    no database round trip.
+
+    Critical actions (pause, mode changes, executed actions) wait for the
+    batch holding their record to be stored before they are acknowledged;
+    records arriving while a batch is being written are grouped into the
+    next one, so concurrent critical actions share commits.
+
+    Each process writes its own chain: every record carries the hash of the
+    previous one, so editing or deleting a stored record breaks the chain
+    from that point (see verify()).
+
+    Without MongoDB the last `max_pending` records are kept in memory only.
+    """
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self.batch_size = int(os.getenv('AEGIS_AUDIT_BATCH_SIZE', 100))
+        self.flush_interval = float(os.getenv('AEGIS_AUDIT_FLUSH_MS', 200)) / 1000
+        self.durable_timeout = float(os.getenv('AEGIS_AUDIT_DURABLE_TIMEOUT', 5))
+        self.max_pending = int(os.getenv('AEGIS_AUDIT_MAX_PENDING', 100000))
+
+        self.chain = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.seq = 0
+        self.last_hash = GENESIS
+
+        self.pending = deque()  # Records not yet stored, in sequence order
+        self.waiters = {}       # seq -> future resolved once the record is stored
+        self.wakeup = asyncio.Event()
+        self.lock = asyncio.Lock()
+
+        self.is_running = False
+        self.task = None
+
+        self.stats = {
+            'appended': 0,
+            'stored': 0,
+            'commits': 0,
+            'failed_commits': 0,
+            'dropped': 0
+        }
+
+    @property
+    def is_persistent(self) -> bool:
+        return self.db is not None and self.db.is_connected
+
+    def append(
+        self,
+        action: str,
+        actor: str = 'aegis',
+        target: Optional[str] = None,
+        details: Optional[Dict[str, Any]] = None,
+        client: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Add a record to this process's chain (stored by the next commit)"""
+        now = time.time()
+        self.seq += 1
+        record = {
+            'chain': self.chain,
+            'seq': self.seq,
+            'ts': int(now * 1000),
+            'at': datetime.utcfromtimestamp(now).isoformat(),
+            'actor': actor,
+            'action': action,
+            'target': target,
+            'details': details or {},
+            'client': client,
+            'prev_hash': self.last_hash
+        }
+        record['hash'] = record_hash(record)
+        self.last_hash = record['hash']
+
+        self.pending.append(record)
+        self.stats['appended'] += 1
+
+        if len(self.pending) > self.max_pending:
+            dropped = self.pending.popleft()
+            self.stats['dropped'] += 1
+            logger.error(f"❌ Audit record {dropped['chain']}#{dropped['seq']} dropped before being stored")
+
+        if len(self.pending) >= self.batch_size:
+            self.wakeup.set()
+        return record
+
+    async def record(
+        self,
+        action: str,
+        actor: str = 'aegis',
+        target: Optional[str] = None,
+        details: Optional[Dict[str, Any]] = None,
+        client: Optional[str] = None,
+        critical: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Append a record; critical records are stored before this returns
+        Returns a receipt (chain, seq, hash, durable)
+        """
+        record = self.append(action, actor, target, details, client)
+        durable = False
+
+        if critical and self.is_running and self.is_persistent:
+            future = asyncio.get_running_loop().create_future()
+            self.waiters[record['seq']] = future
+            self.wakeup.set()
+            try:
+                durable = await asyncio.wait_for(asyncio.shield(future), timeout=self.durable_timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"❌ Audit record {record['seq']} not stored within {self.durable_timeout}s")
+            finally:
+                self.waiters.pop(record['seq'], None)
+
+        return {'chain': record['chain'], 'seq': record['seq'], 'hash': record['hash'], 'durable': durable}
+
+    async def flush(self) -> bool:
+        """Store every pending record in one write"""
+        async with self.lock:
+            if not self.pending or not self.is_persistent:
+                return not self.pending
+
+            batch = list(self.pending)
+            if not await self.db.store_audit_records(batch):
+                self.stats['failed_commits'] += 1
+                return False
+
+            # Records appended during the write stay pending
+            last_seq = batch[-1]['seq']
+            while self.pending and self.pending[0]['seq'] <= last_seq:
+                self.pending.popleft()
+            self.stats['stored'] += len(batch)
+            self.stats['commits'] += 1
+
+            for seq in [seq for seq in self.waiters if seq <= last_seq]:
+                future = self.waiters.pop(seq)
+                if not future.done():
+                    future.set_result(True)
+            return True
+
+    async def start(self):
+        if self.is_running:
+            return
+        self.is_running = True
+        self.task = asyncio.create_task(self.run())
+        logger.info(f"✅ Audit log ready (chain {self.chain})")
+
+    async def stop(self):
+        self.is_running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+
+    async def run(self):
+        """Commit loop: on a full batch, a critical record, or every flush_interval"""
+        while self.is_running:
+            try:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+
+                if not await self.flush():
+                    await asyncio.sleep(self.flush_interval)  # Back off before retrying
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Audit commit failed: {str(e)}")
+
+    @staticmethod
+    def encode_cursor(record: Dict[str, Any]) -> str:
+        key = [record['ts'], record['chain'], record['seq']]
+        return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[int, str, int]:
+        try:
+            ts, chain, seq = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return (int(ts), str(chain), int(seq))
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+    async def page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        action: Optional[str] = None,
+        actor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Records newest first; pass next_cursor back for the following page"""
+        before = self.decode_cursor(cursor) if cursor else None
+
+        if self.is_persistent:
+            # Records of this process not yet committed are included
+            await self.flush()
+            records = await self.db.get_audit_records(action, actor, before, limit + 1)
+        else:
+            records = [
+                record for record in reversed(self.pending)
+                if (not action or record['action'] == action)
+                and (not actor or record['actor'] == actor)
+                and (before is None or (record['ts'], record['chain'], record['seq']) < before)
+            ][:limit + 1]
+
+        has_more = len(records) > limit
+        records = records[:limit]
+        return {
+            'records': records,
+            'next_cursor': self.encode_cursor(records[-1]) if has_more else None
+        }
+
+    async def verify(self, chain: Optional[str] = None) -> Dict[str, Any]:
+        """Check the sequence and hash links of a stored chain (this process's by default)"""
+        chain = chain or self.chain
+        if chain == self.chain:
+            await self.flush()
+
+        checked, prev_hash, last_seq = 0, GENESIS, 0
+        while True:
+            records = await self.db.get_audit_chain(chain, last_seq) if self.is_persistent else []
+            if not records:
+                break
+
+            for record in records:
+                problem = None
+                if record['seq'] != last_seq + 1:
+                    problem = f"missing records after seq {last_seq}"
+                elif record['prev_hash'] != prev_hash:
+                    problem = "previous hash does not match"
+                elif record_hash(record) != record['hash']:
+                    problem = "record content does not match its hash"
+
+                if problem:
+                    return {'chain': chain, 'valid': False, 'checked': checked, 'seq': record['seq'], 'problem': problem}
+
+                checked += 1
+                prev_hash, last_seq = record['hash'], record['seq']
+
+        return {'chain': chain, 'valid': True, 'checked': checked, 'last_seq': last_seq}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get audit log statistics"""
+        return {
+            **self.stats,
+            'chain': self.chain,
+            'seq': self.seq,
+            'pending': len(self.pending),
+            'persistent': self.is_persistent
+        }
@@ -16,22 +16,46 @@ class AutoHealer:
     Automated healing system for common issues
     """
     
-    def __init__(self, db_manager, redis_manager):
+    def __init__(self, db_manager, redis_manager, control_state=None, events=None, audit=None):
         self.db = db_manager
         self.redis = redis_manager
+        self.control_state = control_state  # Pause/mode (ControlStateStore)
+        self.events = events  # Live dashboard events (EventBroadcaster)
+        self.audit = audit  # Audit log of executed actions (AuditLog)
         self.healing_actions = {}
         self.stats = {
             'total_healings': 0,
             'successful_healings': 0,
             'failed_healings': 0,
+            'skipped_healings': 0,
             'by_action_type': {}
         }
     
-    async def handle_anomaly(self, anomaly_type: str, context: Dict[str, Any]):
+    def healing_allowed(self, anomaly_type: str, approved: bool = False) -> bool:
+        """
+        Automatic actions run only in autonomous mode and while not paused
+        Actions approved by an administrator run in any mode, but not while paused
+        """
+        if self.control_state is None:
+            return True
+        
+        state = self.control_state.state
+        if state.paused or (state.mode != 'autonomous' and not approved):
+            reason = 'system paused' if state.paused else f"{state.mode} mode"
+            logger.info(f"⏸️  Not healing {anomaly_type}: {reason}")
+            self.stats['skipped_healings'] += 1
+            return False
+        return True
+    
+    async def handle_anomaly(self, anomaly_type: str, context: Dict[str, Any], approved: bool = False) -> bool:
         """
         Handle detected anomaly with appropriate healing action
+        Returns whether a healing action ran successfully
         """
         try:
+            if not self.healing_allowed(anomaly_type, approved):
+                return False
+            
             logger.info(f"🔧 Handling anomaly: {anomaly_type}")
             
             action = self.get_healing_action(anomaly_type)
@@ -52,9 +76,25 @@ class AutoHealer:
             
             # Log healing attempt
             await self.log_healing_attempt(anomaly_type, action, success if action else False)
+            if self.audit and action:
+                self.audit.append(
+                    'healing.executed',
+                    actor='admin' if approved else 'aegis',
+                    target=action,
+                    details={'anomaly_type': anomaly_type, 'success': success, 'approved': approved}
+                )
+            if self.events and action:
+                self.events.publish('healing', {
+                    'anomaly_type': anomaly_type,
+                    'action': action,
+                    'success': success,
+                    'approved': approved
+                })
+            return success if action else False
             
         except Exception as e:
             logger.error(f"❌ Failed to handle anomaly: {str(e)}")
+            return False
     
     def get_healing_action(self, anomaly_type: str) -> str:
         """
@@ -284,6 +324,7 @@ class AutoHealer:
             'total_healings': self.stats['total_healings'],
             'successful_healings': self.stats['successful_healings'],
             'failed_healings': self.stats['failed_healings'],
+            'skipped_healings': self.stats['skipped_healings'],
             'success_rate': success_rate,
             'by_action_type': self.stats['by_action_type']
         }
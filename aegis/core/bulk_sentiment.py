@@ -0,0 +1,408 @@
+"""
+Bulk Sentiment Job
+Offline sentiment scoring for large corpora (feedback, chat exports)
+Streams texts from a file or a Mongo collection, scores chunks across a
+process pool and writes results incrementally to Parquet, JSONL or Mongo
+"""
+
+import logging
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from pathlib import Path
+import multiprocessing
+import asyncio
+import json
+import os
+
+from models.batch_sentiment import BatchSentimentScorer
+
+logger = logging.getLogger(__name__)
+
+RESULT_FIELDS = (
+    'sentiment', 'score', 'confidence',
+    'positive_words', 'negative_words', 'error_words'
+)
+
+# Scorer of each pool process (built once by the pool initializer)
+_scorer = None
+
+
+def init_scorer(positive_words: List[str], negative_words: List[str], error_keywords: List[str]):
+    """Process pool initializer: build the vectorized scorer once per process"""
+    global _scorer
+    _scorer = BatchSentimentScorer(positive_words, negative_words, error_keywords)
+
+
+def score_chunk(texts: List[str]) -> Dict[str, Any]:
+    """Score one chunk in a pool process"""
+    columns = _scorer.score(texts)
+    return {field: columns[field] for field in RESULT_FIELDS}
+
+
+# ========================================
+# SOURCES
+# ========================================
+
+class FileSource:
+    """
+    JSONL (one object per line) or plain-text (one text per line) file
+    Resumes from the byte offset after the last committed chunk
+    """
+
+    def __init__(self, path: str, text_field: str = 'text', id_field: Optional[str] = None):
+        self.path = Path(path)
+        self.text_field = text_field
+        self.id_field = id_field
+        self.is_jsonl = self.path.suffix in ('.jsonl', '.ndjson')
+
+    async def count(self) -> Optional[int]:
+        return None
+
+    def progress(self, checkpoint: Dict[str, Any]) -> Dict[str, Any]:
+        """Byte progress (files are not counted up front)"""
+        return {'bytes_read': checkpoint.get('offset', 0), 'bytes_total': self.path.stat().st_size}
+
+    def read_chunk(self, f, index: int, size: int) -> Tuple[List[Any], List[str]]:
+        """Read up to size records; ids default to the record index in the file"""
+        ids = []
+        texts = []
+
+        while len(texts) < size:
+            line = f.readline()
+            if not line:
+                break
+
+            line = line.decode('utf-8', 'replace').rstrip('\r\n')
+            if self.is_jsonl:
+                if not line.strip():
+                    continue
+                doc = json.loads(line)
+                text = doc.get(self.text_field) or ''
+                record_id = doc.get(self.id_field, index) if self.id_field else index
+            else:
+                text = line
+                record_id = index
+
+            ids.append(record_id)
+            texts.append(str(text))
+            index += 1
+
+        return ids, texts
+
+    async def chunks(self, checkpoint: Dict[str, Any], size: int) -> AsyncIterator[Tuple[List[Any], List[str], Dict[str, Any]]]:
+        """Yield (ids, texts, checkpoint after the chunk)"""
+        index = checkpoint.get('index', 0)
+
+        with open(self.path, 'rb') as f:
+            f.seek(checkpoint.get('offset', 0))
+
+            while True:
+                ids, texts = await asyncio.to_thread(self.read_chunk, f, index, size)
+                if not texts:
+                    break
+
+                index += len(texts)
+                yield ids, texts, {'offset': f.tell(), 'index': index}
+
+
+class MongoSource:
+    """
+    Documents of a Mongo collection, read in _id order
+    Resumes after the last committed _id
+    """
+
+    def __init__(self, db, collection: str, text_field: str = 'text', query: Optional[Dict[str, Any]] = None):
+        self.collection = db[collection]
+        self.text_field = text_field
+        self.query = query or {}
+
+    async def count(self) -> Optional[int]:
+        return await self.collection.count_documents(self.query)
+
+    def progress(self, checkpoint: Dict[str, Any]) -> Dict[str, Any]:
+        return {}
+
+    async def chunks(self, checkpoint: Dict[str, Any], size: int) -> AsyncIterator[Tuple[List[Any], List[str], Dict[str, Any]]]:
+        """Yield (ids, texts, checkpoint after the chunk)"""
+        from bson import json_util
+
+        query = dict(self.query)
+        if checkpoint.get('last_id'):
+            query['_id'] = {'$gt': json_util.loads(checkpoint['last_id'])}
+
+        cursor = self.collection.find(
+            query, {self.text_field: 1}
+        ).sort('_id', 1).batch_size(size)
+
+        ids = []
+        texts = []
+        async for doc in cursor:
+            ids.append(doc['_id'])
+            texts.append(str(doc.get(self.text_field) or ''))
+
+            if len(texts) >= size:
+                yield ids, texts, {'last_id': json_util.dumps(ids[-1])}
+                ids = []
+                texts = []
+
+        if texts:
+            yield ids, texts, {'last_id': json_util.dumps(ids[-1])}
+
+
+# ========================================
+# SINKS
+# ========================================
+
+class PartFileSink:
+    """
+    Directory of part files, one per chunk (part-00000.parquet, ...)
+    Parts are written to a temp file and renamed, so a rerun chunk
+    overwrites its part instead of duplicating rows
+    """
+
+    def __init__(self, path: str, file_format: str = 'parquet'):
+        self.path = Path(path)
+        self.format = file_format
+
+        if file_format == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+
+    async def write(self, chunk: int, ids: List[Any], columns: Dict[str, Any]):
+        await asyncio.to_thread(self.write_part, chunk, ids, columns)
+
+    def write_part(self, chunk: int, ids: List[Any], columns: Dict[str, Any]):
+        self.path.mkdir(parents=True, exist_ok=True)
+        part = self.path / f"part-{chunk:05d}.{self.format}"
+        tmp_part = self.path / f".part-{chunk:05d}.{self.format}.tmp"
+
+        ids = [record_id if isinstance(record_id, int) else str(record_id) for record_id in ids]
+
+        if self.format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.table({'id': ids, **{field: columns[field] for field in RESULT_FIELDS}})
+            pq.write_table(table, tmp_part)
+        else:
+            lists = {field: columns[field].tolist() for field in RESULT_FIELDS}
+            with open(tmp_part, 'w', encoding='utf-8') as f:
+                for i, record_id in enumerate(ids):
+                    row = {'id': record_id, **{field: lists[field][i] for field in RESULT_FIELDS}}
+                    f.write(json.dumps(row) + '\n')
+
+        os.replace(tmp_part, part)
+
+
+class MongoSink:
+    """
+    Upserts results into a collection under one field, keyed by _id
+    (idempotent, so rerunning a chunk after a crash is safe)
+    """
+
+    def __init__(self, db, collection: str, field: str = 'sentiment'):
+        self.collection = db[collection]
+        self.field = field
+
+    async def write(self, chunk: int, ids: List[Any], columns: Dict[str, Any]):
+        from pymongo import UpdateOne
+
+        lists = {field: columns[field].tolist() for field in RESULT_FIELDS}
+        await self.collection.bulk_write([
+            UpdateOne(
+                {'_id': record_id},
+                {'$set': {self.field: {field: lists[field][i] for field in RESULT_FIELDS}}},
+                upsert=True
+            )
+            for i, record_id in enumerate(ids)
+        ], ordered=False)
+
+
+# ========================================
+# JOB
+# ========================================
+
+def confine(path: str, base_dir: str) -> str:
+    """Resolve a path under base_dir; ValueError if it points outside it"""
+    base = Path(base_dir).resolve()
+    resolved = (base / path).resolve()
+    if resolved != base and base not in resolved.parents:
+        raise ValueError(f"Path {path} is outside the bulk data directory")
+    return str(resolved)
+
+
+def validate_params(params: Dict[str, Any], base_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Check bulk job params before the job starts (ValueError with the problem)
+    With base_dir, file paths are resolved under it and may not leave it
+    (jobs submitted through the API); returns the params with resolved paths
+    """
+    source = dict(params.get('source') or {})
+    sink = dict(params.get('sink') or {})
+
+    source_type = source.get('type', 'file')
+    if source_type == 'file':
+        if not source.get('path'):
+            raise ValueError("File source requires a path")
+        if base_dir is not None:
+            source['path'] = confine(source['path'], base_dir)
+    elif source_type == 'mongo':
+        if not source.get('collection'):
+            raise ValueError("Mongo source requires a collection")
+    else:
+        raise ValueError(f"Unknown source type: {source_type}")
+
+    sink_type = sink.get('type', 'parquet')
+    if sink_type in ('parquet', 'jsonl'):
+        if not sink.get('path'):
+            raise ValueError(f"{sink_type} sink requires a path")
+        if base_dir is not None:
+            sink['path'] = confine(sink['path'], base_dir)
+    elif sink_type == 'mongo':
+        if not sink.get('collection') and source_type != 'mongo':
+            raise ValueError("Mongo sink requires a collection when the source is a file")
+    else:
+        raise ValueError(f"Unknown sink type: {sink_type}")
+
+    return {**params, 'source': source, 'sink': sink}
+
+
+class BulkSentimentJob:
+    """
+    Bulk sentiment scoring job (runner for JobManager)
+
+    Params:
+        source: {"type": "file", "path", "text_field", "id_field"}
+              | {"type": "mongo", "collection", "text_field", "query"}
+        sink:   {"type": "parquet" | "jsonl", "path"}
+              | {"type": "mongo", "collection", "field"}
+        chunk_size, workers (optional)
+
+    Chunks are scored in parallel but committed in order: the checkpoint
+    only moves past a chunk once its results are written.
+    """
+
+    def __init__(self, db_manager=None, sentiment_analyzer=None):
+        self.db_manager = db_manager
+
+        if sentiment_analyzer is None:
+            from models.sentiment_analyzer import SentimentAnalyzer
+            sentiment_analyzer = SentimentAnalyzer()
+
+        # Lexicons are copied into each pool process once
+        self.lexicons = (
+            sorted(sentiment_analyzer.positive_words),
+            sorted(sentiment_analyzer.negative_words),
+            sorted(sentiment_analyzer.error_keywords)
+        )
+
+        self.chunk_size = int(os.getenv('AEGIS_BULK_CHUNK_SIZE', 5000))
+        self.workers = int(os.getenv('AEGIS_BULK_WORKERS', os.cpu_count() or 1))
+        self.log_every = int(os.getenv('AEGIS_BULK_LOG_EVERY', 20))  # chunks
+
+    def get_db(self):
+        if self.db_manager is None or not self.db_manager.is_connected:
+            raise RuntimeError("MongoDB is not connected")
+        return self.db_manager.db
+
+    def build_source(self, config: Dict[str, Any]):
+        source_type = config.get('type', 'file')
+
+        if source_type == 'file':
+            return FileSource(config['path'], config.get('text_field', 'text'), config.get('id_field'))
+        if source_type == 'mongo':
+            return MongoSource(
+                self.get_db(), config['collection'],
+                config.get('text_field', 'text'), config.get('query')
+            )
+        raise ValueError(f"Unknown source type: {source_type}")
+
+    def build_sink(self, config: Dict[str, Any], source_config: Dict[str, Any]):
+        sink_type = config.get('type', 'parquet')
+
+        if sink_type in ('parquet', 'jsonl'):
+            return PartFileSink(config['path'], sink_type)
+        if sink_type == 'mongo':
+            return MongoSink(
+                self.get_db(),
+                config.get('collection') or source_config['collection'],
+                config.get('field', 'sentiment')
+            )
+        raise ValueError(f"Unknown sink type: {sink_type}")
+
+    async def run(self, job) -> Dict[str, Any]:
+        """Score the whole source, resuming from job.checkpoint"""
+        params = validate_params(job.params)
+        source = self.build_source(params['source'])
+        sink = self.build_sink(params.get('sink', {}), params['source'])
+        chunk_size = int(params.get('chunk_size', self.chunk_size))
+        workers = max(1, int(params.get('workers', self.workers)))
+
+        checkpoint = dict(job.checkpoint)
+        chunk_index = checkpoint.get('chunks', 0)
+        processed = job.progress['processed'] if checkpoint else 0
+        distribution = dict(checkpoint.get('distribution', {}))
+
+        total = await source.count()
+        job.update(progress={'processed': processed, 'total': total})
+
+        logger.info(
+            f"📊 Bulk sentiment job {job.job_id}: {workers} workers, chunks of {chunk_size}"
+            + (f", resuming after {processed} texts" if processed else "")
+        )
+
+        # Spawned processes do not inherit the event loop or open connections
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_scorer,
+            initargs=self.lexicons
+        )
+        loop = asyncio.get_running_loop()
+        pending = deque()
+
+        async def commit():
+            nonlocal chunk_index, processed
+            ids, next_checkpoint, future = pending.popleft()
+            columns = await future
+
+            await sink.write(chunk_index, ids, columns)
+
+            chunk_index += 1
+            processed += len(ids)
+            for sentiment in ('positive', 'negative', 'neutral'):
+                count = int((columns['sentiment'] == sentiment).sum())
+                distribution[sentiment] = distribution.get(sentiment, 0) + count
+
+            job.update(
+                progress={'processed': processed, **source.progress(next_checkpoint)},
+                checkpoint={**next_checkpoint, 'chunks': chunk_index, 'distribution': distribution}
+            )
+            if chunk_index % self.log_every == 0:
+                logger.info(f"📊 Bulk sentiment job {job.job_id}: {processed} texts scored")
+
+        try:
+            async for ids, texts, next_checkpoint in source.chunks(checkpoint, chunk_size):
+                future = loop.run_in_executor(pool, score_chunk, texts)
+                pending.append((ids, next_checkpoint, future))
+
+                # Bound in-flight chunks so reading never runs far ahead of writing
+                if len(pending) >= workers * 2:
+                    await commit()
+
+            while pending:
+                await commit()
+
+        finally:
+            for _, _, future in pending:
+                future.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        return {
+            'processed': processed,
+            'chunks': chunk_index,
+            'distribution': distribution
+        }
@@ -0,0 +1,232 @@
+"""
+Control State Store
+Versioned control-plane settings (mode, pause, telemetry, anomaly threshold
+and live model)
+shared by every API process and stream worker through Redis
+"""
+
+import logging
+from typing import Dict, Any, NamedTuple, Optional, Callable
+from datetime import datetime
+import asyncio
+import json
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Fields of ControlState that update() may change
+SETTINGS = (
+    'mode', 'paused', 'telemetry_enabled', 'telemetry_samplerate',
+    'anomaly_threshold', 'anomaly_model', 'anomaly_segments', 'shadow_candidates',
+    'ux_model'
+)
+
+
+class ControlState(NamedTuple):
+    """Immutable snapshot of the control settings"""
+    version: int = 0
+    mode: str = 'autonomous'  # autonomous | suggest
+    paused: bool = False
+    telemetry_enabled: bool = True
+    telemetry_samplerate: float = 1.0
+    anomaly_threshold: float = 0.8  # Alert cutoff on the 0-1 anomaly score
+    anomaly_model: Optional[str] = None  # Checkpoint generation of the live anomaly model (gen-NNNNNN)
+    anomaly_segments: Optional[str] = None  # When the per-segment anomaly models were last retrained
+    shadow_candidates: Optional[str] = None  # When a shadow candidate was last added or removed
+    ux_model: Optional[str] = None  # Checkpoint generation of the UX optimizer last written by a stream worker
+    updated_at: Optional[str] = None
+
+
+class ControlStateStore:
+    """
+    Control settings persisted in Redis, cached in every process
+
+    Readers use `store.state`, a local immutable snapshot, so the ingestion
+    and decision paths check pause/mode/sample rate with an attribute read
+    and no I/O. Updates are read-modify-write transactions on the Redis key
+    (optimistic, WATCH/MULTI) that bump the version and publish the new
+    state; every process applies published states with a higher version
+    than its own, and re-reads the key every resync_interval seconds in
+    case a message was missed (e.g. across a Redis reconnect).
+    Listeners registered with subscribe() are told about every applied
+    change, e.g. to reload a model another process published.
+
+    Without Redis the store is local to the process.
+    """
+
+    def __init__(self, redis_manager=None):
+        self.redis = redis_manager
+        self.prefix = os.getenv('AEGIS_CONTROL_PREFIX', 'aegis:control')
+        self.key = f"{self.prefix}:state"
+        self.channel = f"{self.prefix}:updates"
+        self.resync_interval = float(os.getenv('AEGIS_CONTROL_RESYNC_SECONDS', 30))
+
+        self.state = ControlState(
+            mode=os.getenv('AEGIS_MODE', 'autonomous'),
+            anomaly_threshold=float(os.getenv('AEGIS_ANOMALY_THRESHOLD', 0.8))
+        )
+        self.listeners = []  # listener(state, changed settings)
+        self.is_running = False
+        self.task = None
+
+        self.stats = {
+            'updates': 0,
+            'applied': 0,
+            'resyncs': 0,
+            'conflicts': 0
+        }
+
+    @property
+    def is_shared(self) -> bool:
+        return self.redis is not None and self.redis.is_connected
+
+    @staticmethod
+    def encode(state: ControlState) -> str:
+        return json.dumps(state._asdict())
+
+    @staticmethod
+    def decode(raw: Optional[str]) -> Optional[ControlState]:
+        if not raw:
+            return None
+        data = json.loads(raw)
+        return ControlState(**{field: data[field] for field in ControlState._fields if field in data})
+
+    def apply(self, state: Optional[ControlState]) -> bool:
+        """Adopt a state if it is newer than the local snapshot"""
+        if state is None or state.version <= self.state.version:
+            return False
+
+        changed = {
+            field: value for field, value in state._asdict().items()
+            if field in SETTINGS and getattr(self.state, field) != value
+        }
+        self.state = state
+        self.stats['applied'] += 1
+        if changed:
+            logger.info(f"🔧 Control state v{state.version}: {changed}")
+            for listener in self.listeners:
+                try:
+                    listener(state, changed)
+                except Exception as e:
+                    logger.error(f"❌ Control state listener failed: {str(e)}")
+        return True
+
+    def subscribe(self, listener: Callable[[ControlState, Dict[str, Any]], None]):
+        """Call listener(state, changed) on the event loop whenever settings change"""
+        self.listeners.append(listener)
+
+    async def sync(self):
+        """Read the shared state"""
+        if not self.is_shared:
+            return
+        try:
+            self.apply(self.decode(await self.redis.client.get(self.key)))
+            self.stats['resyncs'] += 1
+        except Exception as e:
+            logger.error(f"❌ Failed to read control state: {str(e)}")
+
+    async def start(self):
+        """Load the shared state and follow updates"""
+        if self.is_running:
+            return
+
+        self.is_running = True
+        if not self.is_shared:
+            logger.warning("⚠️  Redis unavailable, control state is local to this process")
+            return
+
+        await self.sync()
+        self.task = asyncio.create_task(self.listen())
+        logger.info(f"✅ Control state v{self.state.version} loaded (mode={self.state.mode}, paused={self.state.paused})")
+
+    async def stop(self):
+        self.is_running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def listen(self):
+        """Apply published states; resync periodically and after errors"""
+        while self.is_running:
+            pubsub = self.redis.client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # Updates published before the subscription are picked up here
+                await self.sync()
+                last_sync = time.monotonic()
+
+                while self.is_running:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message:
+                        self.apply(self.decode(message['data']))
+
+                    if time.monotonic() - last_sync >= self.resync_interval:
+                        await self.sync()
+                        last_sync = time.monotonic()
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Control state subscription failed: {str(e)}")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def update(self, **changes) -> ControlState:
+        """Change settings everywhere; returns the new state"""
+        unknown = set(changes) - set(SETTINGS)
+        if unknown:
+            raise ValueError(f"Unknown control settings: {sorted(unknown)}")
+
+        if not self.is_shared:
+            state = self.state._replace(
+                version=self.state.version + 1, updated_at=datetime.utcnow().isoformat(), **changes
+            )
+            self.apply(state)
+            self.stats['updates'] += 1
+            return state
+
+        from redis.exceptions import WatchError
+
+        async with self.redis.client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(self.key)
+                    current = self.decode(await pipe.get(self.key))
+                    if current is None or current.version < self.state.version:
+                        current = self.state
+
+                    state = current._replace(
+                        version=current.version + 1, updated_at=datetime.utcnow().isoformat(), **changes
+                    )
+                    raw = self.encode(state)
+
+                    pipe.multi()
+                    pipe.set(self.key, raw)
+                    pipe.publish(self.channel, raw)
+                    await pipe.execute()
+                    break
+
+                except WatchError:
+                    # Another process updated the state meanwhile; retry on top of it
+                    self.stats['conflicts'] += 1
+
+        self.apply(state)
+        self.stats['updates'] += 1
+        return state
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get control state statistics"""
+        return {
+            **self.stats,
+            'version': self.state.version,
+            'shared': self.is_shared
+        }
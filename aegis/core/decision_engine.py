@@ -16,14 +16,17 @@ class DecisionEngine:
     Combines ML models with business rules
     """
     
-    def __init__(self, ml_models: Dict[str, Any], auto_healer):
+    def __init__(self, ml_models: Dict[str, Any], auto_healer, control_state=None, suggestions=None, events=None):
         self.ml_models = ml_models
         self.auto_healer = auto_healer
+        self.control_state = control_state  # Pause/mode (ControlStateStore)
+        self.suggestions = suggestions  # Suggest mode queue (SuggestionStore)
+        self.events = events  # Live dashboard events (EventBroadcaster)
         self.decision_history = []
         
-        # Decision thresholds
+        # Decision thresholds (the anomaly cutoff is the anomaly_threshold
+        # control setting, so a change applies in every process at once)
         self.thresholds = {
-            'anomaly_score': 0.8,  # Trigger healing if anomaly > 0.8
             'sentiment_negative': -0.5,  # Alert if sentiment < -0.5
             'ux_confidence': 0.7  # Apply UX change if confidence > 0.7
         }
@@ -33,7 +36,8 @@ class DecisionEngine:
             'decisions_made': 0,
             'healings_triggered': 0,
             'ux_optimizations': 0,
-            'alerts_sent': 0
+            'alerts_sent': 0,
+            'suggestions': 0
         }
     
     async def handle_anomaly(self, event: Dict[str, Any], anomaly_score: float):
@@ -42,10 +46,15 @@ class DecisionEngine:
         Decide whether to trigger healing
         """
         try:
+            state = self.control_state.state if self.control_state else None
+            if state and state.paused:
+                logger.debug("Aegis paused, anomaly not evaluated")
+                return
+            
             logger.info(f"🤔 Evaluating anomaly: score={anomaly_score}")
             
             # Check if score exceeds threshold
-            if anomaly_score < self.thresholds['anomaly_score']:
+            if anomaly_score < self.anomaly_threshold():
                 logger.debug("Anomaly score below threshold, no action needed")
                 return
             
@@ -54,8 +63,25 @@ class DecisionEngine:
             
             # Check if we should trigger healing
             should_heal = await self.should_trigger_healing(anomaly_type, event)
+            suggested = should_heal and state is not None and state.mode == 'suggest'
             
-            if should_heal:
+            if suggested:
+                # Suggest mode: healing waits for an administrator's approval
+                logger.info(f"💡 Suggesting healing for: {anomaly_type}")
+                self.stats['suggestions'] += 1
+                should_heal = False
+                
+                action = self.auto_healer.get_healing_action(anomaly_type)
+                if action and self.suggestions is not None:
+                    await self.suggestions.add(
+                        action=action,
+                        anomaly_type=anomaly_type,
+                        target=event.get('eventType', 'unknown'),
+                        reason=f"{anomaly_type} detected (score {anomaly_score:.2f})",
+                        confidence=anomaly_score,
+                        context=event
+                    )
+            elif should_heal:
                 logger.warning(f"🚨 Triggering healing for: {anomaly_type}")
                 await self.auto_healer.handle_anomaly(anomaly_type, event)
                 self.stats['healings_triggered'] += 1
@@ -68,14 +94,31 @@ class DecisionEngine:
                 'anomaly_type': anomaly_type,
                 'score': anomaly_score,
                 'healing_triggered': should_heal,
+                'suggested': suggested,
                 'timestamp': datetime.now().isoformat()
             })
+            if self.events:
+                self.events.publish('anomaly', {
+                    'anomaly_type': anomaly_type,
+                    'score': anomaly_score,
+                    'healing_triggered': should_heal,
+                    'suggested': suggested,
+                    'eventType': event.get('eventType'),
+                    'eventName': event.get('eventName'),
+                    'sessionId': event.get('sessionId')
+                })
             
             self.stats['decisions_made'] += 1
             
         except Exception as e:
             logger.error(f"❌ Failed to handle anomaly: {str(e)}")
     
+    def anomaly_threshold(self) -> float:
+        """Current anomaly score cutoff"""
+        if self.control_state is not None:
+            return self.control_state.state.anomaly_threshold
+        return getattr(self.ml_models.get('anomaly'), 'threshold', 0.8)
+    
     def classify_anomaly(self, event: Dict[str, Any], score: float) -> str:
         """
         Classify type of anomaly based on event data
@@ -155,8 +198,12 @@ class DecisionEngine:
             confidence = recommendation.get('confidence', 0)
             action = recommendation.get('action')
             
+            state = self.control_state.state if self.control_state else None
+            
             # Check if confidence is high enough
-            if confidence > self.thresholds['ux_confidence']:
+            if state and (state.paused or state.mode != 'autonomous'):
+                logger.debug(f"UX optimization {action} not applied ({'paused' if state.paused else state.mode})")
+            elif confidence > self.thresholds['ux_confidence']:
                 logger.info(f"✨ Applying UX optimization: {action} (confidence={confidence})")
                 
                 # Apply optimization (in production, would update UI config)
@@ -205,12 +252,12 @@ class DecisionEngine:
             
             messages = [log.get('message', '') for log in recent_logs]
             
-            # Analyze batch
-            sentiments = await self.ml_models['sentiment'].analyze_batch(messages)
+            # Analyze batch (vectorized, columnar result)
+            sentiments = self.ml_models['sentiment'].score_batch(messages)
             
             # Calculate average sentiment
-            scores = [s['score'] for s in sentiments]
-            avg_sentiment = sum(scores) / len(scores) if scores else 0
+            scores = sentiments['score']
+            avg_sentiment = float(scores.mean()) if len(scores) else 0
             
             # Check if concerning
             if avg_sentiment < self.thresholds['sentiment_negative']:
@@ -223,7 +270,7 @@ class DecisionEngine:
         except Exception as e:
             logger.error(f"❌ Failed to analyze sentiment trend: {str(e)}")
     
-    async def send_sentiment_alert(self, avg_sentiment: float, details: List[Dict[str, Any]]):
+    async def send_sentiment_alert(self, avg_sentiment: float, details: Dict[str, Any]):
         """
         Send alert about negative sentiment
         """
@@ -249,6 +296,7 @@ class DecisionEngine:
             'healings_triggered': self.stats['healings_triggered'],
             'ux_optimizations': self.stats['ux_optimizations'],
             'alerts_sent': self.stats['alerts_sent'],
+            'suggestions': self.stats['suggestions'],
             'recent_decisions': len(self.decision_history),
-            'thresholds': self.thresholds
+            'thresholds': {'anomaly_score': self.anomaly_threshold(), **self.thresholds}
         }
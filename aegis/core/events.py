@@ -0,0 +1,281 @@
+"""
+Event Broadcaster
+Live events (anomalies, healing outcomes, suggestions, metric deltas,
+status changes) pushed to dashboard clients over Server-Sent Events
+"""
+
+import logging
+from typing import Dict, Any, Optional, Set, AsyncIterator
+from collections import OrderedDict, deque
+from datetime import datetime
+import asyncio
+import itertools
+import json
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Event kinds clients can subscribe to
+KINDS = ('anomaly', 'healing', 'suggestion', 'metrics', 'status')
+
+# Kinds whose pending updates are merged field by field (latest value wins)
+MERGED_KINDS = ('metrics',)
+
+# Kinds whose latest event is sent to clients when they connect
+STATE_KINDS = ('metrics', 'status')
+
+
+class Event:
+    """A published event; its SSE frame is encoded once, for all clients"""
+
+    __slots__ = ('seq', 'kind', 'key', 'data', '_frame')
+
+    def __init__(self, seq: int, kind: str, data: Dict[str, Any], key: Optional[str] = None):
+        self.seq = seq
+        self.kind = kind
+        self.key = key  # Pending events with the same key are coalesced
+        self.data = data
+        self._frame = None
+
+    @property
+    def frame(self) -> bytes:
+        if self._frame is None:
+            payload = json.dumps({'kind': self.kind, **self.data}, default=str)
+            self._frame = f"id: {self.seq}\nevent: {self.kind}\ndata: {payload}\n\n".encode('utf-8')
+        return self._frame
+
+
+class Subscriber:
+    """
+    One connected client: its filters and a bounded queue of pending events
+
+    Events with a key (a suggestion id, 'metrics', 'status') replace the
+    pending event with the same key, so a client that falls behind gets the
+    latest state of each rather than every intermediate update. When the
+    queue is full the oldest pending event is dropped and the client is told
+    how many it missed.
+    """
+
+    def __init__(self, kinds: Set[str], min_score: float = 0.0, anomaly_types: Optional[Set[str]] = None, limit: int = 256):
+        self.kinds = kinds
+        self.min_score = min_score
+        self.anomaly_types = anomaly_types
+        self.limit = limit
+        self.pending = OrderedDict()  # key -> Event
+        self.wakeup = asyncio.Event()
+        self.dropped = 0
+        self.delivered = 0
+
+    def accepts(self, event: Event) -> bool:
+        if event.kind not in self.kinds:
+            return False
+        if event.kind == 'anomaly':
+            if event.data.get('score', 0.0) < self.min_score:
+                return False
+            if self.anomaly_types and event.data.get('anomaly_type') not in self.anomaly_types:
+                return False
+        return True
+
+    def offer(self, event: Event):
+        key = (event.kind, event.key) if event.key is not None else event.seq
+        previous = self.pending.pop(key, None)
+        if previous is not None and event.kind in MERGED_KINDS:
+            event = Event(event.seq, event.kind, {**previous.data, **event.data}, event.key)
+        self.pending[key] = event
+
+        while len(self.pending) > self.limit:
+            self.pending.popitem(last=False)
+            self.dropped += 1
+
+        self.wakeup.set()
+
+    def take(self) -> list:
+        events = list(self.pending.values())
+        self.pending.clear()
+        self.wakeup.clear()
+        self.delivered += len(events)
+        return events
+
+
+class EventBroadcaster:
+    """
+    Fans events out to every connected dashboard from one place
+
+    Services call `publish()` (synchronous, no I/O): the event is offered to
+    every local subscriber whose filters accept it. With Redis, events are
+    also relayed on a pub/sub channel so that dashboards connected to an API
+    process see events published by stream workers; a process only starts
+    listening to the channel once it has a subscriber.
+    """
+
+    def __init__(self, redis_manager=None):
+        self.redis = redis_manager
+        self.channel = f"{os.getenv('AEGIS_CONTROL_PREFIX', 'aegis:control')}:events"
+        self.queue_size = int(os.getenv('AEGIS_STREAM_QUEUE_SIZE', 256))
+        self.keepalive = float(os.getenv('AEGIS_STREAM_KEEPALIVE_SECONDS', 15))
+        self.origin = uuid.uuid4().hex[:8]  # Skips this process's own relayed events
+
+        self.seq = itertools.count(1)
+        self.subscribers = set()
+        self.latest = {}  # kind -> last event of each STATE_KINDS
+        self.outbox = deque(maxlen=10000)  # Events waiting to be relayed
+        self.outbox_ready = asyncio.Event()
+
+        self.is_running = False
+        self.relay_task = None
+        self.listen_task = None
+
+        self.stats = {
+            'published': 0,
+            'relayed': 0,
+            'received': 0
+        }
+
+    @property
+    def is_shared(self) -> bool:
+        return self.redis is not None and self.redis.is_connected
+
+    def publish(self, kind: str, data: Dict[str, Any], key: Optional[str] = None):
+        """Send an event to local subscribers and, with Redis, to other processes"""
+        event = self.dispatch(kind, {**data, 'published_at': datetime.utcnow().isoformat()}, key)
+        self.stats['published'] += 1
+
+        if self.is_running and self.is_shared:
+            self.outbox.append(event)
+            self.outbox_ready.set()
+
+    def dispatch(self, kind: str, data: Dict[str, Any], key: Optional[str] = None) -> Event:
+        event = Event(next(self.seq), kind, data, key)
+        if kind in STATE_KINDS:
+            previous = self.latest.get(kind)
+            if previous is not None and kind in MERGED_KINDS:
+                data = {**previous.data, **data}
+            self.latest[kind] = Event(event.seq, kind, data, key)
+        for subscriber in self.subscribers:
+            if subscriber.accepts(event):
+                subscriber.offer(event)
+        return event
+
+    async def start(self):
+        if self.is_running:
+            return
+        self.is_running = True
+        if self.is_shared:
+            self.relay_task = asyncio.create_task(self.relay())
+
+    async def stop(self):
+        self.is_running = False
+        for task in (self.relay_task, self.listen_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self.relay_task = self.listen_task = None
+
+        # Wake streaming clients so their responses end
+        for subscriber in self.subscribers:
+            subscriber.wakeup.set()
+
+    async def relay(self):
+        """Publish outgoing events to the Redis channel"""
+        while self.is_running:
+            try:
+                await self.outbox_ready.wait()
+                self.outbox_ready.clear()
+
+                async with self.redis.client.pipeline(transaction=False) as pipe:
+                    count = 0
+                    while self.outbox:
+                        event = self.outbox.popleft()
+                        pipe.publish(self.channel, json.dumps(
+                            {'origin': self.origin, 'kind': event.kind, 'key': event.key, 'data': event.data},
+                            default=str
+                        ))
+                        count += 1
+                    await pipe.execute()
+                self.stats['relayed'] += count
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Event relay failed: {str(e)}")
+                await asyncio.sleep(1)
+
+    async def listen(self):
+        """Dispatch events published by other processes"""
+        while self.is_running:
+            pubsub = self.redis.client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                while self.is_running:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if not message:
+                        continue
+                    relayed = json.loads(message['data'])
+                    if relayed['origin'] != self.origin:
+                        self.dispatch(relayed['kind'], relayed['data'], relayed['key'])
+                        self.stats['received'] += 1
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Event subscription failed: {str(e)}")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def subscriber(self, kinds: Optional[Set[str]] = None, min_score: float = 0.0, anomaly_types: Optional[Set[str]] = None) -> Subscriber:
+        """A client's filters (all kinds by default); registered by subscribe()"""
+        unknown = set(kinds or ()) - set(KINDS)
+        if unknown:
+            raise ValueError(f"Unknown event kinds: {sorted(unknown)}")
+        return Subscriber(set(kinds or KINDS), min_score, anomaly_types, self.queue_size)
+
+    def subscribe(self, subscriber: Subscriber):
+        """Register a client; it first receives the current metrics and status"""
+        for event in self.latest.values():
+            if subscriber.accepts(event):
+                subscriber.offer(event)
+        self.subscribers.add(subscriber)
+        if self.is_running and self.is_shared and self.listen_task is None:
+            self.listen_task = asyncio.create_task(self.listen())
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def stream(self, subscriber: Subscriber) -> AsyncIterator[bytes]:
+        """SSE body for a subscriber, registered while it streams; keep-alive comments while idle"""
+        self.subscribe(subscriber)
+        try:
+            yield f"retry: 3000\n: subscribed to {','.join(sorted(subscriber.kinds))}\n\n".encode('utf-8')
+
+            while self.is_running:
+                try:
+                    await asyncio.wait_for(subscriber.wakeup.wait(), timeout=self.keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+
+                dropped, subscriber.dropped = subscriber.dropped, 0
+                if dropped:
+                    yield f"event: dropped\ndata: {json.dumps({'kind': 'dropped', 'count': dropped})}\n\n".encode('utf-8')
+
+                frames = [event.frame for event in subscriber.take()]
+                if frames:
+                    yield b''.join(frames)
+        finally:
+            self.unsubscribe(subscriber)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get broadcaster statistics"""
+        return {
+            **self.stats,
+            'subscribers': len(self.subscribers),
+            'shared': self.is_shared
+        }
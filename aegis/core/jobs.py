@@ -0,0 +1,287 @@
+"""
+Job Manager
+Runs long-lived background jobs (bulk scoring, retraining) off the request path
+Job state and checkpoints are persisted as JSON so interrupted jobs can resume
+"""
+
+import logging
+from typing import Dict, Any, List, Callable, Awaitable, Optional
+from datetime import datetime
+from pathlib import Path
+import asyncio
+import json
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Jobs in these states can be resumed from their last checkpoint
+RESUMABLE_STATUSES = ('failed', 'cancelled', 'interrupted')
+
+
+class Job:
+    """
+    A background job: parameters, progress and the checkpoint to resume from
+    """
+
+    def __init__(
+        self,
+        job_type: str,
+        params: Dict[str, Any],
+        job_id: Optional[str] = None
+    ):
+        self.job_id = job_id or f"{job_type}_{uuid.uuid4().hex[:12]}"
+        self.job_type = job_type
+        self.params = params
+        self.status = 'queued'
+        self.progress = {'processed': 0, 'total': None}
+        self.checkpoint = {}
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.updated_at = self.created_at
+        self.save = None  # set by the JobManager
+
+    def update(
+        self,
+        progress: Optional[Dict[str, Any]] = None,
+        checkpoint: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Record progress and (once the work before it is durable) the resume checkpoint
+        """
+        if progress:
+            self.progress.update(progress)
+        if checkpoint is not None:
+            self.checkpoint = checkpoint
+        self.updated_at = datetime.now().isoformat()
+
+        if self.save:
+            self.save(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = self.progress.get('total')
+        return {
+            'job_id': self.job_id,
+            'type': self.job_type,
+            'status': self.status,
+            'params': self.params,
+            'progress': {
+                **self.progress,
+                'percent': (
+                    round(100 * self.progress['processed'] / total, 2)
+                    if total else None
+                )
+            },
+            'checkpoint': self.checkpoint,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
+    @classmethod
+    def from_dict(cls, doc: Dict[str, Any]) -> 'Job':
+        job = cls(doc['type'], doc.get('params', {}), job_id=doc['job_id'])
+        job.status = doc.get('status', 'interrupted')
+        job.progress = {
+            key: value for key, value in doc.get('progress', {}).items()
+            if key != 'percent'
+        } or job.progress
+        job.checkpoint = doc.get('checkpoint', {})
+        job.result = doc.get('result')
+        job.error = doc.get('error')
+        job.created_at = doc.get('created_at', job.created_at)
+        job.updated_at = doc.get('updated_at', job.updated_at)
+        return job
+
+
+class JobManager:
+    """
+    Registry and runner for background jobs
+
+    Each job type maps to an async runner taking the Job. Runners report
+    progress and checkpoints through job.update(), which persists the job
+    state, and resume from job.checkpoint when it is not empty.
+    """
+
+    def __init__(self, jobs_dir: Optional[str] = None):
+        self.jobs_dir = Path(jobs_dir or os.getenv('AEGIS_JOBS_DIR', 'jobs'))
+        self.runners = {}
+        self.validators = {}
+        self.jobs = {}
+        self.tasks = {}
+
+        self.stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'cancelled': 0,
+            'resumed': 0
+        }
+
+    def register(
+        self,
+        job_type: str,
+        runner: Callable[[Job], Awaitable[Dict[str, Any]]],
+        validator: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+    ):
+        """
+        Register the runner for a job type
+        The validator checks submitted params (raising ValueError) and
+        returns them as the job will run with them
+        """
+        self.runners[job_type] = runner
+        if validator is not None:
+            self.validators[job_type] = validator
+
+    def load(self):
+        """
+        Load persisted jobs
+        Jobs left running by a previous process are marked as interrupted
+        """
+        try:
+            self.jobs_dir.mkdir(parents=True, exist_ok=True)
+
+            for path in sorted(self.jobs_dir.glob('*.json')):
+                with open(path, 'r', encoding='utf-8') as f:
+                    job = Job.from_dict(json.load(f))
+
+                if job.status in ('queued', 'running'):
+                    job.status = 'interrupted'
+                    self.save(job)
+
+                self.jobs[job.job_id] = job
+
+            logger.info(f"📦 Loaded {len(self.jobs)} jobs from {self.jobs_dir}")
+
+        except Exception as e:
+            logger.error(f"❌ Failed to load jobs: {str(e)}")
+
+    def save(self, job: Job):
+        """Persist job state atomically (write to a temp file, then rename)"""
+        try:
+            self.jobs_dir.mkdir(parents=True, exist_ok=True)
+            path = self.jobs_dir / f"{job.job_id}.json"
+            tmp_path = path.with_suffix('.json.tmp')
+
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(job.to_dict(), f, default=str)
+            os.replace(tmp_path, path)
+
+        except Exception as e:
+            logger.error(f"❌ Failed to save job {job.job_id}: {str(e)}")
+
+    def submit(self, job_type: str, params: Dict[str, Any]) -> Job:
+        """Create a job and start running it in the background"""
+        if job_type not in self.runners:
+            raise ValueError(f"Unknown job type: {job_type}")
+        if job_type in self.validators:
+            params = self.validators[job_type](params)
+
+        job = Job(job_type, params)
+        job.save = self.save
+        self.jobs[job.job_id] = job
+        self.save(job)
+        self.stats['submitted'] += 1
+
+        self.start(job)
+        logger.info(f"🚀 Job {job.job_id} submitted")
+        return job
+
+    def resume(self, job_id: str) -> Job:
+        """Restart a failed, cancelled or interrupted job from its last checkpoint"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job.status not in RESUMABLE_STATUSES:
+            raise ValueError(f"Job {job_id} is {job.status} and cannot be resumed")
+        if job.job_type not in self.runners:
+            raise ValueError(f"Unknown job type: {job.job_type}")
+
+        job.save = self.save
+        job.error = None
+        self.stats['resumed'] += 1
+
+        self.start(job)
+        logger.info(f"🔄 Job {job_id} resumed from checkpoint {job.checkpoint}")
+        return job
+
+    async def cancel(self, job_id: str) -> Job:
+        """Cancel a running job (its checkpoint is kept for resume)"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+
+        task = self.tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        return job
+
+    def start(self, job: Job):
+        """Schedule a job's runner"""
+        job.status = 'running'
+        job.update()
+        self.tasks[job.job_id] = asyncio.create_task(self.run(job))
+
+    async def run(self, job: Job):
+        """Run a job and record its outcome"""
+        try:
+            job.result = await self.runners[job.job_type](job)
+            job.status = 'completed'
+            self.stats['completed'] += 1
+            logger.info(f"✅ Job {job.job_id} completed ({job.progress['processed']} processed)")
+
+        except asyncio.CancelledError:
+            job.status = 'cancelled'
+            self.stats['cancelled'] += 1
+            logger.warning(f"🛑 Job {job.job_id} cancelled")
+
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            self.stats['failed'] += 1
+            logger.error(f"❌ Job {job.job_id} failed: {str(e)}")
+
+        finally:
+            job.update()
+            self.tasks.pop(job.job_id, None)
+
+    async def wait(self, job_id: str) -> Job:
+        """Wait until a job stops running"""
+        task = self.tasks.get(job_id)
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+        return self.jobs[job_id]
+
+    async def stop(self):
+        """Stop running jobs on shutdown; they stay resumable as interrupted"""
+        for job_id in list(self.tasks):
+            await self.cancel(job_id)
+            job = self.jobs[job_id]
+            job.status = 'interrupted'
+            job.update()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job state by id"""
+        job = self.jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def list_jobs(self, job_type: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs first, optionally filtered by type"""
+        jobs = [
+            job for job in self.jobs.values()
+            if job_type is None or job.job_type == job_type
+        ]
+        jobs.sort(key=lambda job: job.created_at, reverse=True)
+        return [job.to_dict() for job in jobs[:limit]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get job statistics"""
+        return {
+            **self.stats,
+            'running': len(self.tasks),
+            'total': len(self.jobs)
+        }
@@ -16,9 +16,11 @@ class SystemMonitor:
     Continuous system health monitoring
     """
     
-    def __init__(self, db_manager, ml_models):
+    def __init__(self, db_manager, ml_models, events=None):
         self.db = db_manager
         self.ml_models = ml_models
+        self.events = events  # Live dashboard events (EventBroadcaster)
+        self.published_metrics = {}
         self.is_running = False
         self.start_time = None
         self.monitor_task = None
@@ -92,28 +94,43 @@ class SystemMonitor:
             recent_telemetry = await self.db.get_recent_telemetry(minutes=5)
             
             if recent_telemetry:
-                # Calculate metrics
-                total_requests = len(recent_telemetry)
-                errors = [t for t in recent_telemetry if t.get('error')]
+                # Calculate metrics; sampled events stand for sampleWeight
+                # events each, so counts are extrapolated by summing weights
+                total_requests = sum(t.get('sampleWeight', 1.0) for t in recent_telemetry)
+                errors = sum(t.get('sampleWeight', 1.0) for t in recent_telemetry if t.get('error'))
                 
-                response_times = [
-                    t.get('performance', {}).get('responseTime', 0)
+                timed = [
+                    (t['performance'].get('responseTime', 0), t.get('sampleWeight', 1.0))
                     for t in recent_telemetry
                     if t.get('performance')
                 ]
+                timed_weight = sum(weight for _, weight in timed)
                 
                 self.metrics['request_count'] = total_requests
-                self.metrics['error_count'] = len(errors)
+                self.metrics['error_count'] = errors
                 self.metrics['avg_response_time'] = (
-                    sum(response_times) / len(response_times)
-                    if response_times else 0
+                    sum(value * weight for value, weight in timed) / timed_weight
+                    if timed_weight else 0
                 )
             
             logger.debug(f"📊 Metrics collected: {self.metrics}")
+            self.publish_metrics()
             
         except Exception as e:
             logger.error(f"❌ Failed to collect metrics: {str(e)}")
     
+    def publish_metrics(self):
+        """Send the metrics that changed since the last publish"""
+        if not self.events:
+            return
+        delta = {
+            name: value for name, value in self.metrics.items()
+            if self.published_metrics.get(name) != value
+        }
+        if delta:
+            self.events.publish('metrics', delta, key='metrics')
+            self.published_metrics = dict(self.metrics)
+    
     async def check_health(self):
         """Check system health against thresholds"""
         try:
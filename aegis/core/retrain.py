@@ -0,0 +1,220 @@
+"""
+Retrain Job
+Background retraining of the Isolation Forest anomaly detector
+Streams telemetry from Mongo, fits in a worker process, validates on a
+holdout split and hot-swaps the live model, then refits the
+per-segment models in parallel; the new checkpoint generation is published
+through the control state so every process reloads it
+"""
+
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import multiprocessing
+import asyncio
+import os
+
+import numpy as np
+
+from models.anomaly_detector import fit_model
+from .training_set import TrainingSetBuilder
+
+logger = logging.getLogger(__name__)
+
+# Share of overall progress reached at the start of each phase
+PHASES = {
+    'loading_data': 0.0,
+    'training': 0.5,
+    'validating': 0.75,
+    'swapping': 0.8,
+    'training_segments': 0.82,
+    'done': 1.0
+}
+
+# Only the feature and segment fields are read from Mongo
+TELEMETRY_PROJECTION = {'_id': 0, 'eventType': 1, 'performance': 1, 'metadata': 1, 'timestamp': 1}
+
+
+class RetrainJob:
+    """
+    Anomaly detector retraining job (runner for JobManager)
+
+    Params:
+        minutes: only use telemetry stored in the last N minutes (default: all)
+        max_events: only scan the newest N events (default: the full history)
+        sample_size: rows kept in the stratified reservoir sample the model
+            is trained on (memory stays bounded for any history length)
+        holdout: fraction of events held out for validation
+        max_holdout_anomaly_rate: reject the model if it flags more of the
+            holdout than this (the live model is kept)
+        shadow: register the validated model as a shadow candidate (scored
+            on sampled live traffic, promoted later) instead of swapping it in
+        include_false_positives, include_approved_actions: recorded with the
+            job; no labelled feedback is stored yet, so they do not change
+            the training set
+
+    Progress reports the phase and the overall fraction of the work (phases
+    are weighted by PHASES). The result holds the validation metrics.
+    A retrain restarts from scratch when resumed.
+    """
+
+    def __init__(self, db_manager, detector, shadow=None, control_state=None):
+        self.db_manager = db_manager
+        self.detector = detector
+        self.shadow = shadow  # ShadowEvaluator, for shadow=True jobs
+        self.control_state = control_state  # Publishes the new model to other processes
+
+        self.chunk_size = int(os.getenv('AEGIS_RETRAIN_CHUNK_SIZE', 5000))
+        self.max_events = int(os.getenv('AEGIS_RETRAIN_MAX_EVENTS', 0)) or None
+        self.holdout = float(os.getenv('AEGIS_RETRAIN_HOLDOUT', 0.2))
+        self.max_holdout_anomaly_rate = float(os.getenv('AEGIS_RETRAIN_MAX_HOLDOUT_ANOMALY_RATE', 0.25))
+        self.min_events = 100
+
+    def set_phase(self, job, phase: str, started: datetime, fraction: Optional[float] = None, **progress):
+        """Report phase and overall fraction (readers extrapolate the ETA from started_at)"""
+        fraction = PHASES[phase] if fraction is None else fraction
+
+        job.update(progress={
+            'phase': phase,
+            'fraction': round(fraction, 4),
+            'started_at': started.isoformat(),
+            **progress
+        })
+
+    async def load_features(
+        self, job, started: datetime, minutes: Optional[int], max_events: Optional[int], sample_size: Optional[int]
+    ) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """
+        Stream telemetry chunks into a stratified reservoir sample
+        Returns the sampled feature matrix and the rows' segments
+        """
+        total = await self.db_manager.count_telemetry(minutes)
+        if max_events:
+            total = min(total, max_events)
+        self.set_phase(job, 'loading_data', started, processed=0, total=total)
+
+        projection = dict(TELEMETRY_PROJECTION)
+        if self.detector.segment_by:
+            projection[self.detector.segment_by] = 1
+
+        builder = TrainingSetBuilder(
+            self.detector.extract_features_batch,
+            len(self.detector.feature_names),
+            sample_size,
+            self.detector.segment_key if self.detector.segments else None
+        )
+
+        # A capped scan takes the newest events; a full scan needs no sort
+        async for docs in self.db_manager.iter_telemetry(
+            minutes, max_events, self.chunk_size, projection, newest_first=bool(max_events)
+        ):
+            builder.add(docs)
+
+            fraction = PHASES['training'] * builder.seen / total if total else 0.0
+            self.set_phase(job, 'loading_data', started, min(fraction, PHASES['training']), processed=builder.seen)
+
+        X, segments = builder.sample()
+        job.update(progress={'sampled': len(X)})
+        return X, segments
+
+    def holdout_metrics(self, model, scaler, X: np.ndarray) -> Dict[str, Any]:
+        """Score distribution of a model on the holdout set"""
+        X_scaled = scaler.transform(X)
+        anomaly_scores = 1 / (1 + np.exp(model.score_samples(X_scaled)))
+
+        return {
+            'flagged_rate': float((model.predict(X_scaled) == -1).mean()),
+            'alert_rate': float((anomaly_scores > self.detector.threshold).mean()),
+            'score_mean': float(anomaly_scores.mean()),
+            'score_p99': float(np.percentile(anomaly_scores, 99))
+        }
+
+    async def run(self, job) -> Dict[str, Any]:
+        """Load, fit, validate and swap"""
+        if self.detector is None or not hasattr(self.detector, 'swap'):
+            raise RuntimeError("Anomaly detector is not loaded in this process")
+        if self.detector.online:
+            raise RuntimeError("The online anomaly detector learns continuously and has no retraining")
+
+        params = job.params
+        started = datetime.now()
+        max_events = params.get('max_events') or self.max_events
+        holdout = float(params.get('holdout', self.holdout))
+
+        X, segments = await self.load_features(
+            job, started, params.get('minutes'), max_events, params.get('sample_size')
+        )
+        if len(X) < self.min_events:
+            raise ValueError(f"Not enough telemetry for training ({len(X)} events, need at least {self.min_events})")
+
+        rng = np.random.default_rng(int(params.get('seed', 42)))
+        order = rng.permutation(len(X))
+        n_holdout = int(len(X) * holdout)
+        X_holdout, X_train = X[order[:n_holdout]], X[order[n_holdout:]]
+        segments_train = [segments[i] for i in order[n_holdout:]]
+
+        # Fit in a worker process so the event loop (ingestion) never stalls
+        self.set_phase(job, 'training', started, train_events=len(X_train), holdout_events=len(X_holdout))
+        pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            model, scaler = await asyncio.get_running_loop().run_in_executor(
+                pool, fit_model, self.detector.model, X_train
+            )
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        metrics = {'train_events': len(X_train), 'holdout_events': len(X_holdout)}
+        if n_holdout:
+            self.set_phase(job, 'validating', started)
+            metrics['candidate'] = await asyncio.to_thread(self.holdout_metrics, model, scaler, X_holdout)
+            if hasattr(self.detector.model, 'estimators_') and hasattr(self.detector.scaler, 'mean_'):
+                metrics['live'] = await asyncio.to_thread(
+                    self.holdout_metrics, self.detector.model, self.detector.scaler, X_holdout
+                )
+
+            if metrics['candidate']['flagged_rate'] > float(
+                params.get('max_holdout_anomaly_rate', self.max_holdout_anomaly_rate)
+            ):
+                raise ValueError(
+                    f"Candidate model flags {metrics['candidate']['flagged_rate']:.1%} of the holdout; "
+                    f"keeping the live model"
+                )
+
+        if params.get('shadow'):
+            if self.shadow is None:
+                raise RuntimeError("Shadow evaluation is not available in this process")
+
+            self.set_phase(job, 'swapping', started)
+            await self.shadow.add_candidate(job.job_id, model, scaler)
+            self.set_phase(job, 'done', started)
+
+            return {
+                'swapped': False,
+                'shadow_candidate': job.job_id,
+                'metrics': metrics
+            }
+
+        self.set_phase(job, 'swapping', started)
+        self.detector.swap(model, scaler)
+        generation = await self.detector.save_model()
+        if generation is None:
+            raise RuntimeError("The new model is live in this process only: its checkpoint could not be written")
+        if self.control_state:
+            await self.control_state.update(anomaly_model=generation)
+
+        if self.detector.segments:
+            self.set_phase(job, 'training_segments', started)
+            metrics['segments'] = await self.detector.train_segments(X_train, segments_train)
+            if self.control_state:
+                await self.control_state.update(anomaly_segments=datetime.now().isoformat())
+
+        self.set_phase(job, 'done', started)
+        logger.info(f"✅ Retrain job {job.job_id}: new anomaly model live ({len(X_train)} events)")
+
+        return {
+            'swapped': True,
+            'swapped_at': datetime.now().isoformat(),
+            'generation': generation,
+            'metrics': metrics
+        }
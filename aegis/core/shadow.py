@@ -0,0 +1,440 @@
+"""
+Shadow Evaluator
+Scores a sample of live telemetry with candidate anomaly models off the
+ingestion path, so a retrained model can be compared with the live one
+(score distribution, alert agreement, latency) before it is promoted
+Candidates are loaded by every process that scores traffic, and each
+process shares its counters through Redis for the comparison
+"""
+
+import logging
+from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+import asyncio
+import json
+import shutil
+import socket
+import time
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HISTOGRAM_BINS = 20
+
+
+class ShadowStats:
+    """Running score distribution and latency of one model on the shadow sample"""
+
+    def __init__(self, latency_window: Optional[int] = 1000):
+        self.events = 0
+        self.score_sum = 0.0
+        self.alerts = 0
+        self.histogram = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+        self.batch_latency = deque(maxlen=latency_window)   # us per event, batched
+        self.single_latency = deque(maxlen=latency_window)  # us for one event
+
+        # Candidates only: comparison with the live model's scores
+        self.agreements = 0
+        self.abs_diff_sum = 0.0
+
+    def record(self, scores: np.ndarray, threshold: float, batch_us: float, single_us: float,
+               live_scores: Optional[np.ndarray] = None):
+        self.events += len(scores)
+        self.score_sum += float(scores.sum())
+        self.alerts += int((scores > threshold).sum())
+        self.histogram += np.histogram(np.clip(scores, 0, 1), bins=HISTOGRAM_BINS, range=(0, 1))[0]
+        self.batch_latency.append(batch_us)
+        self.single_latency.append(single_us)
+
+        if live_scores is not None:
+            self.agreements += int(((scores > threshold) == (live_scores > threshold)).sum())
+            self.abs_diff_sum += float(np.abs(scores - live_scores).sum())
+
+    def to_state(self) -> Dict[str, Any]:
+        """Raw counters and latency samples (JSON), added up across processes by merge()"""
+        return {
+            'events': self.events,
+            'score_sum': self.score_sum,
+            'alerts': self.alerts,
+            'histogram': self.histogram.tolist(),
+            'batch_latency': list(self.batch_latency),
+            'single_latency': list(self.single_latency),
+            'agreements': self.agreements,
+            'abs_diff_sum': self.abs_diff_sum
+        }
+
+    def merge(self, state: Dict[str, Any]):
+        self.events += state['events']
+        self.score_sum += state['score_sum']
+        self.alerts += state['alerts']
+        self.histogram += np.asarray(state['histogram'], dtype=np.int64)
+        self.batch_latency.extend(state['batch_latency'])
+        self.single_latency.extend(state['single_latency'])
+        self.agreements += state['agreements']
+        self.abs_diff_sum += state['abs_diff_sum']
+
+    def to_dict(self, compared: bool) -> Dict[str, Any]:
+        events = max(self.events, 1)
+        summary = {
+            'events': self.events,
+            'score_mean': self.score_sum / events,
+            'alert_rate': self.alerts / events,
+            'histogram': self.histogram.tolist(),
+            'latency_us': {
+                'batched_per_event_p50': float(np.median(self.batch_latency)) if self.batch_latency else None,
+                'single_event_p50': float(np.median(self.single_latency)) if self.single_latency else None,
+                'single_event_p95': float(np.percentile(self.single_latency, 95)) if self.single_latency else None
+            }
+        }
+        if compared:
+            summary['agreement_rate'] = self.agreements / events
+            summary['mean_abs_score_diff'] = self.abs_diff_sum / events
+        return summary
+
+
+class ShadowEvaluator:
+    """
+    Candidate anomaly models scored on sampled live traffic
+
+    submit() is called after the live model has scored a telemetry batch;
+    it samples AEGIS_SHADOW_SAMPLE_RATE of the events and schedules their
+    scoring on a dedicated worker thread. When that thread falls behind
+    (max_pending batches queued) samples are dropped instead of queueing,
+    so shadow scoring can never slow ingestion down. The candidates and
+    the live global model score the same rows, so per-segment scoring on
+    the ingestion path does not skew the comparison.
+
+    Candidates are checkpointed under <live model>_candidates/<name>, a
+    directory shared by the API processes and stream workers: adding or
+    removing one is published through the control state, and every
+    process rescans the directory. Each process writes its counters to a
+    Redis hash every stats_interval seconds, and get_comparison() adds up
+    those of every process. promote() swaps a candidate into the live
+    model and publishes its generation, so every process reloads it.
+    """
+
+    def __init__(self, live_detector, directory: Optional[Path] = None, control_state=None, redis_manager=None):
+        self.live = live_detector
+        self.control_state = control_state  # Publishes candidate changes and promotions
+        self.redis = redis_manager  # Shares this process's counters
+        self.directory = Path(directory or live_detector.model_path.with_name(
+            f"{live_detector.model_path.stem}_candidates"
+        ))
+
+        self.sample_rate = float(os.getenv('AEGIS_SHADOW_SAMPLE_RATE', 0.1))
+        self.max_pending = int(os.getenv('AEGIS_SHADOW_MAX_PENDING', 4))
+        self.stats_key = f"{os.getenv('AEGIS_SHADOW_PREFIX', 'aegis:shadow')}:stats"
+        self.stats_interval = float(os.getenv('AEGIS_SHADOW_STATS_SECONDS', 5))
+        self.stats_ttl = float(os.getenv('AEGIS_SHADOW_STATS_TTL_SECONDS', 3600))
+        self.process = f"{socket.gethostname()}-{os.getpid()}"
+
+        self.candidates = {}
+        self.candidate_stats = {}
+        self.live_stats = ShadowStats()
+        self.live_generation = live_detector.generation  # Live model the live stats were recorded with
+        self.added_at = {}
+        self.rescan_lock = asyncio.Lock()
+
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='aegis-shadow')
+        self.pending = 0
+        self.tasks = set()  # Evaluations and rescans in flight
+        self.rng = np.random.default_rng()
+        self.recorded = False  # Counters changed since they were last shared
+
+        self.is_running = False
+        self.task = None
+
+        self.stats = {
+            'batches': 0,
+            'sampled_events': 0,
+            'dropped_batches': 0,
+            'errors': 0
+        }
+
+    @property
+    def threshold(self) -> float:
+        """Alert cutoff used for agreement (the live model's)"""
+        return self.live.threshold
+
+    @property
+    def is_shared(self) -> bool:
+        return self.redis is not None and self.redis.is_connected
+
+    def new_detector(self, name: str):
+        from models.anomaly_detector import AnomalyDetector
+        return AnomalyDetector(self.directory / f"{name}.pkl", segment_by='')
+
+    def track(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def load(self):
+        """Load the candidates checkpointed by this or any other process"""
+        await self.rescan()
+        if self.candidates:
+            logger.info(f"📦 {len(self.candidates)} shadow candidates loaded")
+
+    async def rescan(self):
+        """Match the candidates to the shared directory: load new ones, drop removed ones"""
+        async with self.rescan_lock:
+            names = {path.name for path in self.directory.iterdir() if path.is_dir()} if self.directory.exists() else set()
+
+            for name in list(self.candidates):
+                if name not in names:
+                    self.drop(name)
+
+            for name in sorted(names - set(self.candidates)):
+                detector = self.new_detector(name)
+                await detector.load_model()
+                if detector.compiled is None:
+                    logger.warning(f"⚠️  Shadow candidate {name} could not be loaded, skipping")
+                    continue
+                self.register(name, detector)
+
+    def register(self, name: str, detector):
+        self.candidates[name] = detector
+        self.candidate_stats[name] = ShadowStats()
+        self.added_at[name] = datetime.now().isoformat()
+
+    def drop(self, name: str):
+        self.candidates.pop(name, None)
+        self.candidate_stats.pop(name, None)
+        self.added_at.pop(name, None)
+
+    async def publish_candidates(self):
+        """Tell the other processes to rescan the candidates"""
+        if self.control_state:
+            await self.control_state.update(shadow_candidates=datetime.now().isoformat())
+
+    def on_control_change(self, state, changed: Dict[str, Any]):
+        if 'shadow_candidates' in changed:
+            self.track(self.rescan())
+
+    async def add_candidate(self, name: str, model, scaler):
+        """Register a fitted model as a shadow candidate (checkpointed)"""
+        detector = self.new_detector(name)
+        detector.swap(model, scaler)
+        if await detector.save_model() is None:
+            raise RuntimeError(f"Shadow candidate {name} could not be checkpointed")
+
+        self.register(name, detector)
+        await self.publish_candidates()
+        logger.info(f"🔄 Shadow candidate {name} added ({int(self.sample_rate * 100)}% of live traffic)")
+
+    async def remove_candidate(self, name: str):
+        """Drop a candidate and its checkpoints"""
+        if name not in self.candidates:
+            raise KeyError(name)
+
+        detector = self.candidates[name]
+        self.drop(name)
+        await asyncio.to_thread(shutil.rmtree, detector.checkpoints.directory, True)
+        await self.publish_candidates()
+
+    async def promote(self, name: str) -> Dict[str, Any]:
+        """Make a candidate the live global model; returns its final comparison"""
+        if name not in self.candidates:
+            raise KeyError(name)
+
+        comparison = (await self.get_comparison())['candidates'][name]
+        candidate = self.candidates[name]
+        model = await asyncio.to_thread(lambda: candidate.model)  # May unpickle
+
+        previous = self.live.live_state()
+        self.live.swap(model, candidate.scaler)
+        generation = await self.live.save_model()
+        if generation is None:
+            # Not live anywhere else: keep every process on the same model
+            self.live.restore_state(previous)
+            raise RuntimeError(f"Candidate {name} was not promoted: its checkpoint could not be written")
+        if self.control_state:
+            await self.control_state.update(anomaly_model=generation)
+        await self.remove_candidate(name)
+
+        logger.info(f"🎉 Shadow candidate {name} promoted to live")
+        return comparison
+
+    def submit(self, events: List[Dict[str, Any]]):
+        """Schedule shadow scoring of a sample of a scored batch (never blocks)"""
+        if not self.candidates or not events or self.sample_rate <= 0:
+            return
+
+        self.stats['batches'] += 1
+        if self.pending >= self.max_pending:
+            self.stats['dropped_batches'] += 1
+            return
+
+        picked = np.flatnonzero(self.rng.random(len(events)) < self.sample_rate)
+        if not len(picked):
+            return
+
+        sample = [events[i] for i in picked]
+        self.pending += 1
+        self.stats['sampled_events'] += len(sample)
+        self.track(self.evaluate(sample))
+
+    async def evaluate(self, events: List[Dict[str, Any]]):
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.score_sample, events, dict(self.candidates)
+            )
+
+            # Live stats describe one live model: restart them after a swap
+            if self.live.generation != self.live_generation:
+                self.live_stats = ShadowStats()
+                self.live_generation = self.live.generation
+
+            live_scores, live_batch_us, live_single_us = results.pop(None)
+            self.live_stats.record(live_scores, self.threshold, live_batch_us, live_single_us)
+
+            for name, (scores, batch_us, single_us) in results.items():
+                if name in self.candidate_stats:
+                    self.candidate_stats[name].record(scores, self.threshold, batch_us, single_us, live_scores)
+
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"❌ Shadow evaluation failed: {str(e)}")
+
+        finally:
+            self.pending -= 1
+            self.recorded = True
+
+    def score_sample(self, events: List[Dict[str, Any]], candidates: Dict[str, Any]) -> Dict[Any, Any]:
+        """
+        Worker thread: score the sample with every candidate and with the
+        live global model (the same rows, features and scoring path),
+        timing the batch and a single event
+        """
+        X = self.live.extract_features_batch(events)
+
+        def timed(detector):
+            start = time.perf_counter()
+            scores = detector.score_features(X)
+            batch_us = (time.perf_counter() - start) * 1e6 / len(X)
+
+            start = time.perf_counter()
+            detector.score_features(X[:1])
+            single_us = (time.perf_counter() - start) * 1e6
+            return scores, batch_us, single_us
+
+        results = {name: timed(detector) for name, detector in candidates.items()}
+        results[None] = timed(self.live)
+        return results
+
+    def snapshot(self) -> Dict[str, Any]:
+        """This process's counters, as shared with the others"""
+        return {
+            'at': time.time(),
+            'live_generation': self.live_generation,
+            'live': self.live_stats.to_state(),
+            'candidates': {name: stats.to_state() for name, stats in self.candidate_stats.items()},
+            'stats': dict(self.stats)
+        }
+
+    async def share(self):
+        """Write this process's counters to the shared hash"""
+        if not self.is_shared:
+            return
+        self.recorded = False
+        try:
+            await self.redis.client.hset(self.stats_key, self.process, json.dumps(self.snapshot()))
+        except Exception as e:
+            self.recorded = True
+            logger.error(f"❌ Failed to share shadow stats: {str(e)}")
+
+    async def process_snapshots(self) -> List[Dict[str, Any]]:
+        """Counters of every process (this one's current, the others' last shared)"""
+        snapshots = [self.snapshot()]
+        if not self.is_shared:
+            return snapshots
+
+        try:
+            shared = await self.redis.client.hgetall(self.stats_key)
+        except Exception as e:
+            logger.error(f"❌ Failed to read shared shadow stats: {str(e)}")
+            return snapshots
+
+        now, stale = time.time(), []
+        for process, raw in shared.items():
+            if process == self.process:
+                continue
+            snapshot = json.loads(raw)
+            if now - snapshot['at'] > self.stats_ttl:
+                stale.append(process)
+            else:
+                snapshots.append(snapshot)
+
+        if stale:
+            await self.redis.client.hdel(self.stats_key, *stale)
+        return snapshots
+
+    async def get_comparison(self) -> Dict[str, Any]:
+        """Live vs candidate metrics on the shadow sample of every process"""
+        live = ShadowStats(latency_window=None)
+        candidates = {name: ShadowStats(latency_window=None) for name in self.candidate_stats}
+        totals = dict.fromkeys(self.stats, 0)
+
+        snapshots = await self.process_snapshots()
+        for snapshot in snapshots:
+            if snapshot.get('live_generation') == self.live_generation:
+                live.merge(snapshot['live'])
+            for name, state in snapshot['candidates'].items():
+                if name in candidates:
+                    candidates[name].merge(state)
+            for key in totals:
+                totals[key] += snapshot['stats'].get(key, 0)
+
+        return {
+            'sample_rate': self.sample_rate,
+            'alert_threshold': self.threshold,
+            'processes': len(snapshots),
+            'live': live.to_dict(compared=False),
+            'candidates': {
+                name: {
+                    'added_at': self.added_at.get(name),
+                    **stats.to_dict(compared=True)
+                }
+                for name, stats in candidates.items()
+            },
+            **totals
+        }
+
+    async def start(self):
+        """Follow candidate changes and share the counters periodically"""
+        if self.is_running:
+            return
+        self.is_running = True
+        if self.control_state:
+            self.control_state.subscribe(self.on_control_change)
+        self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while self.is_running:
+            try:
+                await asyncio.sleep(self.stats_interval)
+                if self.recorded:
+                    await self.share()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Shadow stats loop failed: {str(e)}")
+
+    async def stop(self):
+        self.is_running = False
+        tasks = list(self.tasks)
+        if self.task:
+            tasks.append(self.task)
+            self.task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self.recorded:
+            await self.share()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,204 @@
+"""
+Status Aggregator
+Probes the service's dependencies in the background and keeps the last
+snapshot, so status endpoints never wait on a dependency
+"""
+
+import logging
+from typing import Dict, Any, Callable, Awaitable, Optional
+from datetime import datetime
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Component states that do not make the service degraded
+OK_STATES = ('healthy', 'disabled')
+
+# Probe fields that change on every probe and are left out of the ETag
+VOLATILE_FIELDS = ('latency_ms', 'checked_at')
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith('W/') else tag
+
+    return opaque(etag) in {opaque(tag) for tag in if_none_match.split(',')}
+
+
+class StatusAggregator:
+    """
+    Runs registered probes concurrently every `interval` seconds, each with
+    a `timeout`, and keeps the resulting snapshot in memory.
+
+    A probe is an async callable returning a dict with a 'status' (healthy,
+    degraded, down or disabled) plus any details; a probe that raises is
+    reported as down and one that times out as timeout, so a hung
+    dependency costs at most `timeout` per refresh and never delays a reader.
+
+    Each snapshot carries a weak ETag over its content (without probe
+    latencies and times), which only changes when some component changes,
+    so clients polling with If-None-Match get 304s in between.
+
+    While the service warms up in the background, a component whose startup
+    step has not finished is reported as starting (or down if it failed)
+    without being probed, and snapshots are refreshed every
+    `warmup_interval` seconds until it is ready.
+    """
+
+    def __init__(self, events=None, warmup=None):
+        self.events = events  # Live dashboard events (EventBroadcaster)
+        self.warmup = warmup  # Background startup steps (Warmup)
+        self.warmup_interval = min(0.5, float(os.getenv('AEGIS_STATUS_INTERVAL_SECONDS', 10)))
+        self.interval = float(os.getenv('AEGIS_STATUS_INTERVAL_SECONDS', 10))
+        self.timeout = float(os.getenv('AEGIS_STATUS_PROBE_TIMEOUT', 2))
+        self.probes = {}  # name -> async probe
+        self.started_at = time.time()
+
+        self.snapshot = {
+            'status': 'starting',
+            'components': {},
+            'checked_at': None,
+            'version': 0,
+            'ready': False
+        }
+        self.digest = '0'  # Content hash of the snapshot
+
+        self.is_running = False
+        self.task = None
+
+        self.stats = {
+            'refreshes': 0,
+            'probe_failures': 0,
+            'probe_timeouts': 0
+        }
+
+    @property
+    def etag(self) -> str:
+        return f'W/"{self.digest}"'
+
+    def register(self, name: str, probe: Callable[[], Awaitable[Dict[str, Any]]]):
+        self.probes[name] = probe
+
+    @property
+    def is_ready(self) -> bool:
+        return self.warmup is None or self.warmup.is_ready
+
+    def uptime(self) -> float:
+        """Seconds since the aggregator was created (process start)"""
+        return time.time() - self.started_at
+
+    async def run_probe(self, name: str, probe: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        step = self.warmup.components.get(name) if self.warmup else None
+        if step and step['status'] != 'ready':
+            return {**step, 'latency_ms': 0.0, 'checked_at': datetime.utcnow().isoformat()}
+
+        try:
+            result = await asyncio.wait_for(probe(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.stats['probe_timeouts'] += 1
+            result = {'status': 'timeout', 'error': f"No response in {self.timeout}s"}
+        except Exception as e:
+            self.stats['probe_failures'] += 1
+            result = {'status': 'down', 'error': str(e)}
+
+        return {
+            **result,
+            'latency_ms': round((time.perf_counter() - started) * 1000, 2),
+            'checked_at': datetime.utcnow().isoformat()
+        }
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Probe every component and publish a new snapshot"""
+        names = list(self.probes)
+        results = await asyncio.gather(*(self.run_probe(name, self.probes[name]) for name in names))
+        components = dict(zip(names, results))
+
+        ready = self.is_ready
+        ok = all(c['status'] in OK_STATES for c in components.values())
+        if any(c['status'] == 'starting' for c in components.values()) or (ok and not ready):
+            overall = 'starting'
+        else:
+            overall = 'healthy' if ok else 'degraded'
+
+        stable = {
+            'status': overall,
+            'ready': ready,
+            'components': {
+                name: {key: value for key, value in component.items() if key not in VOLATILE_FIELDS}
+                for name, component in components.items()
+            }
+        }
+        digest = hashlib.sha1(json.dumps(stable, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+        version = self.snapshot['version']
+        if digest != self.digest:
+            version += 1
+            if overall != self.snapshot['status']:
+                logger.info(f"🩺 Status: {self.snapshot['status']} → {overall}")
+
+        # Readers hold a reference to the previous snapshot; it is replaced, never mutated
+        self.snapshot = {
+            'status': overall,
+            'components': components,
+            'checked_at': datetime.utcnow().isoformat(),
+            'version': version,
+            'ready': ready
+        }
+        if digest != self.digest and self.events:
+            self.events.publish('status', {
+                'status': overall,
+                'ready': ready,
+                'version': version,
+                'components': {name: component['status'] for name, component in components.items()}
+            }, key='status')
+        self.digest = digest
+        self.stats['refreshes'] += 1
+        return self.snapshot
+
+    async def start(self):
+        if self.is_running:
+            return
+        self.is_running = True
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        self.is_running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def run(self):
+        while self.is_running:
+            try:
+                await self.refresh()
+                await asyncio.sleep(self.interval if self.is_ready else self.warmup_interval)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Status refresh failed: {str(e)}")
+                await asyncio.sleep(self.interval)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get status aggregator statistics"""
+        return {
+            **self.stats,
+            'status': self.snapshot['status'],
+            'version': self.snapshot['version'],
+            'probes': list(self.probes)
+        }
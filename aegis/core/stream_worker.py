@@ -0,0 +1,156 @@
+"""
+Stream Worker
+Consumer-group worker pool that processes ingestion batches from Redis Streams
+"""
+
+import logging
+from typing import Dict, Any, List, Callable, Awaitable
+import asyncio
+import os
+import socket
+
+logger = logging.getLogger(__name__)
+
+
+class StreamWorker:
+    """
+    Pool of stream consumers running the processing pipeline
+
+    Entries are acknowledged only after their handler returns, so batches
+    held by a crashed consumer stay pending and are reclaimed by a live one.
+    Handlers raise when a batch could not be stored or scored (the
+    processors are called with raise_errors), so such batches are retried
+    too; entries that keep failing are moved to a dead-letter stream.
+    """
+
+    def __init__(
+        self,
+        stream_bus,
+        handlers: Dict[str, Callable[[List[Dict[str, Any]]], Awaitable[None]]]
+    ):
+        self.bus = stream_bus
+        self.handlers = handlers
+        self.is_running = False
+        self.tasks = []
+
+        # Pool configuration
+        self.consumers = int(os.getenv('AEGIS_STREAM_CONSUMERS', 4))
+        self.batch_size = int(os.getenv('AEGIS_STREAM_BATCH', 10))
+        self.block_ms = int(os.getenv('AEGIS_STREAM_BLOCK_MS', 5000))
+        self.claim_idle_ms = int(os.getenv('AEGIS_STREAM_CLAIM_IDLE_MS', 60000))
+        self.claim_interval = int(os.getenv('AEGIS_STREAM_CLAIM_INTERVAL', 15))  # seconds
+        self.max_deliveries = int(os.getenv('AEGIS_STREAM_MAX_DELIVERIES', 5))
+
+        self.name_prefix = f"{socket.gethostname()}-{os.getpid()}"
+
+        self.stats = {
+            'entries_processed': 0,
+            'events_processed': 0,
+            'entries_failed': 0,
+            'entries_reclaimed': 0
+        }
+
+    async def start(self):
+        """Create consumer groups and start the consumer tasks"""
+        if self.is_running:
+            logger.warning("Stream worker already running")
+            return
+
+        logger.info(f"🔁 Starting stream worker with {self.consumers} consumers...")
+        await self.bus.ensure_groups()
+        self.is_running = True
+
+        for i in range(self.consumers):
+            consumer = f"{self.name_prefix}-{i}"
+            self.tasks.append(asyncio.create_task(self.consume_loop(consumer)))
+
+        self.tasks.append(asyncio.create_task(self.reclaim_loop(f"{self.name_prefix}-reclaim")))
+
+        logger.info("✅ Stream worker started")
+
+    async def stop(self):
+        """Stop all consumer tasks (unacked entries stay pending for reclaim)"""
+        logger.info("🛑 Stopping stream worker...")
+        self.is_running = False
+
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+        logger.info("✅ Stream worker stopped")
+
+    async def consume_loop(self, consumer: str):
+        """Read and process new entries for one consumer"""
+        while self.is_running:
+            try:
+                entries = await self.bus.read(consumer, count=self.batch_size, block_ms=self.block_ms)
+
+                for kind, entry_id, fields in entries:
+                    await self.handle_entry(kind, entry_id, fields)
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Stream consumer {consumer} error: {str(e)}")
+                await asyncio.sleep(1)
+
+    async def reclaim_loop(self, consumer: str):
+        """Periodically take over entries stuck on dead consumers"""
+        while self.is_running:
+            try:
+                await asyncio.sleep(self.claim_interval)
+
+                for kind in self.bus.KINDS:
+                    claimed = await self.bus.reclaim(
+                        kind, consumer, self.claim_idle_ms, count=self.batch_size
+                    )
+
+                    for entry_id, fields, deliveries in claimed:
+                        self.stats['entries_reclaimed'] += 1
+
+                        if deliveries > self.max_deliveries:
+                            await self.bus.dead_letter(
+                                kind, entry_id, fields,
+                                reason=f"delivered {deliveries} times"
+                            )
+                            continue
+
+                        logger.warning(f"♻️  Reclaimed {kind} entry {entry_id} (delivery {deliveries})")
+                        await self.handle_entry(kind, entry_id, fields)
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Stream reclaim error: {str(e)}")
+
+    async def handle_entry(self, kind: str, entry_id: str, fields: Dict[str, str]):
+        """Run the handler for one entry and acknowledge it on success"""
+        handler = self.handlers.get(kind)
+
+        if handler is None:
+            await self.bus.dead_letter(kind, entry_id, fields, reason=f"no handler for {kind}")
+            return
+
+        try:
+            payloads = self.bus.decode_entry(fields)
+            await handler(payloads)
+
+        except Exception as e:
+            # Left pending: the reclaim loop retries it after claim_idle_ms
+            self.stats['entries_failed'] += 1
+            logger.error(f"❌ Failed to process {kind} entry {entry_id}: {str(e)}")
+            return
+
+        await self.bus.ack(kind, [entry_id])
+        self.stats['entries_processed'] += 1
+        self.stats['events_processed'] += len(payloads)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get stream worker statistics"""
+        return {
+            'is_running': self.is_running,
+            'consumers': self.consumers,
+            **self.stats,
+            'bus': self.bus.get_stats()
+        }
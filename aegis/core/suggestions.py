@@ -0,0 +1,384 @@
+"""
+Suggestion Store
+Healing actions proposed in suggest mode, waiting for an administrator
+In-memory priority index over the suggestions collection in MongoDB
+"""
+
+import logging
+from typing import Dict, Any, Optional, Tuple
+from datetime import datetime
+import asyncio
+import base64
+import heapq
+import json
+import os
+import time
+import uuid
+
+from sortedcontainers import SortedList
+
+logger = logging.getLogger(__name__)
+
+# Event fields kept as the context of a suggestion
+CONTEXT_FIELDS = ('sessionId', 'eventType', 'eventName', 'timestamp', 'performance', 'error', 'metadata')
+
+
+def iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts).isoformat()
+
+
+class SuggestionStore:
+    """
+    Pending suggestions ordered by confidence (highest first), then age
+    (oldest first)
+
+    The pending set is kept as a SortedList of priority keys, so pages
+    are a binary search plus a slice, and adding or removing a key is
+    O(log n). Expiry uses a min-heap of expiry times: suggestions not seen
+    again for `ttl` seconds are expired (popped lazily, on reads and on
+    every sync).
+
+    A suggestion for the same action, anomaly type and target as a pending
+    one is merged into it (occurrences, highest confidence, expiry pushed
+    back), so an incident produces one suggestion per distinct action.
+
+    Every change is written to MongoDB: new, merged and expired suggestions
+    are flushed in bulk every sync_interval seconds, and changes a flush
+    could not store are kept for the next one. Merges add their
+    occurrences and keep the highest confidence and expiry, and only apply
+    while the suggestion is pending, so concurrent merges from several
+    processes add up and never undo a decision. Decisions are a conditional
+    update on the pending status: when processes race, exactly one wins.
+    A suggestion not stored yet exists only in this process, so it is
+    decided locally and stored decided by a later flush.
+    Each process also reads suggestions changed by other processes
+    (index on updated_at), so an API process sees suggestions created by
+    stream workers.
+    """
+
+    def __init__(self, db_manager, executor=None, events=None):
+        self.db = db_manager
+        self.executor = executor  # AutoHealer running approved actions
+        self.events = events  # Live dashboard events (EventBroadcaster)
+        self.ttl = float(os.getenv('AEGIS_SUGGESTION_TTL_MINUTES', 60)) * 60
+        self.sync_interval = float(os.getenv('AEGIS_SUGGESTION_SYNC_SECONDS', 2))
+
+        self.pending = {}   # id -> suggestion
+        self.order = SortedList()  # Priority keys of pending suggestions
+        self.expiry = []    # Heap of (expires_ts, id); stale entries are skipped
+        self.open = {}      # (type, anomaly_type, target) -> pending id
+        self.dirty = {}     # id -> suggestion not yet written to MongoDB
+        self.unsaved = set()  # Ids of dirty suggestions not stored yet at all
+        self.merged = {}    # id -> occurrences merged since the last flush
+        self.synced_until = None
+
+        self.is_running = False
+        self.task = None
+
+        self.stats = {
+            'created': 0,
+            'merged': 0,
+            'approved': 0,
+            'rejected': 0,
+            'expired': 0
+        }
+
+    @staticmethod
+    def priority(suggestion: Dict[str, Any]) -> Tuple[float, float, str]:
+        return (-suggestion['confidence'], suggestion['created_ts'], suggestion['id'])
+
+    @staticmethod
+    def dedupe_key(suggestion: Dict[str, Any]) -> Tuple[str, str, str]:
+        return (suggestion['type'], suggestion['anomaly_type'], suggestion['target'])
+
+    @staticmethod
+    def encode_cursor(key: Tuple[float, float, str]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[float, float, str]:
+        try:
+            confidence, created_ts, suggestion_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return (float(confidence), float(created_ts), str(suggestion_id))
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+    @staticmethod
+    def public(suggestion: Dict[str, Any]) -> Dict[str, Any]:
+        """Suggestion as returned by the API"""
+        return {
+            key: value for key, value in suggestion.items()
+            if key not in ('created_ts', 'expires_ts', 'updated_at')
+        }
+
+    def index(self, suggestion: Dict[str, Any]):
+        self.pending[suggestion['id']] = suggestion
+        self.order.add(self.priority(suggestion))
+        heapq.heappush(self.expiry, (suggestion['expires_ts'], suggestion['id']))
+        self.open[self.dedupe_key(suggestion)] = suggestion['id']
+
+    def unindex(self, suggestion: Dict[str, Any]):
+        self.pending.pop(suggestion['id'], None)
+        self.order.discard(self.priority(suggestion))
+        if self.open.get(self.dedupe_key(suggestion)) == suggestion['id']:
+            del self.open[self.dedupe_key(suggestion)]
+
+    def touch(self, suggestion: Dict[str, Any]):
+        """Queue a suggestion for the next MongoDB flush"""
+        self.dirty[suggestion['id']] = suggestion
+        self.announce(suggestion)
+
+    def announce(self, suggestion: Dict[str, Any]):
+        if self.events:
+            self.events.publish('suggestion', self.public(suggestion), key=suggestion['id'])
+
+    async def add(
+        self,
+        action: str,
+        anomaly_type: str,
+        target: str,
+        reason: str,
+        confidence: float,
+        context: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Record a suggested action (merged into a pending duplicate)"""
+        now = time.time()
+        self.expire(now)
+
+        existing = self.pending.get(self.open.get((action, anomaly_type, target)))
+        if existing is not None:
+            if confidence > existing['confidence']:
+                self.unindex(existing)
+                existing['confidence'] = confidence
+                self.index(existing)
+            existing['occurrences'] += 1
+            existing['last_seen_at'] = iso(now)
+            existing['expires_ts'] = now + self.ttl
+            existing['expires_at'] = iso(existing['expires_ts'])
+            heapq.heappush(self.expiry, (existing['expires_ts'], existing['id']))
+            self.merged[existing['id']] = self.merged.get(existing['id'], 0) + 1
+
+            self.stats['merged'] += 1
+            self.touch(existing)
+            return existing
+
+        suggestion = {
+            'id': f"sug_{uuid.uuid4().hex[:12]}",
+            'type': action,
+            'anomaly_type': anomaly_type,
+            'target': target,
+            'reason': reason,
+            'confidence': float(confidence),
+            'occurrences': 1,
+            'status': 'pending',
+            'context': {key: (context or {}).get(key) for key in CONTEXT_FIELDS if (context or {}).get(key) is not None},
+            'created_at': iso(now),
+            'last_seen_at': iso(now),
+            'expires_at': iso(now + self.ttl),
+            'created_ts': now,
+            'expires_ts': now + self.ttl
+        }
+        self.index(suggestion)
+        self.stats['created'] += 1
+        self.unsaved.add(suggestion['id'])
+        self.touch(suggestion)
+
+        logger.info(f"💡 Suggestion {suggestion['id']}: {action} for {anomaly_type} on {target}")
+        return suggestion
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Expire pending suggestions past their expiry time"""
+        now = now or time.time()
+        expired = 0
+
+        while self.expiry and self.expiry[0][0] <= now:
+            expires_ts, suggestion_id = heapq.heappop(self.expiry)
+            suggestion = self.pending.get(suggestion_id)
+            if suggestion is None or suggestion['expires_ts'] != expires_ts:
+                continue  # Decided, or pushed back by a newer occurrence
+
+            self.unindex(suggestion)
+            suggestion['status'] = 'expired'
+            suggestion['decided_at'] = iso(now)
+            self.touch(suggestion)
+            expired += 1
+
+        if expired:
+            self.stats['expired'] += expired
+            logger.info(f"⌛ {expired} suggestions expired")
+        return expired
+
+    def page(self, limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Pending suggestions in priority order, after an optional cursor"""
+        self.expire()
+
+        start = 0
+        if cursor:
+            after = self.decode_cursor(cursor)
+            start = self.order.bisect_left(after)
+            if start < len(self.order) and self.order[start] == after:
+                start += 1
+
+        keys = self.order[start:start + limit]
+        has_more = start + limit < len(self.order)
+
+        return {
+            'suggestions': [self.public(self.pending[key[2]]) for key in keys],
+            'next_cursor': self.encode_cursor(keys[-1]) if keys and has_more else None,
+            'total': len(self.order)
+        }
+
+    async def get(self, suggestion_id: str) -> Optional[Dict[str, Any]]:
+        """A suggestion in any status (decided ones are read from MongoDB)"""
+        suggestion = self.pending.get(suggestion_id) or self.dirty.get(suggestion_id)
+        if suggestion is None:
+            suggestion = await self.db.get_suggestion(suggestion_id)
+        return suggestion
+
+    async def decide(self, suggestion_id: str, status: str, feedback: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Move a pending suggestion to approved/rejected
+        Raises KeyError if it does not exist, ValueError if it is no longer
+        pending (decided or expired, by this or any other process)
+        """
+        self.expire()
+        if suggestion_id in self.dirty:
+            await self.flush()  # Stored (or expired) before it is decided
+
+        decided_at = datetime.now().isoformat()
+        if self.db.is_connected and suggestion_id not in self.unsaved:
+            suggestion = await self.db.decide_suggestion(suggestion_id, status, feedback, decided_at)
+            known = suggestion or await self.db.get_suggestion(suggestion_id)
+        else:
+            # Not stored (no MongoDB, or the flush failed): the suggestion
+            # only exists in this process, and a later flush stores the decision
+            suggestion = self.pending.get(suggestion_id)
+            if suggestion is not None:
+                suggestion.update(status=status, feedback=feedback, decided_at=decided_at)
+                self.dirty[suggestion_id] = suggestion
+            known = suggestion or await self.get(suggestion_id)
+
+        if known is None:
+            raise KeyError(suggestion_id)
+
+        local = self.pending.get(suggestion_id)
+        if local is not None and known['status'] != 'pending':
+            self.unindex(local)
+        if suggestion is None:
+            raise ValueError(f"Suggestion {suggestion_id} is already {known['status']}")
+
+        self.stats[status] += 1
+        self.announce(suggestion)
+        return suggestion
+
+    async def approve(self, suggestion_id: str, feedback: Optional[str] = None) -> Dict[str, Any]:
+        """Approve a suggestion and run its action"""
+        suggestion = await self.decide(suggestion_id, 'approved', feedback)
+
+        if self.executor is not None:
+            suggestion['executed'] = bool(await self.executor.handle_anomaly(
+                suggestion['anomaly_type'], suggestion['context'], approved=True
+            ))
+            await self.db.update_suggestion(suggestion_id, {'executed': suggestion['executed']})
+        return suggestion
+
+    async def reject(self, suggestion_id: str, feedback: Optional[str] = None) -> Dict[str, Any]:
+        return await self.decide(suggestion_id, 'rejected', feedback)
+
+    def apply(self, document: Dict[str, Any]):
+        """Apply a suggestion written by another process"""
+        if document['id'] in self.dirty:
+            return  # Local changes are newer
+
+        local = self.pending.get(document['id'])
+        if local is not None:
+            self.unindex(local)
+
+        if document['status'] == 'pending' and document['expires_ts'] > time.time():
+            self.index(document)
+
+    async def load(self):
+        """Index the pending suggestions stored in MongoDB"""
+        # Later changes are read by sync()
+        self.synced_until = datetime.utcnow()
+        for document in await self.db.get_suggestions(status='pending'):
+            self.apply(document)
+        self.expire()
+        if self.pending:
+            logger.info(f"📦 {len(self.pending)} pending suggestions loaded")
+
+    async def flush(self) -> bool:
+        """
+        Write new, merged, expired and locally decided suggestions in one
+        bulk write; the changes not stored are queued again (returns False)
+        """
+        if not self.dirty:
+            return True
+        dirty, merged, unsaved = self.dirty, self.merged, self.unsaved
+        self.dirty, self.merged, self.unsaved = {}, {}, set()
+
+        inserts, merges, expirations, decisions = [], [], [], []
+        for suggestion_id, suggestion in dirty.items():
+            if suggestion_id in unsaved:
+                inserts.append(suggestion)  # Includes its merges and decision so far
+            elif suggestion['status'] == 'expired':
+                expirations.append(suggestion)
+            elif suggestion['status'] != 'pending':
+                decisions.append(suggestion)
+            elif merged.get(suggestion_id):
+                merges.append({**suggestion, 'occurrences': merged[suggestion_id]})
+
+        failed = await self.db.write_suggestions(inserts, merges, expirations, decisions)
+        for suggestion_id in failed:
+            # Changes made during the write are newer and include these
+            self.dirty.setdefault(suggestion_id, dirty[suggestion_id])
+            if merged.get(suggestion_id):
+                self.merged[suggestion_id] = self.merged.get(suggestion_id, 0) + merged[suggestion_id]
+            if suggestion_id in unsaved:
+                self.unsaved.add(suggestion_id)
+        return not failed
+
+    async def sync(self):
+        """Flush local changes and read changes made by other processes"""
+        self.expire()
+        await self.flush()
+
+        documents = await self.db.get_suggestions(updated_since=self.synced_until)
+        for document in documents:
+            self.apply(document)
+        if documents:
+            self.synced_until = documents[-1]['updated_at']
+
+    async def start(self):
+        if self.is_running:
+            return
+        self.is_running = True
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        self.is_running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+
+    async def run(self):
+        while self.is_running:
+            try:
+                await asyncio.sleep(self.sync_interval)
+                await self.sync()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"❌ Suggestion sync failed: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get suggestion statistics"""
+        return {
+            **self.stats,
+            'pending': len(self.pending)
+        }
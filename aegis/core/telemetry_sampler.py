@@ -0,0 +1,163 @@
+"""
+Telemetry Sampler
+Deterministic per-session sampling of telemetry at the edge of ingestion,
+applied to the raw request body before any event is validated
+"""
+
+import logging
+from typing import Dict, Any, List, Tuple, AsyncIterator
+import json
+import re
+import zlib
+
+logger = logging.getLogger(__name__)
+
+HASH_SPACE = 1 << 32
+
+# First "sessionId" of an NDJSON line (the raw, still escaped string)
+SESSION_ID = re.compile(rb'"sessionId"\s*:\s*"((?:[^"\\]|\\.)*)"')
+SESSION_KEY = b'"sessionId"'
+
+
+def session_hash(session_id: str) -> int:
+    """CRC-32 of the session id; a session is kept when hash < rate * 2^32"""
+    return zlib.crc32(session_id.encode('utf-8'))
+
+
+class TelemetrySampler:
+    """
+    Keeps whole sessions: an event is kept when the CRC-32 of its sessionId
+    falls below rate * 2^32, so every process (and a client SDK computing
+    the same hash) keeps the same sessions for a given rate, and lowering
+    the rate only drops sessions.
+
+    Kept events get sampleWeight = 1 / rate, so counts can be extrapolated
+    by summing weights.
+
+    Bodies are either a JSON array (parsed with the C decoder, then
+    filtered) or NDJSON, one event per line, read as the body streams in:
+    the sessionId is matched on the raw line and only kept lines are
+    decoded, so dropped events cost a regex search.
+    """
+
+    def __init__(self, control_state=None):
+        self.control_state = control_state  # telemetry_enabled / telemetry_samplerate
+        self.stats = {
+            'batches': 0,
+            'received': 0,
+            'kept': 0
+        }
+
+    @property
+    def rate(self) -> float:
+        """Current sample rate (0 when telemetry is disabled)"""
+        if self.control_state is None:
+            return 1.0
+        state = self.control_state.state
+        return state.telemetry_samplerate if state.telemetry_enabled else 0.0
+
+    @staticmethod
+    def cutoff(rate: float) -> int:
+        return int(rate * HASH_SPACE)
+
+    def record(self, received: int, kept: int):
+        self.stats['batches'] += 1
+        self.stats['received'] += received
+        self.stats['kept'] += kept
+
+    @staticmethod
+    def weigh(events: List[Any], rate: float) -> List[Any]:
+        """Set sampleWeight on kept events (overriding any client value)"""
+        if not events:
+            return events
+
+        weight = 1.0 / rate
+        for event in events:
+            if isinstance(event, dict):
+                event['sampleWeight'] = weight
+        return events
+
+    def sample_events(self, events: List[Dict[str, Any]], rate: float) -> List[Dict[str, Any]]:
+        """Filter decoded events by session"""
+        if rate >= 1.0:
+            return events
+
+        cutoff = self.cutoff(rate)
+        return [event for event in events if session_hash(str(event.get('sessionId', ''))) < cutoff]
+
+    def sample_array(self, body: bytes, rate: float) -> Tuple[List[Dict[str, Any]], int]:
+        """Sample a JSON array body; returns (kept events, events received)"""
+        events = json.loads(body)
+        if not isinstance(events, list):
+            raise ValueError("Expected a JSON array of telemetry events")
+        # Rejected at any rate, like a non-object NDJSON line
+        for index, event in enumerate(events):
+            if not isinstance(event, dict):
+                raise ValueError(f"Expected a JSON object for each telemetry event (item {index})")
+
+        kept = self.weigh(self.sample_events(events, rate), rate)
+        self.record(len(events), len(kept))
+        return kept, len(events)
+
+    @staticmethod
+    def is_top_level(line: bytes, start: int) -> bool:
+        """
+        Whether a key at `start` is in the line's outer object: nothing before
+        it opens another object or array (a brace inside a string only makes
+        this answer False, and the line is then decoded)
+        """
+        prefix = line[:start]
+        return prefix.count(b'{') == 1 and b'[' not in prefix and prefix.lstrip().startswith(b'{')
+
+    def sample_line(self, line: bytes, cutoff: int) -> bool:
+        """
+        Whether an NDJSON line belongs to a kept session
+        Decided on the raw bytes when the line has a single sessionId key and
+        it is a top-level one; otherwise (nested, repeated, not a string) the
+        line is decoded. Raises ValueError if it is not a JSON object
+        """
+        match = SESSION_ID.search(line)
+        if match is not None and line.count(SESSION_KEY) == 1 and self.is_top_level(line, match.start()):
+            raw = match.group(1)
+            session_id = json.loads(b'"' + raw + b'"') if b'\\' in raw else raw.decode('utf-8')
+        else:
+            event = json.loads(line)
+            if not isinstance(event, dict):
+                raise ValueError("Expected a JSON object on each NDJSON line")
+            session_id = event.get('sessionId', '')
+        return session_hash(str(session_id)) < cutoff
+
+    async def sample_ndjson(self, chunks: AsyncIterator[bytes], rate: float) -> Tuple[List[Dict[str, Any]], int]:
+        """Sample an NDJSON body while it streams in; returns (kept events, events received)"""
+        cutoff = self.cutoff(rate)
+        kept_lines = []
+        received = 0
+
+        def offer(lines: List[bytes]):
+            nonlocal received
+            for line in lines:
+                if not line.strip():
+                    continue
+                received += 1
+                if rate >= 1.0 or self.sample_line(line, cutoff):
+                    kept_lines.append(line)
+
+        pending = b''
+        async for chunk in chunks:
+            lines = (pending + chunk).split(b'\n')
+            pending = lines.pop()  # Incomplete last line, continued by the next chunk
+            offer(lines)
+        offer([pending])
+
+        # Kept lines are decoded together, in one call to the C decoder
+        kept = self.weigh(json.loads(b'[' + b','.join(kept_lines) + b']'), rate)
+        self.record(received, len(kept))
+        return kept, received
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get sampling statistics"""
+        return {
+            **self.stats,
+            'rate': self.rate,
+            'kept_fraction': self.stats['kept'] / self.stats['received'] if self.stats['received'] else None
+        }
@@ -0,0 +1,166 @@
+"""
+Training Set Builder
+Bounded-memory training samples from arbitrarily long event streams
+Features are extracted chunk by chunk into a reused buffer and kept in a
+stratified reservoir sample (one reservoir per segment)
+"""
+
+import logging
+from typing import Dict, Any, List, Optional, Callable, Tuple
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Stratum of events without a segment
+DEFAULT_STRATUM = ''
+
+
+class Reservoir:
+    """
+    Uniform sample of up to `capacity` feature rows from a stream
+    (Algorithm R, applied a chunk at a time)
+    """
+
+    def __init__(self, capacity: int, n_features: int):
+        self.capacity = capacity
+        self.rows = np.empty((capacity, n_features))
+        self.size = 0
+        self.seen = 0
+
+    def add(self, X: np.ndarray, rng: np.random.Generator):
+        """Offer a chunk of rows; each row ends up kept with probability capacity / seen"""
+        # Fill free slots first
+        free = min(self.capacity - self.size, len(X))
+        if free:
+            self.rows[self.size:self.size + free] = X[:free]
+            self.size += free
+
+        rest = X[free:]
+        if len(rest):
+            # Row t of the stream replaces a random slot with probability capacity / (t + 1)
+            positions = self.seen + free + np.arange(len(rest))
+            slots = rng.integers(0, positions + 1)
+            keep = slots < self.capacity
+
+            # When a slot is drawn twice in one chunk, the later row wins
+            slots, rows = slots[keep][::-1], np.flatnonzero(keep)[::-1]
+            slots, first = np.unique(slots, return_index=True)
+            self.rows[slots] = rest[rows[first]]
+
+        self.seen += len(X)
+
+    def shrink(self, capacity: int, rng: np.random.Generator):
+        """Reduce capacity, keeping a uniform subsample (still a uniform sample of the stream)"""
+        if capacity >= self.capacity:
+            return
+
+        if self.size > capacity:
+            kept = rng.choice(self.size, capacity, replace=False)
+            self.rows[:capacity] = self.rows[kept]
+            self.size = capacity
+
+        self.rows = self.rows[:capacity].copy()
+        self.capacity = capacity
+
+    def sample(self) -> np.ndarray:
+        return self.rows[:self.size]
+
+
+class TrainingSetBuilder:
+    """
+    Stratified reservoir sample of feature rows
+
+    The sample budget is split equally between the strata seen so far;
+    when a new stratum appears the existing reservoirs shrink to make room.
+    Equal allocation keeps rare segments represented (each segment model
+    needs its own rows), so the combined sample over-weights small segments
+    relative to their share of traffic.
+
+    Memory is bounded by sample_size rows plus one chunk, however long the
+    stream is.
+    """
+
+    def __init__(
+        self,
+        extract: Callable[[List[Dict[str, Any]], Optional[np.ndarray]], np.ndarray],
+        n_features: int,
+        sample_size: Optional[int] = None,
+        stratify: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None,
+        max_strata: Optional[int] = None,
+        seed: int = 42
+    ):
+        self.extract = extract  # (events, out buffer) -> feature matrix
+        self.n_features = n_features
+        self.sample_size = int(sample_size or os.getenv('AEGIS_TRAINING_SAMPLE_SIZE', 200000))
+        self.stratify = stratify
+        self.max_strata = int(max_strata or os.getenv('AEGIS_TRAINING_MAX_STRATA', 256))
+        self.rng = np.random.default_rng(seed)
+
+        self.reservoirs = {}
+        self.buffer = np.empty((0, n_features))
+        self.seen = 0
+
+    def stratum_capacity(self, strata: int) -> int:
+        return max(1, self.sample_size // max(1, strata))
+
+    def reservoir(self, stratum: str) -> Reservoir:
+        """Reservoir of a stratum, rebalancing the budget when it is new"""
+        reservoir = self.reservoirs.get(stratum)
+        if reservoir is not None:
+            return reservoir
+
+        # Beyond max_strata, new segments share the default stratum
+        if len(self.reservoirs) >= self.max_strata:
+            if DEFAULT_STRATUM in self.reservoirs:
+                return self.reservoirs[DEFAULT_STRATUM]
+            stratum = DEFAULT_STRATUM
+
+        capacity = self.stratum_capacity(len(self.reservoirs) + 1)
+        for existing in self.reservoirs.values():
+            existing.shrink(capacity, self.rng)
+
+        reservoir = self.reservoirs[stratum] = Reservoir(capacity, self.n_features)
+        return reservoir
+
+    def add(self, events: List[Dict[str, Any]]):
+        """Extract a chunk of events and offer its rows to the reservoirs"""
+        if not events:
+            return
+
+        if len(self.buffer) < len(events):
+            self.buffer = np.empty((len(events), self.n_features))
+        X = self.extract(events, self.buffer)
+
+        if self.stratify is None:
+            self.reservoir(DEFAULT_STRATUM).add(X, self.rng)
+        else:
+            strata = np.array([self.stratify(event) or DEFAULT_STRATUM for event in events], dtype=object)
+            for stratum in dict.fromkeys(strata):
+                self.reservoir(stratum).add(X[strata == stratum], self.rng)
+
+        self.seen += len(events)
+
+    def sample(self) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """Sampled rows and their strata (None for the default stratum)"""
+        if not self.reservoirs:
+            return np.empty((0, self.n_features)), []
+
+        X = np.vstack([reservoir.sample() for reservoir in self.reservoirs.values()])
+        strata = [
+            stratum or None
+            for stratum, reservoir in self.reservoirs.items()
+            for _ in range(reservoir.size)
+        ]
+        return X, strata
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'seen': self.seen,
+            'sampled': sum(reservoir.size for reservoir in self.reservoirs.values()),
+            'strata': {
+                stratum or 'default': {'seen': reservoir.seen, 'sampled': reservoir.size}
+                for stratum, reservoir in self.reservoirs.items()
+            }
+        }
@@ -0,0 +1,132 @@
+"""
+Warm-up
+Startup steps run in the background while the service already serves
+requests, and ingested batches held until they are done
+"""
+
+import logging
+from typing import Dict, Any, List, Tuple, Awaitable
+from collections import deque
+import asyncio
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """
+    Tracks named startup steps (database, redis, models, ...) as starting,
+    ready or down, so health checks can report each component while the
+    service warms up.
+
+    Batches ingested before the service is ready are held in memory, up to
+    `max_buffered` events (the oldest batches are dropped beyond that), and
+    handed back by finish() to be processed in arrival order.
+
+    If the warm-up fails (fail()), the held batches are dropped, hold()
+    refuses new ones and wait() raises, so nothing waits for a service
+    that will never be ready.
+    """
+
+    def __init__(self, steps: Tuple[str, ...] = ()):
+        self.max_buffered = int(os.getenv('AEGIS_WARMUP_BUFFER_EVENTS', 50000))
+        self.started_at = time.perf_counter()
+        self.components = {name: {'status': 'starting'} for name in steps}  # step -> {'status', 'seconds', 'error'}
+
+        self.buffered = deque()  # (kind, events) in arrival order
+        self.buffered_events = 0
+        self.ready = asyncio.Event()
+        self.done = asyncio.Event()  # Set when the warm-up finishes or fails
+        self.error = None
+
+        self.stats = {
+            'held_batches': 0,
+            'held_events': 0,
+            'dropped_events': 0,
+            'seconds': None
+        }
+
+    @property
+    def is_ready(self) -> bool:
+        return self.ready.is_set()
+
+    async def run(self, name: str, step: Awaitable) -> Any:
+        """Run a startup step, recording its status and duration"""
+        self.components[name] = {'status': 'starting'}
+        started = time.perf_counter()
+        try:
+            result = await step
+        except Exception as e:
+            self.components[name] = {'status': 'down', 'error': str(e)}
+            logger.error(f"❌ Startup step '{name}' failed: {str(e)}")
+            raise
+
+        seconds = round(time.perf_counter() - started, 3)
+        self.components[name] = {'status': 'ready', 'seconds': seconds}
+        logger.info(f"✅ {name} ready in {seconds:.2f}s")
+        return result
+
+    def hold(self, kind: str, events: List[Any]) -> bool:
+        """
+        Hold a batch until the service is ready (False once it is: process it now)
+        Raises RuntimeError if the warm-up failed
+        """
+        if self.error is not None:
+            raise RuntimeError(f"Service failed to start: {self.error}")
+        if self.is_ready:
+            return False
+
+        self.buffered.append((kind, events))
+        self.buffered_events += len(events)
+        self.stats['held_batches'] += 1
+        self.stats['held_events'] += len(events)
+
+        while self.buffered_events > self.max_buffered and len(self.buffered) > 1:
+            _, dropped = self.buffered.popleft()
+            self.buffered_events -= len(dropped)
+            self.stats['dropped_events'] += len(dropped)
+            logger.warning(f"⚠️  Warm-up buffer full, dropped a batch of {len(dropped)} events")
+        return True
+
+    def finish(self) -> List[Tuple[str, List[Any]]]:
+        """Mark the service ready and hand back the held batches, oldest first"""
+        batches = list(self.buffered)
+        self.buffered.clear()
+        self.buffered_events = 0
+        self.stats['seconds'] = round(time.perf_counter() - self.started_at, 3)
+        self.ready.set()
+        self.done.set()
+        return batches
+
+    def fail(self, error: str) -> int:
+        """Mark the warm-up failed, dropping the held batches; returns the events dropped"""
+        dropped = self.buffered_events
+        self.buffered.clear()
+        self.buffered_events = 0
+        self.stats['dropped_events'] += dropped
+        self.stats['seconds'] = round(time.perf_counter() - self.started_at, 3)
+        self.error = error
+
+        # Steps that had not completed will not be retried
+        for name, state in self.components.items():
+            if state['status'] == 'starting':
+                self.components[name] = {'status': 'down', 'error': f"Startup aborted: {error}"}
+        self.done.set()
+        return dropped
+
+    async def wait(self):
+        """Wait until the service is ready (RuntimeError if the warm-up failed)"""
+        await self.done.wait()
+        if self.error is not None:
+            raise RuntimeError(f"Service failed to start: {self.error}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get warm-up statistics"""
+        return {
+            **self.stats,
+            'ready': self.is_ready,
+            'error': self.error,
+            'buffered_events': self.buffered_events,
+            'components': {name: dict(state) for name, state in self.components.items()}
+        }
@@ -4,26 +4,26 @@ FastAPI service for anomaly detection, auto-healing, and UX optimization
 """
 
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from typing import List, Dict, Any, Optional, Literal
 import logging
 from datetime import datetime
+import asyncio
+import importlib
+import os
+import signal
 import uvicorn
 
-# Internal imports - Commented temporarily until implemented
-# from models.anomaly_detector import AnomalyDetector
-# from models.ux_optimizer import UXOptimizer
-# from models.sentiment_analyzer import SentimentAnalyzer
-# from core.auto_healer import AutoHealer
-# from core.monitor import SystemMonitor
-# from core.decision_engine import DecisionEngine
-# from utils.database import DatabaseManager
-# from utils.redis_manager import RedisManager
+# Internal imports for the processing pipeline are done inside
+# start_services() so the control-only deployment does not need the ML stack
 
 # Import control router for dashboard API
 from routers.control import router as control_router
+from core.status import etag_matches
 
 # Configure logging
 logging.basicConfig(
@@ -32,6 +32,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Service configuration
+LIFESPAN_MODE = os.getenv('AEGIS_LIFESPAN', 'control')  # control | full
+INGEST_MODE = os.getenv('AEGIS_INGEST_MODE', 'inline')  # inline | stream
+STARTUP_MODE = os.getenv('AEGIS_STARTUP_MODE', 'blocking')  # blocking | background
+PROCESS_ROLE = 'api'  # api | worker (set by worker.py before starting the services)
+# Background startup: shut down (exit code 1) if the warm-up fails, so the orchestrator restarts the process
+WARMUP_EXIT_ON_FAILURE = os.getenv('AEGIS_WARMUP_EXIT_ON_FAILURE', 'true').lower() == 'true'
+
 # Global instances
 ml_models = {}
 auto_healer = None
@@ -39,6 +47,410 @@ monitor = None
 decision_engine = None
 db_manager = None
 redis_manager = None
+stream_bus = None
+job_manager = None
+shadow_evaluator = None
+control_state = None
+telemetry_sampler = None
+suggestion_store = None
+status_aggregator = None
+event_broadcaster = None
+audit_log = None
+warmup = None
+model_reloads = set()  # Anomaly model reloads in flight (published by other processes)
+
+
+async def connect_stream_bus():
+    """
+    Connect the Redis Streams ingestion bus (stream ingest mode)
+    Reuses the Redis connection of the full service when available
+    """
+    global redis_manager, stream_bus
+
+    from utils.redis_manager import RedisManager
+    from utils.stream_bus import StreamBus
+
+    if redis_manager is None:
+        redis_manager = RedisManager()
+        await redis_manager.connect()
+
+    stream_bus = StreamBus(redis_manager)
+    logger.info(f"✅ Stream ingestion enabled ({stream_bus.prefix})")
+
+
+async def start_control_state():
+    """
+    Load the shared control-plane state (mode, pause, telemetry) and follow
+    its updates; local to the process when Redis is unavailable
+    """
+    global redis_manager, control_state, telemetry_sampler
+
+    from core.control_state import ControlStateStore
+    from core.telemetry_sampler import TelemetrySampler
+
+    if redis_manager is None:
+        try:
+            from utils.redis_manager import RedisManager
+            redis_manager = RedisManager()
+            await redis_manager.connect()
+        except ImportError as e:
+            logger.warning(f"⚠️  Redis client not installed ({str(e)})")
+            redis_manager = None
+
+    control_state = ControlStateStore(redis_manager)
+    await control_state.start()
+    app.state.control_state = control_state
+
+    # Telemetry is sampled at control_state.telemetry_samplerate on ingestion
+    telemetry_sampler = TelemetrySampler(control_state)
+
+
+async def start_event_broadcaster():
+    """
+    Live events for dashboards (/api/aegis/stream), relayed through Redis
+    between API processes and stream workers
+    """
+    global event_broadcaster
+
+    from core.events import EventBroadcaster
+
+    event_broadcaster = EventBroadcaster(redis_manager)
+    await event_broadcaster.start()
+    app.state.event_broadcaster = event_broadcaster
+
+    # Started first when warming up in the background
+    if status_aggregator is not None:
+        status_aggregator.events = event_broadcaster
+
+
+async def connect_database() -> bool:
+    """Connect MongoDB for the control API if the full service has not (False if the driver is missing)"""
+    global db_manager
+
+    if db_manager is None:
+        try:
+            from utils.database import DatabaseManager
+            db_manager = DatabaseManager()
+            await db_manager.connect()
+        except ImportError as e:
+            logger.warning(f"⚠️  MongoDB client not installed ({str(e)})")
+            db_manager = None
+    return db_manager is not None
+
+
+async def start_audit_log():
+    """
+    Audit log of control actions and automated healing, group-committed
+    to MongoDB (in memory only until it is connected)
+    """
+    global audit_log
+
+    from core.audit import AuditLog
+
+    audit_log = AuditLog(db_manager)
+    await audit_log.start()
+    app.state.audit_log = audit_log
+
+
+async def start_suggestion_store():
+    """
+    Load the pending suggestions of suggest mode and keep them in sync with
+    MongoDB (shared with stream workers and other API processes)
+    """
+    global suggestion_store
+
+    from core.auto_healer import AutoHealer
+    from core.suggestions import SuggestionStore
+
+    if not await connect_database():
+        return
+
+    # Approved suggestions run through the auto healer (a dedicated one in control-only mode)
+    executor = auto_healer or AutoHealer(db_manager, redis_manager, control_state, event_broadcaster, audit_log)
+    suggestion_store = SuggestionStore(db_manager, executor, event_broadcaster)
+    await suggestion_store.load()
+    await suggestion_store.start()
+    app.state.suggestion_store = suggestion_store
+
+
+async def probe_database() -> Dict[str, Any]:
+    if db_manager is None:
+        return {'status': 'disabled'}
+    if not db_manager.is_connected:
+        return {'status': 'down', 'error': 'Not connected'}
+    await db_manager.client.admin.command('ping')
+    return {'status': 'healthy'}
+
+
+async def probe_redis() -> Dict[str, Any]:
+    if redis_manager is None:
+        return {'status': 'disabled'}
+    if not redis_manager.is_connected:
+        return {'status': 'down', 'error': 'Not connected'}
+    await redis_manager.client.ping()
+    return {'status': 'healthy'}
+
+
+async def probe_models() -> Dict[str, Any]:
+    if not ml_models:
+        return {'status': 'disabled'}  # Control-only deployment
+    loaded = sorted(name for name, model in ml_models.items() if model.is_loaded)
+    return {'status': 'healthy' if len(loaded) == len(ml_models) else 'degraded', 'models_loaded': loaded}
+
+
+async def probe_stream_workers() -> Dict[str, Any]:
+    """Stream workers are separate processes: seen as consumers of the ingestion streams"""
+    if stream_bus is None:
+        return {'status': 'disabled'}
+    backlog = await stream_bus.get_backlog()
+    return {
+        'status': 'healthy' if backlog and all(b['consumers'] for b in backlog.values()) else 'degraded',
+        'streams': {kind: {'consumers': b['consumers'], 'pending': b['pending']} for kind, b in backlog.items()}
+    }
+
+
+async def probe_monitor() -> Dict[str, Any]:
+    if monitor is None:
+        return {'status': 'disabled'}
+    return {'status': 'healthy' if monitor.is_running else 'down', 'metrics': dict(monitor.metrics)}
+
+
+async def start_status_aggregator():
+    """
+    Probe dependencies in the background; /status and /aegis/v1/health
+    are served from the last snapshot
+    """
+    global status_aggregator
+
+    from core.status import StatusAggregator
+
+    status_aggregator = StatusAggregator(event_broadcaster, warmup)
+    status_aggregator.register('database', probe_database)
+    status_aggregator.register('redis', probe_redis)
+    status_aggregator.register('models', probe_models)
+    status_aggregator.register('stream_workers', probe_stream_workers)
+    status_aggregator.register('monitor', probe_monitor)
+    await status_aggregator.start()
+    app.state.status_aggregator = status_aggregator
+
+
+def start_job_manager():
+    """
+    Create the background job manager and register job runners
+    Jobs interrupted by a previous shutdown are loaded as resumable
+    """
+    global job_manager
+
+    from core.jobs import JobManager
+
+    job_manager = JobManager()
+    job_manager.register('bulk_sentiment', run_bulk_sentiment_job, validate_bulk_sentiment_job)
+    job_manager.register('retrain_anomaly', run_retrain_job)
+    job_manager.load()
+    app.state.job_manager = job_manager
+    logger.info("✅ Job manager ready")
+
+
+def validate_bulk_sentiment_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Bulk jobs submitted through the API only read and write files under AEGIS_BULK_DATA_DIR"""
+    from core.bulk_sentiment import validate_params
+
+    return validate_params(params, os.getenv('AEGIS_BULK_DATA_DIR', 'data/bulk'))
+
+
+async def run_bulk_sentiment_job(job):
+    """Runner for offline bulk sentiment jobs (never uses the per-request path)"""
+    if warmup is not None:
+        await warmup.wait()
+    from core.bulk_sentiment import BulkSentimentJob
+
+    return await BulkSentimentJob(db_manager, ml_models.get('sentiment')).run(job)
+
+
+async def run_retrain_job(job):
+    """Runner for anomaly detector retraining (hot-swaps the live model)"""
+    if warmup is not None:
+        await warmup.wait()
+    from core.retrain import RetrainJob
+
+    return await RetrainJob(db_manager, ml_models.get('anomaly'), shadow_evaluator, control_state).run(job)
+
+
+def stage(name: str, step):
+    """A startup step, tracked by the warm-up in background startup"""
+    return warmup.run(name, step) if warmup is not None else step
+
+
+async def attach_database():
+    """
+    Control-only mode: connect MongoDB in the background, so the API serves
+    without waiting for server selection; the audit log is stored and the
+    suggestion store started once the connection attempt completes
+    """
+    if not await connect_database():
+        return
+    audit_log.db = db_manager
+    await start_suggestion_store()
+
+
+async def start_database():
+    """Connect MongoDB; the audit log (started before it) is stored from then on"""
+    await connect_database()
+    audit_log.db = db_manager
+
+
+async def start_redis():
+    """Connect Redis, with the control state and live events shared between processes"""
+    await start_control_state()
+    await start_event_broadcaster()
+
+
+async def load_models(database: asyncio.Future):
+    """
+    Load the ML models
+    The ML stack (numpy, scikit-learn) is imported in a thread so the event
+    loop keeps serving; stored log templates are read once MongoDB is connected
+    """
+    global shadow_evaluator
+
+    await asyncio.to_thread(importlib.import_module, 'models')
+    from models import AnomalyDetector, OnlineAnomalyDetector, UXOptimizer, SentimentAnalyzer, LogTemplateMiner
+    from core.shadow import ShadowEvaluator
+
+    logger.info("📦 Loading ML models...")
+    # AEGIS_ANOMALY_MODE: "forest" (Isolation Forest, retrained) or "online" (streaming baseline)
+    if os.getenv('AEGIS_ANOMALY_MODE', 'forest') == 'online':
+        ml_models['anomaly'] = OnlineAnomalyDetector()
+    else:
+        ml_models['anomaly'] = AnomalyDetector()
+    ml_models['ux_optimizer'] = UXOptimizer()
+    ml_models['sentiment'] = SentimentAnalyzer()
+    ml_models['log_templates'] = LogTemplateMiner()
+
+    await asyncio.gather(
+        ml_models['anomaly'].load_model(),
+        ml_models['ux_optimizer'].load_model(),
+        ml_models['sentiment'].load_model()
+    )
+    await database
+    await ml_models['log_templates'].load_model(await db_manager.get_log_templates() if db_manager else [])
+    logger.info("✅ All ML models loaded")
+    app.state.ml_models = ml_models
+
+    # Candidate models scored on sampled live traffic (forest mode only)
+    if not ml_models['anomaly'].online:
+        shadow_evaluator = ShadowEvaluator(ml_models['anomaly'])
+        await shadow_evaluator.load()
+        app.state.shadow_evaluator = shadow_evaluator
+
+
+async def start_core_systems():
+    """Healing, decisions, suggestions and background monitoring"""
+    global auto_healer, monitor, decision_engine
+
+    from core.auto_healer import AutoHealer
+    from core.monitor import SystemMonitor
+    from core.decision_engine import DecisionEngine
+
+    auto_healer = AutoHealer(db_manager, redis_manager, control_state, event_broadcaster, audit_log)
+    monitor = SystemMonitor(db_manager, ml_models, event_broadcaster)
+    await start_suggestion_store()
+    decision_engine = DecisionEngine(ml_models, auto_healer, control_state, suggestion_store, event_broadcaster)
+    # The alert threshold is a control setting, the same in every process
+    ml_models['anomaly'].control_state = control_state
+    follow_model_updates()
+    if shadow_evaluator:
+        # Candidates added or removed by other processes, counters shared with them
+        shadow_evaluator.control_state = control_state
+        shadow_evaluator.redis = redis_manager
+        await shadow_evaluator.start()
+    logger.info("✅ Core systems initialized")
+
+    # Start background monitoring
+    await monitor.start()
+    logger.info("✅ Background monitoring started")
+
+
+def follow_model_updates():
+    """
+    Reload the models other processes publish through the control state:
+    the anomaly models (retrain jobs, shadow promotions) and, in an API
+    process handing ingestion to stream workers, the UX optimizer the
+    workers learn (each worker publishes the checkpoints it writes)
+    """
+    if control_state is None:
+        return
+
+    detector = ml_models.get('anomaly')
+    ux_optimizer = ml_models.get('ux_optimizer')
+    follow_anomaly = detector is not None and not detector.online
+    follow_ux = ux_optimizer is not None and INGEST_MODE == 'stream' and PROCESS_ROLE == 'api'
+    if ux_optimizer is not None and PROCESS_ROLE == 'worker':
+        ux_optimizer.control_state = control_state
+
+    def reload(coroutine):
+        task = asyncio.create_task(coroutine)
+        model_reloads.add(task)
+        task.add_done_callback(model_reloads.discard)
+
+    def on_change(state, changed):
+        if follow_anomaly and 'anomaly_model' in changed:
+            reload(detector.reload(state.anomaly_model))
+        if follow_anomaly and 'anomaly_segments' in changed:
+            detector.reload_segments()
+        if follow_ux and 'ux_model' in changed:
+            reload(ux_optimizer.reload(state.ux_model))
+
+    control_state.subscribe(on_change)
+    # Published while the models were loading
+    if follow_anomaly:
+        reload(detector.reload(control_state.state.anomaly_model))
+    if follow_ux:
+        reload(ux_optimizer.reload(control_state.state.ux_model))
+
+
+async def start_services():
+    """
+    Connect storage, load ML models and initialize core systems
+    Shared by lifespan_full and the stream worker (worker.py)
+
+    MongoDB, Redis (with the control state shared with the control API and
+    other workers) and the ML models are initialized concurrently; the core
+    systems start once all three are up.
+    """
+    await start_audit_log()
+
+    database = asyncio.ensure_future(stage('database', start_database()))
+    await asyncio.gather(
+        database,
+        stage('redis', start_redis()),
+        stage('models', load_models(database))
+    )
+    # Last step: its warm-up status is reported under the monitor component
+    await stage('monitor', start_core_systems())
+
+
+async def stop_services():
+    """Stop background systems and close connections"""
+    if monitor:
+        await monitor.stop()
+    if control_state:
+        await control_state.stop()
+    if suggestion_store:
+        await suggestion_store.stop()
+    if event_broadcaster:
+        await event_broadcaster.stop()
+    if audit_log:
+        await audit_log.stop()
+    if shadow_evaluator:
+        await shadow_evaluator.stop()
+    for model in ml_models.values():
+        if getattr(model, 'checkpoints', None):
+            await model.checkpoints.stop()
+    if db_manager:
+        await db_manager.disconnect()
+    if redis_manager:
+        await redis_manager.disconnect()
 
 
 # Simplified lifespan manager for Control API only
@@ -49,72 +461,136 @@ async def lifespan(app: FastAPI):
     Simplified version - only for Control API
     """
     logger.info("🚀 Starting Aegis Control API...")
+
+    await start_control_state()
+    await start_event_broadcaster()
+    await start_audit_log()  # In memory until MongoDB is connected
+    database_task = asyncio.create_task(attach_database())
+
+    if INGEST_MODE == 'stream':
+        await connect_stream_bus()
+
+    start_job_manager()
+    await start_status_aggregator()
+
     logger.info("✅ Control API ready!")
     
     yield
     
     logger.info("🛑 Shutting down Aegis Control API...")
+    if not database_task.done():
+        database_task.cancel()
+    await asyncio.gather(database_task, return_exceptions=True)
+    await status_aggregator.stop()
+    await job_manager.stop()
+    await control_state.stop()
+    if suggestion_store:
+        await suggestion_store.stop()
+    await event_broadcaster.stop()
+    await audit_log.stop()
+    if db_manager:
+        await db_manager.disconnect()
+    if redis_manager:
+        await redis_manager.disconnect()
     logger.info("✅ Control API stopped cleanly")
 
 
-# Original lifespan manager (commented until other modules are implemented)
-"""
+async def warm_up():
+    """
+    Background startup (AEGIS_STARTUP_MODE=background): start the services
+    while the app already serves, then process the batches held meanwhile
+
+    If starting fails, ingestion answers 503 from then on, jobs waiting for
+    the warm-up fail, and the process shuts down to be restarted
+    (AEGIS_WARMUP_EXIT_ON_FAILURE)
+    """
+    try:
+        await start_services()
+
+        if INGEST_MODE == 'stream':
+            await connect_stream_bus()
+
+    except Exception as e:
+        logger.error(f"❌ Failed to start Aegis service: {str(e)}")
+        dropped = warmup.fail(str(e))
+        if dropped:
+            logger.error(f"❌ {dropped} events held during the warm-up were not processed")
+        if status_aggregator is not None:
+            await status_aggregator.refresh()
+
+        if WARMUP_EXIT_ON_FAILURE:
+            logger.error("🛑 Shutting down so the process is restarted")
+            signal.raise_signal(signal.SIGTERM)
+        return
+
+    held = warmup.finish()
+    logger.info(f"🎉 Aegis service ready in {warmup.stats['seconds']:.2f}s")
+    await status_aggregator.refresh()
+
+    for kind, events in held:
+        try:
+            await dispatch_batch(kind, events)
+        except Exception as e:
+            logger.error(f"❌ Failed to process held {kind} batch: {str(e)}")
+    if held:
+        logger.info(f"✅ Processed {len(held)} batches held during warm-up")
+
+
 @asynccontextmanager
 async def lifespan_full(app: FastAPI):
-    # Lifecycle manager for FastAPI app
-    # Handles ML model loading/unloading
-    
-    global ml_models, auto_healer, monitor, decision_engine, db_manager, redis_manager
-    
+    """
+    Lifecycle manager for FastAPI app
+    Handles ML model loading/unloading
+    """
+    global warmup, telemetry_sampler
+
     logger.info("🚀 Starting Aegis service...")
+    warmup_task = None
     
     try:
-        # Initialize database connections
-        db_manager = DatabaseManager()
-        await db_manager.connect()
-        logger.info("✅ Database connected")
-        
-        # Initialize Redis
-        redis_manager = RedisManager()
-        await redis_manager.connect()
-        logger.info("✅ Redis connected")
-        
-        # Load ML models
-        logger.info("📦 Loading ML models...")
-        ml_models['anomaly'] = AnomalyDetector()
-        ml_models['ux_optimizer'] = UXOptimizer()
-        ml_models['sentiment'] = SentimentAnalyzer()
-        
-        await ml_models['anomaly'].load_model()
-        await ml_models['ux_optimizer'].load_model()
-        await ml_models['sentiment'].load_model()
-        logger.info("✅ All ML models loaded")
-        
-        # Initialize core systems
-        auto_healer = AutoHealer(db_manager, redis_manager)
-        monitor = SystemMonitor(db_manager, ml_models)
-        decision_engine = DecisionEngine(ml_models, auto_healer)
-        logger.info("✅ Core systems initialized")
-        
-        # Start background monitoring
-        await monitor.start()
-        logger.info("✅ Background monitoring started")
-        
-        logger.info("🎉 Aegis service ready!")
-        
-        yield
-        
-        # Cleanup on shutdown
-        logger.info("🛑 Shutting down Aegis service...")
-        await monitor.stop()
-        await db_manager.disconnect()
-        await redis_manager.disconnect()
-        logger.info("✅ Aegis service stopped cleanly")
+        if STARTUP_MODE == 'background':
+            from core.warmup import Warmup
+            from core.telemetry_sampler import TelemetrySampler
+
+            # Serve right away: health reports each component as it comes up
+            # and ingested batches are held until the warm-up finishes
+            warmup = Warmup(('database', 'redis', 'models', 'monitor'))
+            telemetry_sampler = TelemetrySampler()  # Unsampled until the control state is loaded
+            warmup_task = asyncio.create_task(warm_up())
+        else:
+            await start_services()
+
+            if INGEST_MODE == 'stream':
+                await connect_stream_bus()
+
+        start_job_manager()
+        await start_status_aggregator()
+
+        logger.info("🎉 Aegis service ready!" if warmup is None else "🔥 Aegis service warming up in the background")
         
     except Exception as e:
         logger.error(f"❌ Failed to start Aegis service: {str(e)}")
         raise
-"""
+
+    yield
+    
+    # Cleanup on shutdown
+    logger.info("🛑 Shutting down Aegis service...")
+    if warmup_task:
+        warmup_task.cancel()
+        try:
+            await warmup_task
+        except asyncio.CancelledError:
+            pass
+    await status_aggregator.stop()
+    await job_manager.stop()
+    await stop_services()
+    logger.info("✅ Aegis service stopped cleanly")
+
+    if warmup is not None and warmup.error is not None and WARMUP_EXIT_ON_FAILURE:
+        # uvicorn exits 0 after a SIGTERM; fail so restart policies apply
+        logging.shutdown()
+        os._exit(1)
 
 
 # Create FastAPI app
@@ -122,7 +598,7 @@ app = FastAPI(
     title="BeZhas Aegis",
     description="AI Self-Healing & Optimization Service",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan_full if LIFESPAN_MODE == 'full' else lifespan
 )
 
 # CORS middleware
@@ -155,6 +631,11 @@ class TelemetryEvent(BaseModel):
     metadata: Dict[str, Any] = Field(default_factory=dict)
     performance: Optional[Dict[str, float]] = None
     error: Optional[Dict[str, str]] = None
+    sampleWeight: float = 1.0  # Events represented (1 / sample rate), set at ingestion
+
+
+# Validates telemetry batches that survived sampling
+TelemetryBatch = TypeAdapter(List[TelemetryEvent])
 
 
 class Web3Event(BaseModel):
@@ -175,11 +656,23 @@ class LogEvent(BaseModel):
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
 
+class JobRequest(BaseModel):
+    type: Literal['bulk_sentiment', 'retrain_anomaly']
+    params: Dict[str, Any]
+
+
+class RecommendRequest(BaseModel):
+    states: List[str] = Field(default_factory=list)
+    contexts: List[Dict[str, Any]] = Field(default_factory=list)
+
+
 class HealthResponse(BaseModel):
     status: str
     timestamp: int
     models_loaded: List[str]
     uptime: float
+    components: Dict[str, Any] = {}
+    ready: bool = True
 
 
 # ========================================
@@ -197,45 +690,88 @@ async def root():
 
 
 @app.get("/aegis/v1/health", response_model=HealthResponse)
-async def health_check():
-    """Health check endpoint"""
+async def health_check(response: Response, if_none_match: Optional[str] = Header(default=None)):
+    """
+    Health check endpoint
+    Served from the status snapshot refreshed in the background (never
+    waits on a dependency); supports If-None-Match
+    While warming up, components not started yet are reported as starting
+    and ready is false
+    """
     try:
-        models_loaded = [name for name, model in ml_models.items() if model.is_loaded]
+        snapshot, etag = status_aggregator.snapshot, status_aggregator.etag
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={'ETag': etag})
         
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = 'no-cache'
         return HealthResponse(
-            status="healthy",
+            status=snapshot['status'],
             timestamp=int(datetime.now().timestamp() * 1000),
-            models_loaded=models_loaded,
-            uptime=monitor.get_uptime() if monitor else 0.0
+            models_loaded=snapshot['components'].get('models', {}).get('models_loaded', []),
+            uptime=monitor.get_uptime() if monitor else status_aggregator.uptime(),
+            components={name: component['status'] for name, component in snapshot['components'].items()},
+            ready=snapshot['ready']
         )
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
         raise HTTPException(status_code=500, detail="Service unhealthy")
 
 
-@app.post("/aegis/v1/ingest/telemetry")
+@app.post(
+    "/aegis/v1/ingest/telemetry",
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/json": {"schema": {"type": "array", "items": TelemetryEvent.model_json_schema()}},
+        "application/x-ndjson": {"schema": TelemetryEvent.model_json_schema()}
+    }}}
+)
 async def ingest_telemetry(
-    events: List[TelemetryEvent],
+    request: Request,
     background_tasks: BackgroundTasks
 ):
     """
     Ingest telemetry events from frontend/backend
+    Body: JSON array of events, or NDJSON (Content-Type: application/x-ndjson)
+    Whole sessions are sampled at the control telemetry_samplerate before
+    validation; only kept events are parsed and validated (fully for NDJSON)
     """
+    rate = telemetry_sampler.rate if telemetry_sampler else 1.0
+    if rate <= 0:
+        # Telemetry disabled from the control API: the body is not even read
+        return {
+            "success": True,
+            "processed": 0,
+            "sample_rate": 0.0,
+            "timestamp": int(datetime.now().timestamp() * 1000)
+        }
+    
+    try:
+        if 'ndjson' in request.headers.get('content-type', ''):
+            payloads, received = await telemetry_sampler.sample_ndjson(request.stream(), rate)
+        else:
+            payloads, received = telemetry_sampler.sample_array(await request.body(), rate)
+        events = TelemetryBatch.validate_python(payloads)
+    except ValidationError as e:
+        raise RequestValidationError([{**error, 'loc': ('body', *error['loc'])} for error in e.errors()])
+    except ValueError as e:
+        raise RequestValidationError([{'type': 'json_invalid', 'loc': ('body',), 'msg': str(e), 'input': None}])
+    
     try:
-        logger.info(f"📊 Received {len(events)} telemetry events")
+        logger.info(f"📊 Received {received} telemetry events ({len(events)} sampled)")
         
-        # Process in background
-        background_tasks.add_task(
-            process_telemetry_batch,
-            events
-        )
+        if events:
+            await dispatch_batch('telemetry', events, background_tasks)
         
         return {
             "success": True,
             "processed": len(events),
+            "received": received,
+            "sample_rate": rate,
             "timestamp": int(datetime.now().timestamp() * 1000)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Failed to ingest telemetry: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -252,11 +788,7 @@ async def ingest_web3_events(
     try:
         logger.info(f"⛓️  Received {len(events)} Web3 events")
         
-        # Process in background
-        background_tasks.add_task(
-            process_web3_batch,
-            events
-        )
+        await dispatch_batch('web3', events, background_tasks)
         
         return {
             "success": True,
@@ -264,6 +796,8 @@ async def ingest_web3_events(
             "timestamp": int(datetime.now().timestamp() * 1000)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Failed to ingest Web3 events: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -280,11 +814,7 @@ async def ingest_logs(
     try:
         logger.info(f"📝 Received {len(events)} log events")
         
-        # Process in background
-        background_tasks.add_task(
-            process_log_batch,
-            events
-        )
+        await dispatch_batch('log', events, background_tasks)
         
         return {
             "success": True,
@@ -292,6 +822,8 @@ async def ingest_logs(
             "timestamp": int(datetime.now().timestamp() * 1000)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Failed to ingest logs: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -303,12 +835,24 @@ async def get_stats():
     Get service statistics
     """
     try:
+        # Models are absent while warming up
+        def model_stats(name):
+            return ml_models[name].get_stats() if name in ml_models else {}
+        
         stats = {
-            "anomaly_detector": ml_models['anomaly'].get_stats(),
-            "ux_optimizer": ml_models['ux_optimizer'].get_stats(),
-            "sentiment_analyzer": ml_models['sentiment'].get_stats(),
+            "anomaly_detector": model_stats('anomaly'),
+            "ux_optimizer": model_stats('ux_optimizer'),
+            "sentiment_analyzer": model_stats('sentiment'),
+            "log_templates": model_stats('log_templates'),
             "auto_healer": auto_healer.get_stats() if auto_healer else {},
-            "monitor": monitor.get_stats() if monitor else {}
+            "monitor": monitor.get_stats() if monitor else {},
+            "control_state": control_state.get_stats() if control_state else {},
+            "telemetry_sampler": telemetry_sampler.get_stats() if telemetry_sampler else {},
+            "suggestions": suggestion_store.get_stats() if suggestion_store else {},
+            "status": status_aggregator.get_stats() if status_aggregator else {},
+            "events": event_broadcaster.get_stats() if event_broadcaster else {},
+            "audit": audit_log.get_stats() if audit_log else {},
+            "warmup": warmup.get_stats() if warmup else {}
         }
         
         return {
@@ -322,42 +866,230 @@ async def get_stats():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def serve_recommendations(states: List[str], if_none_match: Optional[str]) -> Response:
+    """
+    Serve recommendations from the UX optimizer's current snapshot
+    No states means the whole table; If-None-Match with the snapshot ETag returns 304
+    (the ETag names the checkpoint generation, so it is the same on every API
+    process serving it)
+    """
+    ux_optimizer = ml_models.get('ux_optimizer')
+    if ux_optimizer is None or not ux_optimizer.is_loaded:
+        raise HTTPException(status_code=503, detail="UX optimizer not loaded")
+    
+    snapshot = ux_optimizer.recommendations
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    
+    if if_none_match and (
+        if_none_match.strip() == '*'
+        or snapshot.etag in [tag.strip() for tag in if_none_match.split(',')]
+    ):
+        return Response(status_code=304, headers=headers)
+    
+    recommendations = (
+        ux_optimizer.lookup(states, snapshot) if states
+        else dict(snapshot.entries)
+    )
+    
+    return JSONResponse(
+        {
+            "success": True,
+            "version": snapshot.version,
+            "built_at": int(snapshot.built_at * 1000),
+            "recommendations": recommendations,
+            "timestamp": int(datetime.now().timestamp() * 1000)
+        },
+        headers=headers
+    )
+
+
+@app.get("/aegis/v1/ux/recommend")
+async def get_ux_recommendations(
+    state: List[str] = Query(default=[]),
+    if_none_match: Optional[str] = Header(default=None)
+):
+    """
+    Get UX recommendations by state key (repeat ?state= for several)
+    Without states, returns the whole recommendation table
+    """
+    return serve_recommendations(state, if_none_match)
+
+
+@app.post("/aegis/v1/ux/recommend")
+async def post_ux_recommendations(
+    request: RecommendRequest,
+    if_none_match: Optional[str] = Header(default=None)
+):
+    """
+    Batch UX recommendations for state keys and/or page contexts
+    ({eventType, performance: {loadTime, interactions}})
+    """
+    from models.ux_optimizer import state_key
+    
+    states = request.states + [state_key(context) for context in request.contexts]
+    return serve_recommendations(states, if_none_match)
+
+
+@app.post("/aegis/v1/jobs")
+async def submit_job(request: JobRequest):
+    """
+    Submit an offline job (e.g. bulk sentiment scoring of a corpus)
+    """
+    try:
+        job = job_manager.submit(request.type, request.params)
+        
+        return {
+            "success": True,
+            "job": job.to_dict(),
+            "timestamp": int(datetime.now().timestamp() * 1000)
+        }
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"❌ Failed to submit job: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/aegis/v1/jobs")
+async def list_jobs(type: Optional[str] = None, limit: int = 50):
+    """
+    List jobs, most recent first
+    """
+    return {
+        "success": True,
+        "jobs": job_manager.list_jobs(type, limit),
+        "stats": job_manager.get_stats(),
+        "timestamp": int(datetime.now().timestamp() * 1000)
+    }
+
+
+@app.get("/aegis/v1/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Get job status and progress
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    
+    return {
+        "success": True,
+        "job": job,
+        "timestamp": int(datetime.now().timestamp() * 1000)
+    }
+
+
+@app.post("/aegis/v1/jobs/{job_id}/resume")
+async def resume_job(job_id: str):
+    """
+    Resume a failed, cancelled or interrupted job from its last checkpoint
+    """
+    try:
+        job = job_manager.resume(job_id)
+        
+        return {
+            "success": True,
+            "job": job.to_dict(),
+            "timestamp": int(datetime.now().timestamp() * 1000)
+        }
+        
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.post("/aegis/v1/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """
+    Cancel a running job (it can be resumed later)
+    """
+    try:
+        job = await job_manager.cancel(job_id)
+        
+        return {
+            "success": True,
+            "job": job.to_dict(),
+            "timestamp": int(datetime.now().timestamp() * 1000)
+        }
+        
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+
 # ========================================
 # BACKGROUND PROCESSING FUNCTIONS
 # ========================================
 
-async def process_telemetry_batch(events: List[TelemetryEvent]):
-    """Process telemetry events in background"""
+async def dispatch_batch(kind: str, events: list, background_tasks: Optional[BackgroundTasks] = None):
+    """
+    Hand a validated batch to the worker pool (stream mode) or process it
+    in background; held while the service warms up
+    """
+    if warmup is not None:
+        try:
+            if warmup.hold(kind, events):
+                return
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+    
+    if stream_bus is not None:
+        # Stream mode: hand the batch to the worker pool
+        await stream_bus.publish(kind, [e.dict() for e in events])
+    elif background_tasks is not None:
+        background_tasks.add_task(BATCH_PROCESSORS[kind], events)
+    else:
+        await BATCH_PROCESSORS[kind](events)
+
+
+async def process_telemetry_batch(events: List[TelemetryEvent], raise_errors: bool = False):
+    """
+    Process telemetry events in background
+    With raise_errors (stream workers), storage and scoring failures are
+    raised so the entry is not acknowledged and gets redelivered
+    """
     try:
-        # Store in database
-        await db_manager.store_telemetry(events)
+        # Store in database (as documents; they carry their sampleWeight)
+        event_dicts = [e.dict() for e in events]
+        if not await db_manager.store_telemetry(event_dicts) and raise_errors:
+            raise RuntimeError("telemetry events not stored")
         
-        # Run anomaly detection
-        for event in events:
-            anomaly_score = await ml_models['anomaly'].predict(event.dict())
-            
-            if anomaly_score > 0.8:  # High anomaly score
-                logger.warning(f"🚨 Anomaly detected: {event.eventType} - Score: {anomaly_score}")
+        # Run anomaly detection (one vectorized pass over the batch)
+        anomaly_scores = await ml_models['anomaly'].predict_batch(event_dicts, strict=raise_errors)
+        if shadow_evaluator:
+            shadow_evaluator.submit(event_dicts)
+        threshold = ml_models['anomaly'].threshold
+        for event, anomaly_score in zip(event_dicts, anomaly_scores.tolist()):
+            if anomaly_score > threshold:  # High anomaly score
+                logger.warning(f"🚨 Anomaly detected: {event['eventType']} - Score: {anomaly_score}")
                 
                 # Trigger decision engine
                 await decision_engine.handle_anomaly(event, anomaly_score)
         
+        # Online detector learns from the batch after scoring it
+        if ml_models['anomaly'].online:
+            await ml_models['anomaly'].update(event_dicts)
+        
         # Update UX optimizer with performance data
         perf_events = [e for e in events if e.performance]
         if perf_events:
-            await ml_models['ux_optimizer'].update(perf_events)
+            await ml_models['ux_optimizer'].update([e.dict() for e in perf_events])
         
         logger.info(f"✅ Processed {len(events)} telemetry events")
         
     except Exception as e:
         logger.error(f"❌ Failed to process telemetry batch: {str(e)}")
+        if raise_errors:
+            raise
 
 
-async def process_web3_batch(events: List[Web3Event]):
-    """Process Web3 events in background"""
+async def process_web3_batch(events: List[Web3Event], raise_errors: bool = False):
+    """Process Web3 events in background (failures raised with raise_errors)"""
     try:
         # Store in database
-        await db_manager.store_web3_events(events)
+        if not await db_manager.store_web3_events([e.dict() for e in events]) and raise_errors:
+            raise RuntimeError("Web3 events not stored")
         
         # Analyze blockchain patterns
         for event in events:
@@ -371,32 +1103,92 @@ async def process_web3_batch(events: List[Web3Event]):
         
     except Exception as e:
         logger.error(f"❌ Failed to process Web3 batch: {str(e)}")
+        if raise_errors:
+            raise
 
 
-async def process_log_batch(events: List[LogEvent]):
-    """Process log events in background"""
+async def process_log_batch(events: List[LogEvent], raise_errors: bool = False):
+    """Process log events in background (failures raised with raise_errors)"""
     try:
-        # Store in database
-        await db_manager.store_logs(events)
+        # Map every message to its template at ingestion
+        miner = ml_models['log_templates']
+        parsed = miner.process_batch([e.message for e in events])
+        
+        # Store in database (template dictionary is stored once, logs reference it)
+        stored = await db_manager.store_logs([
+            {**e.dict(), 'template_id': template_id, 'params': params}
+            for e, (template_id, params) in zip(events, parsed)
+        ])
+        if not stored and raise_errors:
+            raise RuntimeError("log events not stored")
+        templates = miner.dirty_templates()
+        miner.mark_saved(templates, await db_manager.upsert_log_templates(templates))
         
-        # Analyze sentiment and errors
-        error_logs = [e for e in events if e.level in ['error', 'fatal']]
+        # Group error logs by template
+        error_groups = {}
+        for log, (template_id, _) in zip(events, parsed):
+            if log.level in ['error', 'fatal']:
+                error_groups.setdefault(template_id, []).append(log)
         
-        if error_logs:
-            logger.warning(f"⚠️  {len(error_logs)} error logs received")
+        if error_groups:
+            error_count = sum(len(logs) for logs in error_groups.values())
+            logger.warning(f"⚠️  {error_count} error logs received ({len(error_groups)} templates)")
             
-            for log in error_logs:
-                # Run sentiment analysis
-                sentiment = await ml_models['sentiment'].analyze(log.message)
+            # Keyword classification: one pass per distinct message
+            classifications = {}
+            for logs in error_groups.values():
+                for log in logs:
+                    if log.message not in classifications:
+                        classifications[log.message] = ml_models['sentiment'].classify_log(log.message)
+            
+            for template_id, logs in error_groups.items():
+                template = miner.get_template(template_id)
+                
+                if template.first_seen == template.last_seen:
+                    logger.warning(f"🆕 New error template #{template_id}: {template.text}")
                 
-                # If critical error, trigger auto-healing
-                if log.level == 'fatal':
-                    await auto_healer.handle_critical_error(log)
+                # Fatal-class messages go straight to auto-healing (once per
+                # template) without running sentiment
+                fatal_logs = [
+                    log for log in logs
+                    if log.level == 'fatal' or classifications[log.message]['fatal']
+                ]
+                if fatal_logs:
+                    representative = fatal_logs[0]
+                    await auto_healer.handle_critical_error({
+                        **representative.dict(),
+                        'template_id': template_id,
+                        'template': template.text,
+                        'categories': classifications[representative.message]['categories'],
+                        'occurrences': len(fatal_logs)
+                    })
+                    continue
+                
+                # Sentiment runs once per template
+                if 'sentiment' not in template.annotations:
+                    template.annotations['sentiment'] = await ml_models['sentiment'].analyze(template.text)
+            
+        # Per-template counts flag new spikes cheaply
+        for template in miner.detect_spikes():
+            logger.warning(
+                f"📈 Log template #{template.template_id} spiking: "
+                f"{template.window_count} in window vs baseline {template.baseline:.1f} - {template.text}"
+            )
         
         logger.info(f"✅ Processed {len(events)} log events")
         
     except Exception as e:
         logger.error(f"❌ Failed to process log batch: {str(e)}")
+        if raise_errors:
+            raise
+
+
+# Inline processing of each ingested kind
+BATCH_PROCESSORS = {
+    'telemetry': process_telemetry_batch,
+    'web3': process_web3_batch,
+    'log': process_log_batch
+}
 
 
 # ========================================
@@ -3,7 +3,11 @@ ML Models Package
 """
 
 from .anomaly_detector import AnomalyDetector
+from .online_anomaly import OnlineAnomalyDetector
 from .ux_optimizer import UXOptimizer
+from .q_table import QTable
+from .compiled_forest import CompiledForest
 from .sentiment_analyzer import SentimentAnalyzer
+from .log_template_miner import LogTemplateMiner
 
-__all__ = ['AnomalyDetector', 'UXOptimizer', 'SentimentAnalyzer']
+__all__ = ['AnomalyDetector', 'OnlineAnomalyDetector', 'UXOptimizer', 'QTable', 'CompiledForest', 'SentimentAnalyzer', 'LogTemplateMiner']
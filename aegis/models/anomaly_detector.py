@@ -2,29 +2,64 @@
 Anomaly Detector Model
 Detects anomalies in telemetry, logs, and system behavior
 Uses Isolation Forest and statistical methods
+Inference runs on a compiled NumPy export of the fitted forest
+Checkpoints store the forest and scaler arrays as .npy files that are
+memory-mapped on load, so worker processes share them via the page cache
+Events can be scored by per-segment models (e.g. one per eventType),
+falling back to the global model for segments without one
 """
 
 import numpy as np
+from sklearn.base import clone
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 import pickle
 import logging
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import asyncio
+import os
+
+from utils.checkpoint import CheckpointManager, GENERATION_PREFIX
+from .compiled_forest import CompiledForest
+from .segment_models import SegmentModels
+from .score_buffer import ScoreBuffer
 
 logger = logging.getLogger(__name__)
 
 
+def fit_model(template: IsolationForest, X: np.ndarray) -> Tuple[IsolationForest, StandardScaler]:
+    """
+    Fit a fresh scaler and a clone of the template forest on raw features
+    Module-level so retrain jobs can run it in a worker process
+    """
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    
+    model = clone(template)
+    model.fit(X_scaled)
+    return model, scaler
+
+
 class AnomalyDetector:
     """
     Anomaly detection using Isolation Forest
     """
     
-    def __init__(self, model_path: str = "models/checkpoints/anomaly_detector.pkl"):
+    online = False  # Learns from every batch via update() (see OnlineAnomalyDetector)
+    
+    def __init__(
+        self,
+        model_path: str = "models/checkpoints/anomaly_detector.pkl",
+        segment_by: Optional[str] = None
+    ):
         self.model_path = Path(model_path)
-        self.model = None
+        self._model = None
+        self.model_file = None  # Pickled sklearn forest, unpickled on first use
         self.scaler = StandardScaler()
+        self.compiled = None  # CompiledForest of the fitted model + scaler
+        self.generation = None  # Checkpoint generation the live model was loaded from or saved as
+        self.reload_lock = asyncio.Lock()
         self.is_loaded = False
         self.feature_names = [
             'response_time', 'error_rate', 'request_count',
@@ -36,16 +71,86 @@ class AnomalyDetector:
             'anomalies_detected': 0,
             'last_prediction_time': None
         }
+        
+        # Alert cutoff on the 0-1 score: the anomaly_threshold control
+        # setting shared by every process, once the control state is set
+        self.default_threshold = float(os.getenv('AEGIS_ANOMALY_THRESHOLD', 0.8))
+        self.control_state = None
+        self.recent = ScoreBuffer()  # Scores of recent live events
+        
+        # Background checkpoints (models/checkpoints/anomaly_detector/gen-NNNNNN);
+        # the legacy single-file pickle at model_path is still read on load
+        self.checkpoints = CheckpointManager(
+            'anomaly_detector',
+            self.model_path.with_suffix(''),
+            self.checkpoint_snapshot,
+            self.write_checkpoint
+        )
+        
+        # Per-segment models: event field to segment by (eventType, or a
+        # field such as service/contractAddress, looked up in metadata too);
+        # empty disables segmentation
+        self.segment_by = os.getenv('AEGIS_ANOMALY_SEGMENT_BY', 'eventType') if segment_by is None else segment_by
+        self.segments = None
+        if self.segment_by:
+            self.segments = SegmentModels(
+                self.model_path.with_name(f"{self.model_path.stem}_segments"),
+                lambda path: AnomalyDetector(path, segment_by='')
+            )
+    
+    @property
+    def model(self) -> IsolationForest:
+        """
+        The sklearn forest (retraining template and fallback scorer)
+        Checkpoints with array artifacts score from the compiled forest, so
+        the pickle is only read when something needs the sklearn object
+        """
+        if self._model is None and self.model_file is not None:
+            logger.info(f"📦 Loading sklearn forest from {self.model_file}")
+            with open(self.model_file, 'rb') as f:
+                self._model = pickle.load(f)['model']
+            self.model_file = None
+        return self._model
+    
+    @model.setter
+    def model(self, model: IsolationForest):
+        self._model = model
+        self.model_file = None
+    
+    @property
+    def threshold(self) -> float:
+        if self.control_state is None:
+            return self.default_threshold
+        return self.control_state.state.anomaly_threshold
+    
+    @property
+    def is_fitted(self) -> bool:
+        """Whether there is a fitted forest to score with (not before the first training)"""
+        return self.compiled is not None
     
     async def load_model(self):
         """Load pre-trained model or initialize new one"""
         try:
-            if self.model_path.exists():
-                logger.info(f"📦 Loading anomaly detector from {self.model_path}")
-                with open(self.model_path, 'rb') as f:
+            chain = self.checkpoints.chain()
+            directory = chain[-1][0] if chain else None
+            path = directory / 'model.pkl' if directory else self.model_path
+            self.generation = directory.name if directory else None
+            
+            if directory and CompiledForest.exists(directory):
+                logger.info(f"📦 Memory-mapping anomaly detector from {directory}")
+                self.compiled = CompiledForest.load(directory)
+                scaler_path = directory / 'scaler.npy'
+                self.scaler = self.load_scaler(scaler_path) if scaler_path.exists() else StandardScaler()
+                self._model = None
+                self.model_file = path
+                logger.info("✅ Anomaly detector loaded")
+            elif path.exists():
+                logger.info(f"📦 Loading anomaly detector from {path}")
+                with open(path, 'rb') as f:
                     checkpoint = pickle.load(f)
                     self.model = checkpoint['model']
                     self.scaler = checkpoint['scaler']
+                self.compiled = self.compile(self.model, self.scaler)
                 logger.info("✅ Anomaly detector loaded")
             else:
                 logger.warning("⚠️  No pre-trained model found, initializing new model")
@@ -56,6 +161,9 @@ class AnomalyDetector:
         except Exception as e:
             logger.error(f"❌ Failed to load anomaly detector: {str(e)}")
             await self.initialize_model()
+        
+        if self.segments:
+            self.segments.load_index()
     
     async def initialize_model(self):
         """Initialize a new Isolation Forest model"""
@@ -66,10 +174,12 @@ class AnomalyDetector:
             max_samples='auto',
             random_state=42
         )
+        self.compiled = None
+        self.generation = None
         self.is_loaded = True
         logger.info("✅ New anomaly detector initialized")
     
-    def extract_features(self, event: Dict[str, Any]) -> np.ndarray:
+    def feature_row(self, event: Dict[str, Any]) -> List[float]:
         """
         Extract numerical features from event
         """
@@ -85,7 +195,7 @@ class AnomalyDetector:
             features.extend([0, 0, 1])
         
         # Extract system metrics (if available)
-        metadata = event.get('metadata', {})
+        metadata = event.get('metadata') or {}
         features.append(metadata.get('cpuUsage', 0))
         features.append(metadata.get('memoryUsage', 0))
         features.append(metadata.get('networkLatency', 0))
@@ -94,7 +204,118 @@ class AnomalyDetector:
         features.append(float(metadata.get('gasCost', 0)))
         features.append(metadata.get('txSuccessRate', 1.0))
         
-        return np.array(features).reshape(1, -1)
+        return features
+    
+    def extract_features(self, event: Dict[str, Any]) -> np.ndarray:
+        """Features of one event as a 1 x n_features matrix"""
+        return np.array(self.feature_row(event), dtype=np.float64).reshape(1, -1)
+    
+    def extract_features_batch(self, events: List[Dict[str, Any]], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Features of many events as a matrix, written row by row into a
+        preallocated buffer (out, reused across chunks) when given
+        """
+        if out is None:
+            out = np.empty((len(events), len(self.feature_names)))
+        out = out[:len(events)]
+        
+        for i, event in enumerate(events):
+            out[i] = self.feature_row(event)
+        return out
+    
+    def compile(self, model, scaler) -> Optional[CompiledForest]:
+        """Export a fitted model and scaler for fast scoring (None if unfitted or on failure)"""
+        if not hasattr(model, 'estimators_'):
+            return None
+        
+        try:
+            return CompiledForest.from_sklearn(model, scaler if hasattr(scaler, 'mean_') else None)
+        except Exception as e:
+            logger.error(f"❌ Failed to compile anomaly detector, using sklearn scoring: {str(e)}")
+            return None
+    
+    def score_features(self, X: np.ndarray) -> np.ndarray:
+        """
+        Anomaly scores for a feature matrix
+        Returns: Floats between 0 and 1 (1 = high anomaly)
+        """
+        # Raw isolation score (lower = more anomalous)
+        compiled = self.compiled
+        if compiled is not None:
+            score = compiled.score_samples(X)
+        else:
+            score = self.model.score_samples(self.scaler.transform(X))
+        
+        # Normalize score to 0-1 range (higher = more anomalous)
+        # score_samples returns negative values, more negative = more anomalous
+        return 1 / (1 + np.exp(score))  # Sigmoid transformation
+    
+    def segment_key(self, event: Dict[str, Any]) -> Optional[str]:
+        """Segment of an event (None when the field is missing)"""
+        if not self.segment_by:
+            return None
+        
+        value = event.get(self.segment_by)
+        if value is None:
+            value = (event.get('metadata') or {}).get(self.segment_by)
+        return str(value) if value not in (None, '') else None
+    
+    async def score_events(self, events: List[Dict[str, Any]], X: np.ndarray) -> np.ndarray:
+        """
+        Anomaly scores with each event scored by its segment's model
+        (or the global one); one vectorized pass per segment
+        """
+        if not self.segments or not self.segments.index:
+            return self.score_features(X)
+        
+        groups = {}
+        for i, event in enumerate(events):
+            groups.setdefault(self.segment_key(event), []).append(i)
+        
+        anomaly_scores = np.empty(len(events))
+        for segment, rows in groups.items():
+            detector = await self.segments.get(segment) or self
+            anomaly_scores[rows] = detector.score_features(X[rows])
+        
+        return anomaly_scores
+    
+    @staticmethod
+    def event_id(event: Dict[str, Any]) -> str:
+        """Identifier of a scored event (telemetry has no id of its own)"""
+        if event.get('id'):
+            return str(event['id'])
+        return f"{event.get('sessionId')}:{event.get('eventName')}:{event.get('timestamp')}"
+    
+    def record(self, events: List[Dict[str, Any]], anomaly_scores: np.ndarray):
+        """Update prediction stats and the recent score buffer"""
+        self.stats['predictions'] += len(anomaly_scores)
+        self.stats['anomalies_detected'] += int((anomaly_scores > self.threshold).sum())
+        self.stats['last_prediction_time'] = events[-1].get('timestamp')
+        
+        self.recent.append(
+            [self.event_id(event) for event in events],
+            [self.segment_key(event) for event in events],
+            anomaly_scores,
+            [event.get('timestamp') for event in events]
+        )
+    
+    def threshold_impact(self, previous: float, threshold: float, limit: int = 100) -> Optional[Dict[str, Any]]:
+        """
+        Effect of a threshold change on the events this process scored
+        recently (counts and newly flagged events), computed from the
+        buffered scores; None if it scored none (e.g. an API process in
+        stream ingest mode, where the workers score)
+        """
+        if not self.recent.size:
+            return None
+        
+        impact = self.recent.evaluate(previous, threshold, limit)
+        logger.info(
+            f"🔧 Anomaly threshold {previous} -> {threshold}: "
+            f"{impact['flagged_after']}/{impact['events']} recent events flagged "
+            f"({impact['newly_flagged']} new, {impact['cleared']} cleared)"
+        )
+        return impact
     
     async def predict(self, event: Dict[str, Any]) -> float:
         """
@@ -106,30 +327,36 @@ class AnomalyDetector:
                 logger.warning("Model not loaded, returning 0")
                 return 0.0
             
-            # Extract features
-            features = self.extract_features(event)
-            
-            # Predict (-1 = anomaly, 1 = normal)
-            prediction = self.model.predict(features)[0]
+            anomaly_scores = await self.score_events([event], self.extract_features(event))
+            self.record([event], anomaly_scores)
             
-            # Get anomaly score (lower = more anomalous)
-            score = self.model.score_samples(features)[0]
+            return float(anomaly_scores[0])
             
-            # Normalize score to 0-1 range (higher = more anomalous)
-            # score_samples returns negative values, more negative = more anomalous
-            anomaly_score = 1 / (1 + np.exp(score))  # Sigmoid transformation
+        except Exception as e:
+            logger.error(f"❌ Prediction failed: {str(e)}")
+            return 0.0
+    
+    async def predict_batch(self, events: List[Dict[str, Any]], strict: bool = False) -> np.ndarray:
+        """
+        Predict anomaly scores for many events in one vectorized pass
+        Returns: Array of floats between 0 and 1 (zeros on failure, or
+        raises with strict; zeros until a model has been fitted)
+        """
+        try:
+            if not self.is_loaded or not self.is_fitted or not events:
+                return np.zeros(len(events))
             
-            # Update stats
-            self.stats['predictions'] += 1
-            if anomaly_score > 0.8:
-                self.stats['anomalies_detected'] += 1
-            self.stats['last_prediction_time'] = event.get('timestamp')
+            X = self.extract_features_batch(events)
+            anomaly_scores = await self.score_events(events, X)
+            self.record(events, anomaly_scores)
             
-            return float(anomaly_score)
+            return anomaly_scores
             
         except Exception as e:
-            logger.error(f"❌ Prediction failed: {str(e)}")
-            return 0.0
+            logger.error(f"❌ Batch prediction failed: {str(e)}")
+            if strict:
+                raise
+            return np.zeros(len(events))
     
     async def train(self, events: List[Dict[str, Any]]):
         """
@@ -143,41 +370,143 @@ class AnomalyDetector:
             logger.info(f"🎓 Training anomaly detector on {len(events)} events")
             
             # Extract features from all events
-            features_list = [self.extract_features(e) for e in events]
-            X = np.vstack(features_list)
+            X = self.extract_features_batch(events)
             
-            # Fit scaler and transform
-            X_scaled = self.scaler.fit_transform(X)
-            
-            # Train model
-            self.model.fit(X_scaled)
+            # Fit fresh scaler and model, then swap them in, so checkpoint
+            # snapshots (which hold references) never see a half-fitted model
+            model, scaler = fit_model(self.model, X)
+            self.swap(model, scaler)
             
             # Save model
             await self.save_model()
             
+            # Segments with enough events get their own model
+            if self.segments:
+                await self.train_segments(X, [self.segment_key(e) for e in events])
+            
             logger.info("✅ Anomaly detector trained successfully")
             
         except Exception as e:
             logger.error(f"❌ Training failed: {str(e)}")
     
-    async def save_model(self):
-        """Save model to disk"""
-        try:
-            self.model_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            checkpoint = {
-                'model': self.model,
-                'scaler': self.scaler,
-                'feature_names': self.feature_names
-            }
-            
-            with open(self.model_path, 'wb') as f:
-                pickle.dump(checkpoint, f)
+    async def train_segments(self, X: np.ndarray, segments: List[Optional[str]]) -> Dict[str, int]:
+        """Fit per-segment models (in parallel processes); returns events per segment"""
+        if not self.segments:
+            return {}
+        return await self.segments.train(X, segments, self.model, fit_model)
+    
+    def swap(self, model: IsolationForest, scaler: StandardScaler):
+        """
+        Replace the live model with a fitted one
+        Compiles first, then rebinds all references in one synchronous step
+        on the event loop, so scoring never sees a mix of old and new
+        """
+        compiled = self.compile(model, scaler)
+        self.model, self.scaler, self.compiled = model, scaler, compiled
+        self.is_loaded = True
+    
+    def live_state(self) -> Tuple[Any, ...]:
+        """The live model as swap() replaces it, for restore_state()"""
+        return self._model, self.model_file, self.scaler, self.compiled, self.is_loaded
+    
+    def restore_state(self, state: Tuple[Any, ...]):
+        """Put back a live model taken with live_state() (one synchronous step, like swap())"""
+        self._model, self.model_file, self.scaler, self.compiled, self.is_loaded = state
+    
+    async def save_model(self) -> Optional[str]:
+        """Write a checkpoint now (pickled off the event loop); returns its generation, None on failure"""
+        path = await self.checkpoints.checkpoint(full=True)
+        if path is None:
+            return None
+        self.generation = path.name
+        return self.generation
+    
+    async def reload(self, generation: Optional[str]) -> bool:
+        """
+        Switch to a generation another process saved and published (retrain,
+        shadow promotion); older generations and unreadable ones are ignored,
+        keeping the live model
+        """
+        async with self.reload_lock:
+            if not generation or generation == self.generation:
+                return False
+            if self.generation and int(generation[len(GENERATION_PREFIX):]) < int(self.generation[len(GENERATION_PREFIX):]):
+                return False
             
-            logger.info(f"💾 Model saved to {self.model_path}")
+            directory = self.checkpoints.directory / generation
+            try:
+                model, scaler, compiled = await asyncio.to_thread(self.read_generation, directory)
+            except Exception as e:
+                logger.error(f"❌ Failed to reload anomaly detector {generation}: {str(e)}")
+                return False
             
-        except Exception as e:
-            logger.error(f"❌ Failed to save model: {str(e)}")
+            # One synchronous step, like swap()
+            self.model, self.scaler, self.compiled = model, scaler, compiled
+            if model is None:
+                self.model_file = directory / 'model.pkl'
+            self.generation = generation
+            self.is_loaded = True
+        
+        logger.info(f"🔄 Anomaly detector reloaded from {generation}")
+        return True
+    
+    def read_generation(self, directory: Path) -> Tuple[Optional[IsolationForest], StandardScaler, Optional[CompiledForest]]:
+        """
+        Verified model, scaler and compiled forest of a checkpoint generation
+        (worker thread); the sklearn model is None when the forest is
+        memory-mapped, and is unpickled on first use as in load_model()
+        """
+        self.checkpoints.verify(directory, self.checkpoints.read_manifest(directory))
+        
+        if CompiledForest.exists(directory):
+            scaler_path = directory / 'scaler.npy'
+            scaler = self.load_scaler(scaler_path) if scaler_path.exists() else StandardScaler()
+            return None, scaler, CompiledForest.load(directory)
+        
+        with open(directory / 'model.pkl', 'rb') as f:
+            checkpoint = pickle.load(f)
+        return checkpoint['model'], checkpoint['scaler'], self.compile(checkpoint['model'], checkpoint['scaler'])
+    
+    def reload_segments(self):
+        """Pick up per-segment models retrained by another process"""
+        if self.segments:
+            self.segments.reload()
+    
+    def checkpoint_snapshot(self, full: bool) -> Dict[str, Any]:
+        """Model state for the checkpoint manager (fitted objects are replaced, never mutated)"""
+        return {
+            'model': self.model,
+            'scaler': self.scaler,
+            'compiled': self.compiled,
+            'feature_names': list(self.feature_names)
+        }
+    
+    def write_checkpoint(self, snapshot: Dict[str, Any], directory: Path):
+        """
+        Serialize a snapshot into a checkpoint directory (worker thread)
+        model.pkl keeps the sklearn objects; the compiled forest and the
+        scaler parameters are also written as arrays for memory-mapped loads
+        """
+        compiled = snapshot['compiled']
+        with open(directory / 'model.pkl', 'wb') as f:
+            pickle.dump({key: value for key, value in snapshot.items() if key != 'compiled'}, f)
+        
+        if compiled is not None:
+            compiled.save(directory)
+            scaler = snapshot['scaler']
+            if hasattr(scaler, 'mean_'):
+                np.save(directory / 'scaler.npy', np.vstack([scaler.mean_, scaler.scale_]))
+    
+    @staticmethod
+    def load_scaler(path: Path) -> StandardScaler:
+        """Rebuild a fitted StandardScaler from its saved [mean; scale] rows"""
+        mean, scale = np.load(path)
+        scaler = StandardScaler()
+        scaler.mean_ = mean
+        scaler.scale_ = scale
+        scaler.var_ = scale ** 2
+        scaler.n_features_in_ = len(mean)
+        return scaler
     
     def get_stats(self) -> Dict[str, Any]:
         """Get model statistics"""
@@ -189,5 +518,11 @@ class AnomalyDetector:
                 self.stats['anomalies_detected'] / self.stats['predictions']
                 if self.stats['predictions'] > 0 else 0
             ),
-            'last_prediction_time': self.stats['last_prediction_time']
+            'last_prediction_time': self.stats['last_prediction_time'],
+            'threshold': self.threshold,
+            'recent_scores': self.recent.get_stats(),
+            'compiled': self.compiled is not None,
+            'generation': self.generation,
+            'segments': self.segments.get_stats() if self.segments else None,
+            'checkpoints': self.checkpoints.get_stats()
         }
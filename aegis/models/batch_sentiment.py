@@ -0,0 +1,126 @@
+"""
+Batch Sentiment Scorer
+Vectorized lexicon scoring for large batches of texts
+Tokenizes once into a sparse document-term matrix and scores every lexicon
+with one sparse matrix-vector product
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix
+import re
+from typing import Dict, Iterable, List, Tuple
+
+# Equivalent to SentimentAnalyzer.preprocess_text on ASCII-encoded text:
+# [a-z0-9] are token bytes, everything else becomes a space. Non-ASCII
+# characters are replaced by '?' on encoding, so they separate tokens too.
+TOKEN_BYTES = set(b'abcdefghijklmnopqrstuvwxyz0123456789')
+TOKEN_TABLE = bytes(c if c in TOKEN_BYTES else 0x20 for c in range(256))
+
+# End-of-document marker, inserted as a standalone token between texts.
+# \x01 is not a token byte, so it is restored after translation.
+DOCUMENT_MARKER = b'\x01'
+MARKER_TABLE = TOKEN_TABLE[:1] + DOCUMENT_MARKER + TOKEN_TABLE[2:]
+
+
+class BatchSentimentScorer:
+    """
+    Columnar lexicon scorer with the same scoring rules as SentimentAnalyzer.analyze
+    """
+
+    def __init__(
+        self,
+        positive_words: Iterable[str],
+        negative_words: Iterable[str],
+        error_keywords: Iterable[str]
+    ):
+        # Lexicons are matched against ASCII token bytes
+        self.lexicons = {
+            'positive': frozenset(word.encode('utf-8') for word in positive_words),
+            'negative': frozenset(word.encode('utf-8') for word in negative_words),
+            'error': frozenset(word.encode('utf-8') for word in error_keywords)
+        }
+
+    def vectorize(self, texts: List[str]) -> Tuple[csr_matrix, List[bytes]]:
+        """
+        Build the document-term count matrix for a batch
+
+        Columns come from a vocabulary interned per batch instead of a fixed
+        hashing space, so unrelated tokens can never collide with lexicon
+        columns and counts stay exact.
+        """
+        # Tokenize the whole batch with a few C-level passes over one buffer
+        documents = [text or '' for text in texts]
+        joined = ' \x01 '.join(documents) + ' \x01'
+        if joined.count('\x01') != len(documents):
+            # A text carries the marker byte itself: blank it out first
+            documents = [document.replace('\x01', ' ') for document in documents]
+            joined = ' \x01 '.join(documents) + ' \x01'
+
+        buffer = joined.lower().encode('ascii', 'replace').translate(MARKER_TABLE)
+        tokens = buffer.split()
+
+        vocabulary = {token: column for column, token in enumerate(dict.fromkeys(tokens))}
+        ids = np.fromiter(map(vocabulary.__getitem__, tokens), dtype=np.int32, count=len(tokens))
+
+        # Markers delimit documents: drop them and turn their positions into row offsets
+        is_marker = ids == vocabulary[DOCUMENT_MARKER]
+        markers = np.flatnonzero(is_marker)
+        indices = ids[~is_marker]
+
+        indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        indptr[1:] = markers - np.arange(len(markers))
+
+        matrix = csr_matrix(
+            (
+                np.ones(len(indices), dtype=np.float64),
+                indices,
+                indptr
+            ),
+            shape=(len(texts), len(vocabulary))
+        )
+
+        return matrix, list(vocabulary)
+
+    def lexicon_vector(self, lexicon: str, vocabulary: List[bytes]) -> np.ndarray:
+        """
+        Indicator vector of lexicon membership over the batch vocabulary
+        """
+        words = self.lexicons[lexicon]
+        return np.fromiter(
+            (token in words for token in vocabulary),
+            dtype=np.float64,
+            count=len(vocabulary)
+        )
+
+    def score(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Score a batch of texts
+        Returns a columnar result: one array per field, aligned with texts
+        """
+        matrix, vocabulary = self.vectorize(texts)
+
+        token_count = np.diff(matrix.indptr)
+        positive = (matrix @ self.lexicon_vector('positive', vocabulary)).astype(np.int64)
+        negative = (matrix @ self.lexicon_vector('negative', vocabulary)).astype(np.int64)
+        error = (matrix @ self.lexicon_vector('error', vocabulary)).astype(np.int64)
+
+        total = positive + negative + error
+        has_sentiment = total > 0
+        length = np.maximum(token_count, 1)
+
+        score = np.where(has_sentiment, (positive - negative - error * 2) / length, 0.0)
+        confidence = np.where(has_sentiment, total / length, 0.0)
+
+        sentiment = np.full(len(texts), 'neutral', dtype='<U8')
+        sentiment[score > 0.1] = 'positive'
+        sentiment[score < -0.1] = 'negative'
+
+        return {
+            'sentiment': sentiment,
+            'score': score,
+            'confidence': confidence,
+            'positive_words': positive,
+            'negative_words': negative,
+            'error_words': error,
+            'token_count': token_count
+        }
@@ -0,0 +1,197 @@
+"""
+Compiled Isolation Forest
+Flattened NumPy scorer for a fitted sklearn IsolationForest
+All trees are packed into shared node arrays and traversed level by level
+with vectorized indexing, with the StandardScaler folded into the thresholds
+"""
+
+import numpy as np
+import logging
+from pathlib import Path
+import json
+
+logger = logging.getLogger(__name__)
+
+ARRAYS = ('feature', 'threshold', 'left', 'right', 'path', 'roots')
+
+
+def average_path_length(n_samples: np.ndarray) -> np.ndarray:
+    """
+    Average path length of an unsuccessful BST search over n samples
+    (the isolation-tree depth correction c(n) used by sklearn)
+    """
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    lengths = np.zeros_like(n_samples)
+
+    lengths[n_samples == 2] = 1.0
+    large = n_samples > 2
+    lengths[large] = (
+        2.0 * (np.log(n_samples[large] - 1.0) + np.euler_gamma)
+        - 2.0 * (n_samples[large] - 1.0) / n_samples[large]
+    )
+    return lengths
+
+
+class CompiledForest:
+    """
+    Isolation Forest exported to flat arrays (one entry per node, all trees)
+
+        feature[node]    input feature tested at the node (0 at leaves)
+        threshold[node]  split threshold in raw (unscaled) feature units;
+                         +inf at leaves, so leaves always "go left"
+        left/right[node] global child indices; leaves point at themselves
+        path[node]       leaf depth plus c(n_node_samples), 0 at inner nodes
+
+    Scoring starts every tree at its root and takes depth steps, so after
+    max_depth steps each row sits on its leaf. Matches
+    IsolationForest.score_samples up to float32 rounding at split
+    boundaries (sklearn compares float32 inputs).
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        path: np.ndarray,
+        roots: np.ndarray,
+        depth: int,
+        normalizer: float,
+        n_features: int
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.path = path
+        self.roots = roots
+        self.depth = depth
+        self.normalizer = normalizer
+        self.n_features = n_features
+
+    @classmethod
+    def from_sklearn(cls, model, scaler=None) -> 'CompiledForest':
+        """
+        Export a fitted IsolationForest, fusing an optional fitted StandardScaler
+        Trees test (x - mean) / scale <= t, i.e. x <= t * scale + mean
+        """
+        n_features = model.n_features_in_
+
+        mean = np.zeros(n_features)
+        scale = np.ones(n_features)
+        if scaler is not None:
+            if getattr(scaler, 'mean_', None) is not None:
+                mean = np.asarray(scaler.mean_, dtype=np.float64)
+            if getattr(scaler, 'scale_', None) is not None:
+                scale = np.asarray(scaler.scale_, dtype=np.float64)
+
+        features, thresholds, lefts, rights, paths, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator, estimator_features in zip(model.estimators_, model.estimators_features_):
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            left = tree.children_left.astype(np.int64)
+            right = tree.children_right.astype(np.int64)
+            is_leaf = left == -1
+
+            # Trees fitted on a feature subset index into that subset
+            tree_features = tree.feature.astype(np.int64)
+            if len(estimator_features) != n_features:
+                tree_features = np.asarray(estimator_features, dtype=np.int64)[np.maximum(tree_features, 0)]
+            tree_features = np.where(is_leaf, 0, tree_features)
+
+            # Node depths (children always have higher indices than parents)
+            depths = np.zeros(n_nodes, dtype=np.int64)
+            for node in range(n_nodes):
+                if not is_leaf[node]:
+                    depths[left[node]] = depths[node] + 1
+                    depths[right[node]] = depths[node] + 1
+            max_depth = max(max_depth, int(depths.max()))
+
+            nodes = np.arange(n_nodes, dtype=np.int64)
+            features.append(tree_features)
+            thresholds.append(np.where(
+                is_leaf, np.inf,
+                tree.threshold * scale[tree_features] + mean[tree_features]
+            ))
+            lefts.append(np.where(is_leaf, nodes, left) + offset)
+            rights.append(np.where(is_leaf, nodes, right) + offset)
+            paths.append(np.where(
+                is_leaf, depths + average_path_length(tree.n_node_samples), 0.0
+            ))
+            roots.append(offset)
+            offset += n_nodes
+
+        normalizer = len(model.estimators_) * float(average_path_length(np.array([model.max_samples_]))[0])
+
+        logger.info(f"🔧 Compiled isolation forest: {len(roots)} trees, {offset} nodes, depth {max_depth}")
+
+        return cls(
+            np.concatenate(features),
+            np.concatenate(thresholds),
+            np.concatenate(lefts),
+            np.concatenate(rights),
+            np.concatenate(paths),
+            np.asarray(roots, dtype=np.int64),
+            max_depth,
+            normalizer,
+            n_features
+        )
+
+    def save(self, directory: Path):
+        """
+        Write the node arrays as forest.<name>.npy plus forest.json
+        Separate .npy files can be memory-mapped by every worker process
+        """
+        directory = Path(directory)
+        for name in ARRAYS:
+            np.save(directory / f"forest.{name}.npy", getattr(self, name))
+
+        with open(directory / 'forest.json', 'w', encoding='utf-8') as f:
+            json.dump({
+                'depth': self.depth,
+                'normalizer': self.normalizer,
+                'n_features': self.n_features
+            }, f)
+
+    @classmethod
+    def exists(cls, directory: Path) -> bool:
+        return (Path(directory) / 'forest.json').exists()
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> 'CompiledForest':
+        """
+        Load saved node arrays read-only memory-mapped: O(1) load, pages
+        read on first use and shared with other processes mapping the file
+        """
+        directory = Path(directory)
+        with open(directory / 'forest.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        arrays = {
+            name: np.load(directory / f"forest.{name}.npy", mmap_mode='r' if mmap else None)
+            for name in ARRAYS
+        }
+        return cls(**arrays, **meta)
+
+    def path_lengths(self, X: np.ndarray) -> np.ndarray:
+        """Sum over trees of the (corrected) path length of each row"""
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.n_features)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return self.path[nodes].sum(axis=1)
+
+    def score_samples(self, X: np.ndarray) -> np.ndarray:
+        """Same as IsolationForest.score_samples (lower = more anomalous)"""
+        lengths = self.path_lengths(X)
+        if self.normalizer == 0:
+            return -np.ones_like(lengths)  # Fitted on a single sample
+        return -np.power(2.0, -lengths / self.normalizer)
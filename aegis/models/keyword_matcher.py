@@ -0,0 +1,197 @@
+"""
+Keyword Matcher
+Multi-pattern keyword and phrase matcher for log classification
+All keyword lists compile into one trie-shaped regex that scans a message in a single pass
+"""
+
+import logging
+from typing import Dict, Any, List, Iterable, Optional
+import re
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+# Default keyword and phrase lists per category
+DEFAULT_CATEGORIES = {
+    'fatal': [
+        'fatal', 'critical', 'emergency', 'panic', 'crash',
+        'kernel panic', 'out of memory', 'segmentation fault', 'stack overflow',
+        'data corruption'
+    ],
+    'blockchain': [
+        'out of gas', 'execution reverted', 'nonce too low', 'replacement transaction underpriced',
+        'insufficient funds', 'transaction underpriced', 'chain reorg'
+    ],
+    'connectivity': [
+        'connection refused', 'connection reset', 'connection timed out', 'econnrefused',
+        'econnreset', 'etimedout', 'host unreachable', 'broken pipe', 'timeout'
+    ],
+    'security': [
+        'unauthorized', 'forbidden', 'access denied', 'permission denied',
+        'invalid signature', 'invalid token'
+    ],
+    'error': [
+        'exception', 'error', 'fail', 'failed', 'failure', 'denied',
+        'invalid', 'refused', 'rejected'
+    ]
+}
+
+DEFAULT_FATAL_CATEGORIES = ['fatal']
+
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+SEPARATOR = r'[^a-z0-9]+'
+
+
+class KeywordMatcher:
+    """
+    Compiled multi-pattern matcher
+
+    Keywords match on token boundaries ([a-z0-9] runs, case-insensitive), the
+    same way words are split by SentimentAnalyzer.preprocess_text. Phrases
+    match across any run of non-token characters, so "connection refused",
+    "connection_refused" and "connection-refused" are the same phrase.
+
+    All keywords are merged into a character trie and emitted as one regex,
+    so each position of a message is rejected after a single character test
+    and the longest keyword at a position wins. Each keyword ends in an empty
+    named group, so the group that matched gives its category (the matched
+    text can differ from the keyword: case-insensitive matching of non-ASCII
+    text also accepts characters such as 'ı' for 'i').
+    """
+
+    def __init__(
+        self,
+        categories: Optional[Dict[str, Iterable[str]]] = None,
+        fatal_categories: Optional[Iterable[str]] = None
+    ):
+        # Normalized keyword -> category (first category wins on duplicates)
+        self.keywords = {}
+        for category, keywords in (categories or DEFAULT_CATEGORIES).items():
+            for keyword in keywords:
+                normalized = self.normalize(keyword)
+                if normalized:
+                    self.keywords.setdefault(normalized, category)
+
+        self.fatal_categories = frozenset(
+            fatal_categories if fatal_categories is not None else DEFAULT_FATAL_CATEGORIES
+        )
+
+        # Regex group name ending each keyword -> category
+        self.group_categories = {}
+
+        # Lowercased input uses the plain pattern; the case-insensitive one is
+        # only needed when lowercasing would shift offsets (some non-ASCII text)
+        source = self.compile()
+        self.pattern = re.compile(source) if source else None
+        self.pattern_ci = re.compile(source, re.IGNORECASE) if source else None
+
+    @classmethod
+    def from_config(cls, path: Optional[str] = None) -> 'KeywordMatcher':
+        """
+        Build a matcher from a JSON config file
+        {"categories": {"name": ["keyword", "multi word phrase"]}, "fatal_categories": ["name"]}
+        Falls back to the default lists when no file is configured
+        """
+        path = path or os.getenv('AEGIS_KEYWORDS_FILE')
+        if not path:
+            return cls()
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            logger.info(f"📦 Loaded keyword lists from {path}")
+            return cls(config.get('categories'), config.get('fatal_categories'))
+
+        except Exception as e:
+            logger.error(f"❌ Failed to load keyword lists from {path}: {str(e)}")
+            return cls()
+
+    @staticmethod
+    def normalize(keyword: str) -> str:
+        """Keyword as lowercase tokens joined by single spaces"""
+        return ' '.join(TOKEN_PATTERN.findall(keyword.lower()))
+
+    def compile(self) -> Optional[str]:
+        """Build the trie regex source for all keywords"""
+        if not self.keywords:
+            return None
+
+        trie = {}
+        for keyword, category in self.keywords.items():
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = category
+
+        return r'(?<![a-z0-9])' + self.emit(trie) + r'(?![a-z0-9])'
+
+    def emit(self, node: Dict[str, Any]) -> str:
+        """
+        Regex for a trie node: alternation of children, or the keyword's end
+        group if a keyword ends here (tried after the longer keywords)
+        """
+        branches = [
+            (SEPARATOR if char == ' ' else re.escape(char)) + self.emit(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        end = None
+        if '' in node:
+            name = f"k{len(self.group_categories)}"
+            self.group_categories[name] = node['']
+            end = f"(?P<{name}>)"
+
+        if not branches:
+            return end or ''
+
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + body + '|' + end + ')' if end else body
+
+    def finditer(self, text: str):
+        """Iterate keyword matches with offsets into the original text"""
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return self.pattern.finditer(lowered)
+        return self.pattern_ci.finditer(text)
+
+    def match(self, text: str) -> List[Dict[str, Any]]:
+        """
+        All non-overlapping keyword matches in one left-to-right pass
+        Returns category, matched text and offsets for each match
+        """
+        if not text or self.pattern is None:
+            return []
+
+        return [
+            {
+                'category': self.group_categories[m.lastgroup],
+                'keyword': text[m.start():m.end()],
+                'start': m.start(),
+                'end': m.end()
+            }
+            for m in self.finditer(text)
+        ]
+
+    def classify(self, text: str) -> Dict[str, Any]:
+        """
+        Classify a message: matched categories, matches and fatal-class flag
+        """
+        matches = self.match(text)
+        categories = sorted({m['category'] for m in matches})
+
+        return {
+            'categories': categories,
+            'matches': matches,
+            'fatal': any(category in self.fatal_categories for category in categories)
+        }
+
+    def is_fatal(self, text: str) -> bool:
+        """True if the message contains any fatal-class keyword"""
+        if not text or self.pattern is None:
+            return False
+
+        return any(
+            self.group_categories[m.lastgroup] in self.fatal_categories
+            for m in self.finditer(text)
+        )
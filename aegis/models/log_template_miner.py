@@ -0,0 +1,348 @@
+"""
+Log Template Miner
+Online log parsing with a Drain-style fixed-depth parse tree
+Maps each log message to a template ID plus its variable parameters
+"""
+
+import logging
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+import hashlib
+import re
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+WILDCARD = '<*>'
+
+
+def template_id_for(tokens: List[str], salt: int = 0) -> int:
+    """
+    Id of a new template: a 63-bit hash of its tokens when created, so every
+    process (API workers, stream workers) gives the same template the same
+    id without coordinating, and different templates never share a document
+    """
+    text = ' '.join(tokens) if not salt else f"{' '.join(tokens)}#{salt}"
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big') >> 1
+
+
+class LogTemplate:
+    """
+    A mined log template (cluster of messages sharing the same constant tokens)
+    """
+
+    __slots__ = (
+        'template_id', 'tokens', 'count', 'first_seen', 'last_seen',
+        'window_start', 'window_count', 'baseline', 'spiking', 'annotations',
+        'unsaved'
+    )
+
+    def __init__(self, template_id: int, tokens: List[str], now: float):
+        self.template_id = template_id
+        self.tokens = tokens
+        self.count = 0
+        self.unsaved = 0  # Occurrences since the last persistence
+        self.first_seen = now
+        self.last_seen = now
+
+        # Per-window counts for spike detection
+        self.window_start = now
+        self.window_count = 0
+        self.baseline = None
+        self.spiking = False
+
+        # Per-template analysis results (sentiment, criticality...),
+        # cleared whenever the template text changes
+        self.annotations = {}
+
+    @property
+    def text(self) -> str:
+        return ' '.join(self.tokens)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Changes for persistence: occurrences are added to the stored count"""
+        return {
+            'template_id': self.template_id,
+            'template': self.text,
+            'occurrences': self.unsaved,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen
+        }
+
+
+class LogTemplateMiner:
+    """
+    Drain log template miner
+
+    Messages are routed through a tree of fixed depth: first by token count,
+    then by their leading tokens. The leaf holds candidate templates and the
+    message joins the most similar one (or starts a new template). Tokens
+    that differ between messages of a template become wildcards, which are
+    returned as the message parameters.
+    """
+
+    # Obvious parameters (uuids, hex, IPs, numbers with units) are masked before tree routing
+    MASK_PATTERN = re.compile(
+        r'(?:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
+        r'|0x[0-9a-f]+'
+        r'|\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?'
+        r'|[-+]?\d+(?:\.\d+)?(?:ms|s|kb|mb|gb|%)?)$',
+        re.IGNORECASE
+    )
+    DIGIT_PATTERN = re.compile(r'\d')
+
+    def __init__(self):
+        self.is_loaded = False
+
+        # Drain parameters
+        self.depth = int(os.getenv('AEGIS_LOG_MINER_DEPTH', 4))
+        self.similarity_threshold = float(os.getenv('AEGIS_LOG_MINER_SIMILARITY', 0.4))
+        self.max_children = int(os.getenv('AEGIS_LOG_MINER_MAX_CHILDREN', 100))
+
+        # Spike detection parameters
+        self.window_seconds = float(os.getenv('AEGIS_LOG_SPIKE_WINDOW', 60))
+        self.spike_factor = float(os.getenv('AEGIS_LOG_SPIKE_FACTOR', 5.0))
+        self.spike_min_count = int(os.getenv('AEGIS_LOG_SPIKE_MIN_COUNT', 20))
+        self.baseline_alpha = 0.3
+
+        self.root = {}
+        self.templates = {}
+
+        # Templates changed since the last persistence / seen since the last spike check
+        self.dirty = set()
+        self.recent = set()
+
+        self.stats = {
+            'messages': 0,
+            'templates_created': 0,
+            'templates_updated': 0,
+            'spikes_detected': 0
+        }
+
+    async def load_model(self, stored_templates: Optional[List[Dict[str, Any]]] = None):
+        """Initialize the miner, optionally restoring stored templates"""
+        try:
+            logger.info("📦 Loading log template miner")
+
+            for doc in stored_templates or []:
+                self.restore_template(doc)
+
+            self.is_loaded = True
+            logger.info(f"✅ Log template miner loaded ({len(self.templates)} templates)")
+
+        except Exception as e:
+            logger.error(f"❌ Failed to load log template miner: {str(e)}")
+            self.is_loaded = True
+
+    def tokenize(self, message: str) -> List[str]:
+        """Split a message into tokens, masking obvious parameters"""
+        is_param = self.MASK_PATTERN.match
+        return [WILDCARD if is_param(token) else token for token in message.split()]
+
+    def route(self, tokens: List[str]) -> List[int]:
+        """
+        Walk the parse tree to the leaf for a token sequence (creating nodes on demand)
+        Returns the leaf's list of template ids
+        """
+        node = self.root.setdefault(len(tokens), {})
+
+        # Tokens containing digits are likely parameters: route them to the
+        # wildcard child, as are new tokens once a node is full
+        prefix = tokens[:max(self.depth - 2, 1)]
+        for i, token in enumerate(prefix):
+            key = WILDCARD if self.DIGIT_PATTERN.search(token) else token
+            if key not in node and len(node) >= self.max_children:
+                key = WILDCARD
+
+            node = node.setdefault(key, [] if i == len(prefix) - 1 else {})
+
+        return node
+
+    def similarity(self, template_tokens: List[str], tokens: List[str]) -> Tuple[float, int]:
+        """Share of equal tokens between a template and a message, and wildcard count"""
+        equal = 0
+        wildcards = 0
+        for template_token, token in zip(template_tokens, tokens):
+            if template_token == WILDCARD:
+                wildcards += 1
+            elif template_token == token:
+                equal += 1
+
+        return equal / len(tokens), wildcards
+
+    def match(self, leaf: List[int], tokens: List[str]) -> Optional[LogTemplate]:
+        """Most similar template of a leaf above the similarity threshold"""
+        best = None
+        best_key = (-1.0, -1)
+
+        for template_id in leaf:
+            template = self.templates[template_id]
+            similarity, wildcards = self.similarity(template.tokens, tokens)
+            if (similarity, wildcards) > best_key:
+                best, best_key = template, (similarity, wildcards)
+
+        if best is not None and best_key[0] >= self.similarity_threshold:
+            return best
+        return None
+
+    def add_message(self, message: str, now: Optional[float] = None) -> Tuple[LogTemplate, List[str]]:
+        """
+        Map a message to its template, creating or generalizing templates as needed
+        Returns the template and the message parameters
+        """
+        now = now if now is not None else time.time()
+        tokens = self.tokenize(message) or [WILDCARD]
+        leaf = self.route(tokens)
+
+        template = self.match(leaf, tokens)
+
+        if template is None:
+            template = LogTemplate(self.new_id(tokens), tokens, now)
+            self.templates[template.template_id] = template
+            leaf.append(template.template_id)
+            self.stats['templates_created'] += 1
+        else:
+            merged = [
+                template_token if template_token == token else WILDCARD
+                for template_token, token in zip(template.tokens, tokens)
+            ]
+            if merged != template.tokens:
+                template.tokens = merged
+                template.annotations = {}
+                self.stats['templates_updated'] += 1
+
+        self.record(template, now)
+
+        return template, self.extract_params(template, message)
+
+    def new_id(self, tokens: List[str]) -> int:
+        """Content id for a new template (salted if a generalized template already holds it)"""
+        salt = 0
+        while template_id_for(tokens, salt) in self.templates:
+            salt += 1
+        return template_id_for(tokens, salt)
+
+    def record(self, template: LogTemplate, now: float):
+        """Count one occurrence of a template"""
+        template.count += 1
+        template.unsaved += 1
+        template.window_count += 1
+        template.last_seen = now
+        self.dirty.add(template.template_id)
+        self.recent.add(template.template_id)
+        self.stats['messages'] += 1
+
+    def extract_params(self, template: LogTemplate, message: str) -> List[str]:
+        """Message tokens at the wildcard positions of its template"""
+        return [
+            token
+            for template_token, token in zip(template.tokens, message.split())
+            if template_token == WILDCARD
+        ]
+
+    def process_batch(self, messages: List[str]) -> List[Tuple[int, List[str]]]:
+        """
+        Map a batch of messages to (template_id, params)
+        Identical messages within a batch are parsed once
+        """
+        now = time.time()
+        seen = {}
+        results = []
+
+        for message in messages:
+            template = seen.get(message)
+
+            if template is None:
+                template, params = self.add_message(message, now)
+                seen[message] = template
+            else:
+                self.record(template, now)
+                params = self.extract_params(template, message)
+
+            results.append((template.template_id, params))
+
+        return results
+
+    def detect_spikes(self, now: Optional[float] = None) -> List[LogTemplate]:
+        """
+        Roll count windows and return templates that just started spiking
+        A template spikes when its current window count exceeds spike_factor
+        times its baseline (EWMA of previous windows)
+        """
+        now = now if now is not None else time.time()
+        spiking = []
+
+        for template_id in self.recent:
+            template = self.templates[template_id]
+
+            if now - template.window_start >= self.window_seconds:
+                template.baseline = (
+                    template.window_count if template.baseline is None
+                    else self.baseline_alpha * template.window_count
+                    + (1 - self.baseline_alpha) * template.baseline
+                )
+                template.window_start = now
+                template.window_count = 0
+                template.spiking = False
+                continue
+
+            if template.spiking or template.baseline is None:
+                continue
+
+            if (
+                template.window_count >= self.spike_min_count
+                and template.window_count > self.spike_factor * max(template.baseline, 1.0)
+            ):
+                template.spiking = True
+                spiking.append(template)
+                self.stats['spikes_detected'] += 1
+
+        self.recent = set()
+        return spiking
+
+    def dirty_templates(self) -> List[Dict[str, Any]]:
+        """Templates changed since they were last stored (cleared by mark_saved)"""
+        return [self.templates[template_id].to_dict() for template_id in self.dirty]
+
+    def mark_saved(self, templates: List[Dict[str, Any]], failed: Iterable[int] = ()):
+        """
+        Record that dirty_templates() were stored, except the failed ones;
+        occurrences counted while they were being stored stay unsaved
+        """
+        failed = set(failed)
+        for stored in templates:
+            if stored['template_id'] in failed:
+                continue
+            template = self.templates[stored['template_id']]
+            template.unsaved -= stored['occurrences']
+            if not template.unsaved:
+                self.dirty.discard(template.template_id)
+
+    def restore_template(self, doc: Dict[str, Any]):
+        """Re-insert a stored template into the parse tree"""
+        tokens = doc['template'].split()
+        template = LogTemplate(doc['template_id'], tokens, doc.get('first_seen', time.time()))
+        template.count = doc.get('count', 0)
+        template.last_seen = doc.get('last_seen', template.first_seen)
+
+        self.templates[template.template_id] = template
+        self.route(tokens).append(template.template_id)
+
+    def get_template(self, template_id: int) -> Optional[LogTemplate]:
+        """Look up a template by id"""
+        return self.templates.get(template_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get miner statistics"""
+        return {
+            'is_loaded': self.is_loaded,
+            'messages': self.stats['messages'],
+            'templates': len(self.templates),
+            'templates_created': self.stats['templates_created'],
+            'templates_updated': self.stats['templates_updated'],
+            'spikes_detected': self.stats['spikes_detected'],
+            'compression_ratio': (
+                self.stats['messages'] / len(self.templates)
+                if self.templates else 0
+            )
+        }
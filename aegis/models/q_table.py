@@ -0,0 +1,237 @@
+"""
+Q-Table
+Dense array-backed Q-table for tabular reinforcement learning
+States are interned to row indices over a fixed action list
+"""
+
+import numpy as np
+import logging
+from typing import Dict, Any, Optional, Iterable, Tuple
+from pathlib import Path
+import json
+
+logger = logging.getLogger(__name__)
+
+
+class QTable:
+    """
+    Q-values as a float32 matrix (states x actions)
+
+    Cells never written hold NaN, so "no value learned yet" stays distinct
+    from a learned value of 0 (the semantics of the previous nested-dict
+    table, where only visited actions had entries). Rows are allocated by
+    doubling the capacity, so interning a new state is amortized O(1).
+    """
+
+    def __init__(self, actions: Iterable[str], capacity: int = 64):
+        self.actions = list(actions)
+        self.action_index = {action: i for i, action in enumerate(self.actions)}
+
+        self.index = {}   # state -> row
+        self.states = []  # row -> state
+        self.values = np.full((max(capacity, 1), len(self.actions)), np.nan, dtype=np.float32)
+
+        # Change tracking: a global version bumped on every write and the
+        # version at which each row last changed. Consumers (delta
+        # checkpoints, recommendation snapshots) keep the version they last
+        # saw and ask for the rows changed since.
+        self.version = 0
+        self.row_versions = np.zeros(len(self.values), dtype=np.int64)
+        self.snapshot_rows = 0
+        self.snapshot_version = 0
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def __contains__(self, state: str) -> bool:
+        return state in self.index
+
+    def intern(self, state: str) -> Tuple[int, bool]:
+        """
+        Row index of a state, allocating a row for new states
+        Returns (row, is_new)
+        """
+        row = self.index.get(state)
+        if row is not None:
+            return row, False
+
+        row = len(self.states)
+        if row >= len(self.values):
+            self.grow(row + 1)
+
+        self.index[state] = row
+        self.states.append(state)
+        return row, True
+
+    def grow(self, min_rows: int):
+        """Reallocate with doubled capacity (new rows start unlearned)"""
+        capacity = max(len(self.values), 1)
+        while capacity < min_rows:
+            capacity *= 2
+
+        values = np.full((capacity, len(self.actions)), np.nan, dtype=np.float32)
+        values[:len(self.states)] = self.values[:len(self.states)]
+        self.values = values
+
+        row_versions = np.zeros(capacity, dtype=np.int64)
+        row_versions[:len(self.states)] = self.row_versions[:len(self.states)]
+        self.row_versions = row_versions
+
+    def row(self, state: str) -> Optional[np.ndarray]:
+        """Q-values of a state (view; NaN for unlearned actions)"""
+        row = self.index.get(state)
+        return self.values[row] if row is not None else None
+
+    def is_learned(self, state: str) -> bool:
+        """True if any action of the state has a learned value"""
+        values = self.row(state)
+        return values is not None and not np.isnan(values).all()
+
+    def get(self, state: str, action: str, default: float = 0.0) -> float:
+        """Q-value of a state-action pair (default when unlearned)"""
+        values = self.row(state)
+        if values is None:
+            return default
+
+        value = values[self.action_index[action]]
+        return default if np.isnan(value) else float(value)
+
+    def best_action(self, state: str) -> Optional[str]:
+        """Learned action with the highest Q-value, or None if nothing is learned"""
+        if not self.is_learned(state):
+            return None
+        return self.actions[int(np.nanargmax(self.row(state)))]
+
+    def action_values(self, state: str) -> Dict[str, float]:
+        """Learned Q-values of a state by action"""
+        values = self.row(state)
+        if values is None:
+            return {}
+
+        return {
+            action: float(value)
+            for action, value in zip(self.actions, values)
+            if not np.isnan(value)
+        }
+
+    def learned_states(self) -> int:
+        """Number of states with at least one learned value"""
+        return int((~np.isnan(self.values[:len(self.states)])).any(axis=1).sum())
+
+    def mark_dirty(self, rows):
+        """Record rows whose values changed (a row index or an array of them)"""
+        self.version += 1
+        self.row_versions[rows] = self.version
+
+    def changed_rows(self, since_version: int) -> np.ndarray:
+        """Rows changed after a given version"""
+        return np.flatnonzero(self.row_versions[:len(self.states)] > since_version)
+
+    def with_actions(self, actions: Iterable[str]) -> 'QTable':
+        """Copy of the table over another action list (values of shared actions kept)"""
+        table = QTable(actions, capacity=len(self.states))
+        for state in self.states:
+            table.intern(state)
+
+        rows = len(self.states)
+        for i, action in enumerate(table.actions):
+            if action in self.action_index:
+                table.values[:rows, i] = self.values[:rows, self.action_index[action]]
+
+        return table
+
+    def snapshot(self, full: bool = True) -> Dict[str, Any]:
+        """
+        In-memory copy for checkpointing
+        A delta holds only the rows changed and the states added since the
+        previous snapshot
+        """
+        rows = len(self.states)
+
+        if full:
+            snapshot = {
+                'kind': 'full',
+                'actions': list(self.actions),
+                'states': list(self.states),
+                'values': self.values[:rows].copy()
+            }
+        else:
+            changed = self.changed_rows(self.snapshot_version)
+            snapshot = {
+                'kind': 'delta',
+                'start': self.snapshot_rows,
+                'states': self.states[self.snapshot_rows:rows],
+                'rows': changed,
+                'values': self.values[changed].copy()
+            }
+
+        self.snapshot_rows = rows
+        self.snapshot_version = self.version
+        return snapshot
+
+    @classmethod
+    def write_snapshot(cls, snapshot: Dict[str, Any], directory: Path):
+        """
+        Serialize a snapshot into a checkpoint directory
+        Full: q_table.npy plus q_table.index.json; delta: q_table.delta.npz plus q_table.delta.json
+        """
+        directory = Path(directory)
+
+        if snapshot['kind'] == 'full':
+            np.save(directory / 'q_table.npy', snapshot['values'])
+            with open(cls.index_path(directory / 'q_table.npy'), 'w', encoding='utf-8') as f:
+                json.dump({'actions': snapshot['actions'], 'states': snapshot['states']}, f)
+        else:
+            np.savez(directory / 'q_table.delta.npz', rows=snapshot['rows'], values=snapshot['values'])
+            with open(directory / 'q_table.delta.json', 'w', encoding='utf-8') as f:
+                json.dump({'start': snapshot['start'], 'states': snapshot['states']}, f)
+
+    def apply_delta(self, directory: Path):
+        """Replay a delta checkpoint on top of the table it was taken from"""
+        directory = Path(directory)
+
+        with open(directory / 'q_table.delta.json', 'r', encoding='utf-8') as f:
+            delta = json.load(f)
+        if delta['start'] != len(self.states):
+            raise ValueError(f"Delta starts at row {delta['start']}, table has {len(self.states)} rows")
+
+        for state in delta['states']:
+            self.intern(state)
+
+        with np.load(directory / 'q_table.delta.npz') as arrays:
+            self.values[arrays['rows']] = arrays['values']
+            self.mark_dirty(arrays['rows'])
+
+        self.snapshot_rows = len(self.states)
+        self.snapshot_version = self.version
+
+    @staticmethod
+    def index_path(path: Path) -> Path:
+        path = Path(path)
+        return path.with_name(path.stem + '.index.json')
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> Tuple['QTable', Dict[str, Any]]:
+        """
+        Load a saved table; the matrix is memory-mapped copy-on-write, so
+        loading is O(1) and pages are read on first access
+        Returns the table and the full index document
+        """
+        with open(cls.index_path(path), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+
+        values = np.load(path, mmap_mode='c' if mmap else None)
+        if values.dtype != np.float32 or values.shape[1:] != (len(index['actions']),):
+            raise ValueError(f"Q-table matrix {values.shape} does not match its index")
+
+        # A crash between the two renames can leave the matrix with extra rows
+        states = index['states'][:len(values)]
+
+        table = cls(index['actions'], capacity=1)
+        table.values = values[:len(states)]
+        table.row_versions = np.zeros(len(states), dtype=np.int64)
+        table.states = list(states)
+        table.index = {state: row for row, state in enumerate(states)}
+        table.snapshot_rows = len(states)
+
+        return table, index
@@ -0,0 +1,108 @@
+"""
+Score Buffer
+Columnar ring buffer of the most recent anomaly scores
+Lets a threshold change be evaluated against recent traffic by filtering
+the stored scores, without re-running any model
+"""
+
+import numpy as np
+import logging
+from typing import Dict, Any, List, Optional
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreBuffer:
+    """
+    Last `capacity` scored events as parallel arrays
+
+        event_ids   object  event identifier
+        segments    object  segment the event was scored in (None = global)
+        scores      float64 anomaly score (0-1)
+        timestamps  int64   event timestamp (ms)
+
+    Appends write a whole scored batch with one fancy-indexed assignment per
+    column. The arrays are allocated on the first append, so detectors that
+    never serve live traffic (segment models, shadow candidates) cost nothing.
+    """
+
+    def __init__(self, capacity: Optional[int] = None):
+        self.capacity = max(1, int(capacity or os.getenv('AEGIS_SCORE_BUFFER_SIZE', 100000)))
+        self.event_ids = None
+        self.segments = None
+        self.scores = None
+        self.timestamps = None
+        self.head = 0  # Next slot to write
+        self.size = 0
+        self.appended = 0
+
+    def allocate(self):
+        self.event_ids = np.empty(self.capacity, dtype=object)
+        self.segments = np.empty(self.capacity, dtype=object)
+        self.scores = np.zeros(self.capacity)
+        self.timestamps = np.zeros(self.capacity, dtype=np.int64)
+
+    def append(
+        self,
+        event_ids: List[Any],
+        segments: List[Optional[str]],
+        scores: np.ndarray,
+        timestamps: List[Optional[int]]
+    ):
+        """Store a scored batch, overwriting the oldest entries when full"""
+        n = len(scores)
+        if not n:
+            return
+        if self.scores is None:
+            self.allocate()
+
+        # A batch larger than the buffer only keeps its newest rows
+        skip = max(0, n - self.capacity)
+        slots = (self.head + np.arange(n - skip)) % self.capacity
+
+        self.event_ids[slots] = np.asarray(event_ids, dtype=object)[skip:]
+        self.segments[slots] = np.asarray(segments, dtype=object)[skip:]
+        self.scores[slots] = np.asarray(scores, dtype=np.float64)[skip:]
+        self.timestamps[slots] = np.asarray([t or 0 for t in timestamps[skip:]], dtype=np.int64)
+
+        self.head = int((self.head + n - skip) % self.capacity)
+        self.size = min(self.capacity, self.size + n)
+        self.appended += n
+
+    def evaluate(self, previous: float, threshold: float, limit: int = 100) -> Dict[str, Any]:
+        """
+        Compare two thresholds over the buffered scores
+        Returns the counts under each and the events the new one flags that
+        the previous one did not (highest scores first, at most `limit`)
+        """
+        # Filled slots are [0, size) until the buffer wraps, then all of it
+        scores = self.scores[:self.size] if self.size else np.zeros(0)
+        before = scores > previous
+        after = scores > threshold
+        newly = np.flatnonzero(after & ~before)
+
+        top = newly[np.argsort(-scores[newly], kind='stable')[:limit]]
+        return {
+            'events': self.size,
+            'flagged_before': int(before.sum()),
+            'flagged_after': int(after.sum()),
+            'newly_flagged': len(newly),
+            'cleared': int((before & ~after).sum()),
+            'newly_flagged_events': [
+                {
+                    'event_id': self.event_ids[i],
+                    'segment': self.segments[i],
+                    'score': float(self.scores[i]),
+                    'timestamp': int(self.timestamps[i])
+                }
+                for i in top
+            ]
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'capacity': self.capacity,
+            'size': self.size,
+            'appended': self.appended
+        }
@@ -0,0 +1,186 @@
+"""
+Segment Models
+Family of anomaly models keyed by segment (event type, service, contract)
+Models load lazily on first use into a size-bounded LRU cache
+"""
+
+import numpy as np
+import logging
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable, List
+import multiprocessing
+import hashlib
+import asyncio
+import json
+import os
+import re
+
+from utils.checkpoint import atomic_write
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.json'
+
+
+class SegmentModels:
+    """
+    Per-segment detectors stored under one directory
+
+        <directory>/index.json     segment -> directory slug
+        <directory>/<slug>/gen-*   checkpoints of that segment's detector
+
+    Only trained segments are listed in the index; any other segment (and
+    one whose checkpoint fails to load) is scored by the global model.
+    At most `capacity` detectors are kept in memory, least recently used
+    first out; their forests are memory-mapped, so reloading is cheap.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        factory: Callable[[Path], Any],
+        capacity: Optional[int] = None,
+        min_events: Optional[int] = None,
+        workers: Optional[int] = None
+    ):
+        self.directory = Path(directory)
+        self.factory = factory  # model_path -> unsegmented AnomalyDetector
+        self.capacity = max(1, int(capacity or os.getenv('AEGIS_ANOMALY_SEGMENT_CACHE', 32)))
+        self.min_events = int(min_events or os.getenv('AEGIS_ANOMALY_SEGMENT_MIN_EVENTS', 200))
+        self.workers = max(1, int(workers or os.getenv('AEGIS_ANOMALY_SEGMENT_WORKERS', os.cpu_count() or 1)))
+
+        self.index = {}
+        self.cache = OrderedDict()
+        self.unavailable = set()  # Indexed segments whose checkpoint did not load
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'loads': 0,
+            'evictions': 0
+        }
+
+    @staticmethod
+    def slug(segment: str) -> str:
+        """Filesystem-safe, collision-free directory name for a segment"""
+        digest = hashlib.sha1(segment.encode('utf-8')).hexdigest()[:8]
+        return f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', segment)[:48]}-{digest}"
+
+    def load_index(self):
+        """Read the list of trained segments (models themselves load on demand)"""
+        path = self.directory / INDEX_FILE
+        try:
+            if path.exists():
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.index = json.load(f)
+                logger.info(f"📦 {len(self.index)} segment anomaly models available")
+        except Exception as e:
+            logger.error(f"❌ Failed to read segment index: {str(e)}")
+            self.index = {}
+
+    def reload(self):
+        """Re-read the index and drop cached detectors (segments were retrained elsewhere)"""
+        self.load_index()
+        self.cache.clear()
+        self.unavailable.clear()
+
+    def save_index(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(self.index, indent=2, sort_keys=True).encode('utf-8')
+        atomic_write(self.directory / INDEX_FILE, lambda f: f.write(data))
+
+    def model_path(self, segment: str) -> Path:
+        return self.directory / f"{self.index.get(segment) or self.slug(segment)}.pkl"
+
+    def put(self, segment: str, detector):
+        """Insert as most recently used, evicting beyond capacity"""
+        self.cache[segment] = detector
+        self.cache.move_to_end(segment)
+
+        while len(self.cache) > self.capacity:
+            evicted, _ = self.cache.popitem(last=False)
+            self.stats['evictions'] += 1
+            logger.debug(f"Evicted segment anomaly model {evicted}")
+
+    async def get(self, segment: Optional[str]):
+        """Detector of a segment, loading it on first use; None = use the global model"""
+        if segment is None or segment not in self.index or segment in self.unavailable:
+            return None
+
+        detector = self.cache.get(segment)
+        if detector is not None:
+            self.cache.move_to_end(segment)
+            self.stats['hits'] += 1
+            return detector
+
+        self.stats['misses'] += 1
+        detector = self.factory(self.model_path(segment))
+        await detector.load_model()
+
+        if detector.compiled is None:
+            logger.warning(f"⚠️  Segment model {segment} could not be loaded, using the global model")
+            self.unavailable.add(segment)
+            return None
+
+        # Another caller may have loaded it meanwhile
+        if segment in self.cache:
+            return self.cache[segment]
+
+        self.stats['loads'] += 1
+        self.put(segment, detector)
+        return detector
+
+    async def train(self, X: np.ndarray, segments: List[Optional[str]], template, fit) -> Dict[str, int]:
+        """
+        Fit one model per segment with at least min_events rows, in parallel
+        worker processes, then swap each into its detector and checkpoint it
+        Returns events used per trained segment
+        """
+        keys = np.array([segment or '' for segment in segments], dtype=object)
+        names, counts = np.unique(keys, return_counts=True)
+        trainable = [
+            str(name) for name, count in zip(names, counts)
+            if name and count >= self.min_events
+        ]
+        if not trainable:
+            return {}
+
+        logger.info(f"🎓 Training {len(trainable)} segment anomaly models")
+
+        loop = asyncio.get_running_loop()
+        pool = ProcessPoolExecutor(
+            max_workers=min(self.workers, len(trainable)),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        try:
+            fitted = await asyncio.gather(*[
+                loop.run_in_executor(pool, fit, template, X[keys == segment])
+                for segment in trainable
+            ])
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        trained = {}
+        for segment, (model, scaler) in zip(trainable, fitted):
+            self.index.setdefault(segment, self.slug(segment))
+            detector = self.cache.get(segment) or self.factory(self.model_path(segment))
+            detector.swap(model, scaler)
+            await detector.save_model()
+
+            self.unavailable.discard(segment)
+            self.put(segment, detector)
+            trained[segment] = int((keys == segment).sum())
+
+        self.save_index()
+        return trained
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get segment cache statistics"""
+        return {
+            **self.stats,
+            'available': len(self.index),
+            'loaded': len(self.cache),
+            'capacity': self.capacity
+        }
@@ -4,10 +4,16 @@ Analyzes sentiment in user feedback, logs, and text data
 Uses VADER and simple NLP techniques
 """
 
+import numpy as np
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Iterable
 import re
-from collections import Counter
+import os
+import hashlib
+from collections import Counter, OrderedDict
+
+from .batch_sentiment import BatchSentimentScorer
+from .keyword_matcher import KeywordMatcher
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +23,12 @@ class SentimentAnalyzer:
     Lightweight sentiment analysis using lexicon-based approach
     """
     
+    # Volatile parts of a message (ids, counters, addresses) are masked before
+    # hashing. Masks never split or merge tokens and lexicons hold no digits,
+    # so messages sharing a key always score the same.
+    HEX_PATTERN = re.compile(r'0x[0-9a-f]+')
+    DIGIT_PATTERN = re.compile(r'[0-9]+')
+    
     def __init__(self):
         self.is_loaded = False
         
@@ -40,6 +52,18 @@ class SentimentAnalyzer:
             'timeout', 'denied', 'invalid', 'refused', 'rejected'
         }
         
+        # Critical keyword/phrase matcher for log classification
+        self.keyword_matcher = KeywordMatcher.from_config()
+        
+        # Vectorized engine for large batches
+        self.batch_scorer = BatchSentimentScorer(
+            self.positive_words, self.negative_words, self.error_keywords
+        )
+        
+        # Result cache (LRU keyed by normalized message hash)
+        self.cache_size = int(os.getenv('AEGIS_SENTIMENT_CACHE_SIZE', 10000))
+        self.cache = OrderedDict()
+        
         # Statistics
         self.stats = {
             'analyses': 0,
@@ -47,6 +71,13 @@ class SentimentAnalyzer:
             'negative': 0,
             'neutral': 0
         }
+        self.cache_stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0,
+            'deduplicated': 0
+        }
     
     async def load_model(self):
         """Initialize sentiment analyzer"""
@@ -74,6 +105,95 @@ class SentimentAnalyzer:
         
         return words
     
+    def normalize_text(self, text: str) -> str:
+        """
+        Normalize message for caching (lowercase, masked numbers, collapsed spaces)
+        """
+        text = self.HEX_PATTERN.sub('0x0', text.lower())
+        text = self.DIGIT_PATTERN.sub('0', text)
+        return ' '.join(text.split())
+    
+    def cache_key(self, text: str) -> bytes:
+        """
+        Cache key for a message: hash of its normalized form
+        """
+        return hashlib.blake2b(self.normalize_text(text).encode('utf-8'), digest_size=16).digest()
+    
+    def cache_get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result and mark it as recently used
+        """
+        result = self.cache.get(key)
+        
+        if result is None:
+            self.cache_stats['misses'] += 1
+            return None
+        
+        self.cache.move_to_end(key)
+        self.cache_stats['hits'] += 1
+        return result
+    
+    def cache_put(self, key: bytes, result: Dict[str, Any]):
+        """
+        Store a result, evicting the least recently used entries when full
+        """
+        if self.cache_size <= 0:
+            return
+        
+        self.cache[key] = result
+        self.cache.move_to_end(key)
+        
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+            self.cache_stats['evictions'] += 1
+    
+    def invalidate_cache(self):
+        """
+        Drop all cached results (required whenever lexicons change)
+        """
+        self.cache.clear()
+        self.cache_stats['invalidations'] += 1
+    
+    def update_lexicons(
+        self,
+        positive_words: Optional[Iterable[str]] = None,
+        negative_words: Optional[Iterable[str]] = None,
+        error_keywords: Optional[Iterable[str]] = None
+    ):
+        """
+        Replace one or more lexicons and invalidate cached results
+        """
+        if positive_words is not None:
+            self.positive_words = set(positive_words)
+        if negative_words is not None:
+            self.negative_words = set(negative_words)
+        if error_keywords is not None:
+            self.error_keywords = set(error_keywords)
+        
+        self.batch_scorer = BatchSentimentScorer(
+            self.positive_words, self.negative_words, self.error_keywords
+        )
+        self.invalidate_cache()
+        logger.info("🔄 Sentiment lexicons updated, cache invalidated")
+    
+    def update_keywords(
+        self,
+        categories: Dict[str, Iterable[str]],
+        fatal_categories: Optional[Iterable[str]] = None
+    ):
+        """
+        Replace the critical keyword lists and recompile the matcher
+        """
+        self.keyword_matcher = KeywordMatcher(categories, fatal_categories)
+        logger.info(f"🔄 Keyword matcher rebuilt ({len(categories)} categories)")
+    
+    def record_result(self, result: Dict[str, Any]):
+        """
+        Update analysis statistics for one result
+        """
+        self.stats['analyses'] += 1
+        self.stats[result['sentiment']] += 1
+    
     async def analyze(self, text: str) -> Dict[str, Any]:
         """
         Analyze sentiment of text
@@ -83,58 +203,132 @@ class SentimentAnalyzer:
             if not text:
                 return {'sentiment': 'neutral', 'score': 0.0, 'confidence': 0.0}
             
-            words = self.preprocess_text(text)
+            key = self.cache_key(text)
+            result = self.cache_get(key)
             
-            # Count positive and negative words
-            positive_count = sum(1 for word in words if word in self.positive_words)
-            negative_count = sum(1 for word in words if word in self.negative_words)
-            error_count = sum(1 for word in words if word in self.error_keywords)
+            if result is None:
+                result = self.score_text(text)
+                self.cache_put(key, result)
             
-            # Calculate sentiment score (-1 to 1)
-            total_sentiment_words = positive_count + negative_count + error_count
+            self.record_result(result)
             
-            if total_sentiment_words == 0:
-                score = 0.0
-                sentiment = 'neutral'
-                confidence = 0.0
+            return dict(result)
+            
+        except Exception as e:
+            logger.error(f"❌ Sentiment analysis failed: {str(e)}")
+            return {'sentiment': 'neutral', 'score': 0.0, 'confidence': 0.0}
+    
+    def score_text(self, text: str) -> Dict[str, Any]:
+        """
+        Score a single non-empty text against the lexicons
+        """
+        words = self.preprocess_text(text)
+        
+        # Count positive and negative words
+        positive_count = sum(1 for word in words if word in self.positive_words)
+        negative_count = sum(1 for word in words if word in self.negative_words)
+        error_count = sum(1 for word in words if word in self.error_keywords)
+        
+        # Calculate sentiment score (-1 to 1)
+        total_sentiment_words = positive_count + negative_count + error_count
+        
+        if total_sentiment_words == 0:
+            score = 0.0
+            sentiment = 'neutral'
+            confidence = 0.0
+        else:
+            score = (positive_count - negative_count - error_count * 2) / len(words)
+            confidence = total_sentiment_words / len(words)
+            
+            if score > 0.1:
+                sentiment = 'positive'
+            elif score < -0.1:
+                sentiment = 'negative'
             else:
-                score = (positive_count - negative_count - error_count * 2) / len(words)
-                confidence = total_sentiment_words / len(words)
+                sentiment = 'neutral'
+        
+        return {
+            'sentiment': sentiment,
+            'score': float(score),
+            'confidence': float(confidence),
+            'positive_words': positive_count,
+            'negative_words': negative_count,
+            'error_words': error_count
+        }
+    
+    async def analyze_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analyze multiple texts
+        Duplicate messages are scored once per batch
+        """
+        neutral = {'sentiment': 'neutral', 'score': 0.0, 'confidence': 0.0}
+        
+        try:
+            keys = [self.cache_key(text) if text else None for text in texts]
+            
+            # Resolve each distinct message once
+            unique = {}
+            misses = {}
+            for text, key in zip(texts, keys):
+                if key is None:
+                    continue
+                if key in unique or key in misses:
+                    self.cache_stats['deduplicated'] += 1
+                    continue
                 
-                if score > 0.1:
-                    sentiment = 'positive'
-                elif score < -0.1:
-                    sentiment = 'negative'
+                result = self.cache_get(key)
+                if result is None:
+                    misses[key] = text
                 else:
-                    sentiment = 'neutral'
+                    unique[key] = result
+            
+            # Score all cache misses in one vectorized pass
+            if misses:
+                columns = self.batch_scorer.score(list(misses.values()))
+                for i, key in enumerate(misses):
+                    result = {
+                        'sentiment': str(columns['sentiment'][i]),
+                        'score': float(columns['score'][i]),
+                        'confidence': float(columns['confidence'][i]),
+                        'positive_words': int(columns['positive_words'][i]),
+                        'negative_words': int(columns['negative_words'][i]),
+                        'error_words': int(columns['error_words'][i])
+                    }
+                    self.cache_put(key, result)
+                    unique[key] = result
             
-            # Update stats
-            self.stats['analyses'] += 1
-            self.stats[sentiment] += 1
+            results = []
+            for key in keys:
+                if key is None:
+                    results.append(dict(neutral))
+                    continue
+                
+                result = unique[key]
+                self.record_result(result)
+                results.append(dict(result))
             
-            return {
-                'sentiment': sentiment,
-                'score': float(score),
-                'confidence': float(confidence),
-                'positive_words': positive_count,
-                'negative_words': negative_count,
-                'error_words': error_count
-            }
+            return results
             
         except Exception as e:
-            logger.error(f"❌ Sentiment analysis failed: {str(e)}")
-            return {'sentiment': 'neutral', 'score': 0.0, 'confidence': 0.0}
+            logger.error(f"❌ Batch sentiment analysis failed: {str(e)}")
+            return [dict(neutral) for _ in texts]
     
-    async def analyze_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+    def score_batch(self, texts: List[str]) -> Dict[str, np.ndarray]:
         """
-        Analyze multiple texts
+        Score a large batch of texts with the vectorized engine
+        Returns columnar NumPy arrays (sentiment, score, confidence, word counts)
         """
-        results = []
-        for text in texts:
-            result = await self.analyze(text)
-            results.append(result)
+        columns = self.batch_scorer.score(texts)
+        
+        # Empty texts are not counted as analyses, as in analyze()
+        analyzed = np.fromiter((bool(text) for text in texts), dtype=bool, count=len(texts))
+        sentiments = columns['sentiment'][analyzed]
+        
+        self.stats['analyses'] += int(analyzed.sum())
+        for sentiment in ('positive', 'negative', 'neutral'):
+            self.stats[sentiment] += int(np.count_nonzero(sentiments == sentiment))
         
-        return results
+        return columns
     
     def get_dominant_sentiment(self, texts: List[str]) -> str:
         """
@@ -163,12 +357,14 @@ class SentimentAnalyzer:
         """
         Detect if log message contains critical errors
         """
-        words = self.preprocess_text(log_message)
-        
-        critical_keywords = {'fatal', 'critical', 'emergency', 'panic', 'crash'}
-        has_critical = any(word in critical_keywords for word in words)
-        
-        return has_critical
+        return self.keyword_matcher.is_fatal(log_message)
+    
+    def classify_log(self, log_message: str) -> Dict[str, Any]:
+        """
+        Classify log message by keyword category (single pass)
+        Returns matched categories, match offsets and fatal-class flag
+        """
+        return self.keyword_matcher.classify(log_message)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get analyzer statistics"""
@@ -181,5 +377,21 @@ class SentimentAnalyzer:
             'positive_rate': (
                 self.stats['positive'] / self.stats['analyses']
                 if self.stats['analyses'] > 0 else 0
-            )
+            ),
+            'cache': self.get_cache_stats()
+        }
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get result cache statistics"""
+        lookups = self.cache_stats['hits'] + self.cache_stats['misses']
+        
+        return {
+            'size': len(self.cache),
+            'max_size': self.cache_size,
+            'hits': self.cache_stats['hits'],
+            'misses': self.cache_stats['misses'],
+            'hit_rate': self.cache_stats['hits'] / lookups if lookups > 0 else 0,
+            'evictions': self.cache_stats['evictions'],
+            'invalidations': self.cache_stats['invalidations'],
+            'deduplicated': self.cache_stats['deduplicated']
         }
@@ -6,32 +6,68 @@ Analyzes interaction patterns and suggests improvements
 
 import numpy as np
 import logging
-from typing import Dict, Any, List, Tuple
-from collections import defaultdict
-import pickle
+from typing import Dict, Any, List, Tuple, NamedTuple, Mapping, Iterable, Optional
+from types import MappingProxyType
 from pathlib import Path
+import asyncio
+import json
+import os
+import time
+
+from .q_table import QTable
+from utils.checkpoint import CheckpointManager
 
 logger = logging.getLogger(__name__)
 
 
+def state_key(event: Dict[str, Any]) -> str:
+    """
+    State representation of a telemetry event or page context
+    (event type plus discretized load time and interaction count)
+    """
+    perf = event.get('performance') or {}
+    event_type = event.get('eventType', 'unknown')
+    
+    load_time = perf.get('loadTime', 0)
+    interactions = perf.get('interactions', 0)
+    
+    # Discretize continuous values
+    load_category = 'fast' if load_time < 1000 else 'medium' if load_time < 3000 else 'slow'
+    interaction_category = 'low' if interactions < 5 else 'medium' if interactions < 15 else 'high'
+    
+    return f"{event_type}_{load_category}_{interaction_category}"
+
+
+class RecommendationSnapshot(NamedTuple):
+    """
+    Read-only recommendation table (best action and confidence per learned state)
+    Published by replacing the reference, so readers never need a lock
+    """
+    version: int
+    etag: str
+    built_at: float
+    entries: Mapping[str, Dict[str, Any]]
+
+
 class UXOptimizer:
     """
     Q-Learning based UX optimizer
     Learns optimal UI/UX patterns from user behavior
     """
     
-    def __init__(self, model_path: str = "models/checkpoints/ux_optimizer.pkl"):
+    LOAD_CATEGORIES = ('fast', 'medium', 'slow')
+    INTERACTION_CATEGORIES = ('low', 'medium', 'high')
+    
+    def __init__(self, model_path: str = "models/checkpoints/ux_optimizer.npy"):
         self.model_path = Path(model_path)
         self.is_loaded = False
         
         # Q-Learning parameters
-        self.q_table = defaultdict(lambda: defaultdict(float))
         self.learning_rate = 0.1
         self.discount_factor = 0.95
         self.epsilon = 0.1  # Exploration rate
         
         # State/Action definitions
-        self.states = []  # User interaction states
         self.actions = [
             'optimize_layout',
             'reduce_clicks',
@@ -40,6 +76,22 @@ class UXOptimizer:
             'simplify_flow'
         ]
         
+        # Q-table: interned user interaction states x actions
+        self.q_table = QTable(self.actions)
+        
+        # Recommendation snapshot served to the frontend (rebuilt after updates)
+        self.recommendations = RecommendationSnapshot(-1, 'W/"empty"', time.time(), MappingProxyType({}))
+        
+        # Checkpoint generation the Q-table was loaded from, and its version then
+        self.table_generation = None
+        self.table_version = 0
+        self.checkpoint_version = 0  # Q-table version of the last checkpoint snapshot
+        self.control_state = None  # Set in stream workers: publishes each checkpoint (ux_model)
+        self.reload_lock = asyncio.Lock()
+        
+        # Batches at least this large extract states and rewards column-wise
+        self.batch_min_size = int(os.getenv('AEGIS_UX_BATCH_MIN_SIZE', 32))
+        
         # Statistics
         self.stats = {
             'updates': 0,
@@ -47,54 +99,138 @@ class UXOptimizer:
             'recommendations': 0,
             'avg_reward': 0.0
         }
+        
+        # Background checkpoints (models/checkpoints/ux_optimizer/gen-NNNNNN),
+        # full Q-table every few generations and changed rows in between
+        self.checkpoints = CheckpointManager(
+            'ux_optimizer',
+            self.model_path.with_suffix(''),
+            self.checkpoint_snapshot,
+            self.write_checkpoint,
+            full_every=int(os.getenv('AEGIS_UX_CHECKPOINT_FULL_EVERY', 10)),
+            on_checkpoint=self.checkpoint_written
+        )
     
     async def load_model(self):
         """Load pre-trained Q-table"""
         try:
-            if self.model_path.exists():
+            chain = self.checkpoints.chain()
+            
+            if chain:
+                logger.info(f"📦 Loading UX optimizer from {chain[-1][0]}")
+                self.q_table, stats, restored = self.read_checkpoint(chain)
+                self.stats.update(stats)
+                self.table_generation = restored.name
+                if restored != chain[-1][0]:
+                    self.checkpoints.force_full = True
+                logger.info(f"✅ UX optimizer loaded ({len(self.q_table)} states)")
+            elif self.model_path.exists():
                 logger.info(f"📦 Loading UX optimizer from {self.model_path}")
-                with open(self.model_path, 'rb') as f:
-                    checkpoint = pickle.load(f)
-                    self.q_table = checkpoint['q_table']
-                    self.states = checkpoint['states']
-                logger.info("✅ UX optimizer loaded")
+                self.q_table, index = QTable.load(self.model_path)
+                self.stats.update(index.get('stats', {}))
+                self.table_generation = self.model_path.name
+                logger.info(f"✅ UX optimizer loaded ({len(self.q_table)} states)")
             else:
                 logger.warning("⚠️  No pre-trained model found, initializing new model")
                 await self.initialize_model()
             
+            if self.q_table.actions != self.actions:
+                logger.warning("⚠️  Stored actions differ, remapping Q-table columns")
+                self.q_table = self.q_table.with_actions(self.actions)
+                self.checkpoints.force_full = True
+            
+            self.table_version = self.q_table.version
             self.is_loaded = True
             
         except Exception as e:
             logger.error(f"❌ Failed to load UX optimizer: {str(e)}")
             await self.initialize_model()
+            self.checkpoints.force_full = True
+        
+        self.refresh_recommendations()
+        await self.checkpoints.start()
+    
+    def read_checkpoint(self, chain: List[Tuple[Path, Dict[str, Any]]]) -> Tuple[QTable, Dict[str, Any], Path]:
+        """
+        Load the full Q-table and replay the deltas built on it
+        Returns the table, its stats and the last generation applied: a
+        delta that does not apply ends the replay at the one before it
+        """
+        q_table, restored = None, None
+        for path, manifest in chain:
+            if manifest['kind'] == 'full':
+                q_table, _ = QTable.load(path / 'q_table.npy')
+            else:
+                try:
+                    q_table.apply_delta(path)
+                except Exception as e:
+                    logger.warning(f"⚠️  Stopping UX optimizer restore at {restored.name}: {str(e)}")
+                    break
+            restored = path
+
+        with open(restored / 'stats.json', 'r', encoding='utf-8') as f:
+            return q_table, json.load(f), restored
+    
+    async def reload(self, generation: Optional[str]) -> bool:
+        """
+        Load the Q-table checkpointed by the process that learns it (stream
+        workers publish each generation as ux_model) and rebuild the
+        recommendations; False if there is nothing newer to load
+        """
+        if generation is None or generation == self.table_generation:
+            return False
+        
+        async with self.reload_lock:
+            try:
+                chain = await asyncio.to_thread(self.checkpoints.chain)
+                if not chain or chain[-1][0].name == self.table_generation:
+                    return False
+                q_table, stats, restored = await asyncio.to_thread(self.read_checkpoint, chain)
+                if q_table.actions != self.actions:
+                    q_table = q_table.with_actions(self.actions)
+            except Exception as e:
+                logger.error(f"❌ Failed to reload UX optimizer: {str(e)}")
+                return False
+            
+            self.q_table = q_table
+            self.stats.update({key: value for key, value in stats.items() if key != 'recommendations'})
+            self.table_generation = restored.name
+            self.table_version = q_table.version
+            
+            # Rebuilt from scratch: the new table's row versions are unrelated to the old one's
+            self.recommendations = self.recommendations._replace(version=-1, entries=MappingProxyType({}))
+            self.refresh_recommendations()
+            logger.info(f"🔄 UX optimizer reloaded from {restored.name} ({len(q_table)} states)")
+            return True
+    
+    async def checkpoint_written(self, path: Path):
+        """
+        Serve the recommendations under the generation just written and
+        publish it to the processes that serve this model without learning it
+        """
+        self.table_generation = path.name
+        self.table_version = self.checkpoint_version
+        if self.recommendations.version == self.table_version:
+            self.recommendations = self.recommendations._replace(etag=self.etag())
+        
+        if self.control_state is not None:
+            await self.control_state.update(ux_model=path.name)
     
     async def initialize_model(self):
         """Initialize new Q-table"""
         logger.info("🔧 Initializing new UX optimizer")
-        self.q_table = defaultdict(lambda: defaultdict(float))
-        self.states = []
+        self.q_table = QTable(self.actions)
         self.is_loaded = True
         logger.info("✅ New UX optimizer initialized")
     
     def extract_state(self, event: Dict[str, Any]) -> str:
         """
-        Extract state representation from telemetry event
+        Extract state representation from telemetry event (interning new states)
         """
-        perf = event.get('performance', {})
-        event_type = event.get('eventType', 'unknown')
-        
-        # Create state representation
-        load_time = perf.get('loadTime', 0)
-        interactions = perf.get('interactions', 0)
+        state = state_key(event)
         
-        # Discretize continuous values
-        load_category = 'fast' if load_time < 1000 else 'medium' if load_time < 3000 else 'slow'
-        interaction_category = 'low' if interactions < 5 else 'medium' if interactions < 15 else 'high'
-        
-        state = f"{event_type}_{load_category}_{interaction_category}"
-        
-        if state not in self.states:
-            self.states.append(state)
+        _, is_new = self.q_table.intern(state)
+        if is_new:
             self.stats['states_learned'] += 1
         
         return state
@@ -103,8 +239,8 @@ class UXOptimizer:
         """
         Calculate reward based on user engagement
         """
-        perf = event.get('performance', {})
-        metadata = event.get('metadata', {})
+        perf = event.get('performance') or {}
+        metadata = event.get('metadata') or {}
         
         # Positive factors
         reward = 0.0
@@ -136,39 +272,166 @@ class UXOptimizer:
     async def update(self, events: List[Dict[str, Any]]):
         """
         Update Q-table with new telemetry data
+        Large batches extract states and rewards column-wise (same updates)
         """
         try:
-            for event in events:
-                state = self.extract_state(event)
-                reward = self.calculate_reward(event)
-                
-                # Get best action for current state
-                best_action = self.get_best_action(state)
-                
-                # Update Q-value
-                current_q = self.q_table[state][best_action]
-                max_future_q = max(self.q_table[state].values()) if self.q_table[state] else 0
-                
-                new_q = current_q + self.learning_rate * (
-                    reward + self.discount_factor * max_future_q - current_q
-                )
-                
-                self.q_table[state][best_action] = new_q
-                
-                # Update stats
-                self.stats['updates'] += 1
-                self.stats['avg_reward'] = (
-                    (self.stats['avg_reward'] * (self.stats['updates'] - 1) + reward)
-                    / self.stats['updates']
-                )
-            
-            # Periodically save model
-            if self.stats['updates'] % 100 == 0:
-                await self.save_model()
+            if len(events) >= self.batch_min_size:
+                self.update_batch(events)
+            else:
+                self.update_sequential(events)
+            
+            # Checkpointed in the background once enough updates accumulate
+            self.checkpoints.mark_dirty(len(events))
+            
+            self.refresh_recommendations()
             
         except Exception as e:
             logger.error(f"❌ Update failed: {str(e)}")
     
+    def update_sequential(self, events: List[Dict[str, Any]]):
+        """
+        Apply Q-learning updates one event at a time
+        """
+        for event in events:
+            state = self.extract_state(event)
+            reward = self.calculate_reward(event)
+            
+            # Get best action for current state
+            best_action = self.get_best_action(state)
+            
+            # Update Q-value (an unlearned action starts at 0 and
+            # counts towards the max over learned actions)
+            q_values = self.q_table.row(state)
+            action = self.q_table.action_index[best_action]
+            current_q = self.q_table.get(state, best_action)
+            q_values[action] = current_q
+            max_future_q = float(np.nanmax(q_values))
+            
+            new_q = current_q + self.learning_rate * (
+                reward + self.discount_factor * max_future_q - current_q
+            )
+            
+            q_values[action] = new_q
+            self.q_table.mark_dirty(self.q_table.index[state])
+            
+            # Update stats
+            self.stats['updates'] += 1
+            self.stats['avg_reward'] = (
+                (self.stats['avg_reward'] * (self.stats['updates'] - 1) + reward)
+                / self.stats['updates']
+            )
+    
+    def update_batch(self, events: List[Dict[str, Any]]):
+        """
+        Apply Q-learning updates for a whole batch
+        
+        States and rewards are computed column-wise (extract_batch). The
+        updates then run in event order with the same semantics as
+        update_sequential: each event's action and max future Q-value see
+        the updates of the events before it. They run on plain floats over
+        the rows the batch touches, rounded to the table's float32 after
+        every update, and the rows are written back once.
+        """
+        n = len(events)
+        if n == 0:
+            return
+        
+        rows, rewards = self.extract_batch(events)
+        touched = np.unique(rows)
+        values = self.q_table.values
+        table = dict(zip(touched.tolist(), values[touched].tolist()))
+        
+        # Epsilon-greedy draws (an unlearned state also takes the random action)
+        explore = (np.random.random(n) < self.epsilon).tolist()
+        random_actions = np.random.randint(len(self.actions), size=n).tolist()
+        alpha, gamma = self.learning_rate, self.discount_factor
+        to_float32 = np.float32
+        
+        for row, reward, explores, random_action in zip(rows.tolist(), rewards.tolist(), explore, random_actions):
+            q_values = table[row]
+            learned = [value for value in q_values if value == value]  # NaN: unlearned
+            
+            if explores or not learned:
+                action = random_action
+            else:
+                action = q_values.index(max(learned))  # First best, like nanargmax
+            
+            # An unlearned action starts at 0 and counts towards the max
+            current_q = q_values[action]
+            if current_q != current_q:
+                current_q = 0.0
+            q_values[action] = current_q
+            max_future_q = max(value for value in q_values if value == value)
+            
+            q_values[action] = float(to_float32(
+                current_q + alpha * (reward + gamma * max_future_q - current_q)
+            ))
+        
+        values[touched] = [table[row] for row in touched.tolist()]
+        self.q_table.mark_dirty(touched)
+        
+        # Update stats
+        updates = self.stats['updates'] + n
+        self.stats['avg_reward'] = (
+            (self.stats['avg_reward'] * self.stats['updates'] + float(rewards.sum()))
+            / updates
+        )
+        self.stats['updates'] = updates
+    
+    def extract_batch(self, events: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        State rows and rewards for a batch
+        Same discretization as extract_state and calculate_reward, computed
+        column-wise; only distinct state strings are built and interned
+        """
+        columns = [
+            (
+                event.get('eventType', 'unknown'),
+                perf.get('loadTime', 0),
+                perf.get('interactions', 0),
+                perf.get('errorRate', 0),
+                (event.get('metadata') or {}).get('sessionDuration', 0)
+            )
+            for event in events
+            for perf in (event.get('performance') or {},)
+        ]
+        event_types, load_time, interactions, error_rate, session_duration = zip(*columns)
+        
+        load_time = np.asarray(load_time, dtype=np.float64)
+        interactions = np.asarray(interactions, dtype=np.float64)
+        error_rate = np.asarray(error_rate, dtype=np.float64)
+        session_duration = np.asarray(session_duration, dtype=np.float64)
+        
+        # Discretize continuous values (fast/medium/slow x low/medium/high)
+        load_category = (load_time >= 1000).astype(np.int64) + (load_time >= 3000)
+        interaction_category = (interactions >= 5).astype(np.int64) + (interactions >= 15)
+        
+        type_names, type_codes = np.unique(np.asarray(event_types, dtype=object), return_inverse=True)
+        codes = (type_codes * 3 + load_category) * 3 + interaction_category
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+        
+        unique_rows = np.empty(len(unique_codes), dtype=np.int64)
+        for i, code in enumerate(unique_codes.tolist()):
+            type_code, rest = divmod(code, 9)
+            state = (
+                f"{type_names[type_code]}_{self.LOAD_CATEGORIES[rest // 3]}"
+                f"_{self.INTERACTION_CATEGORIES[rest % 3]}"
+            )
+            row, is_new = self.q_table.intern(state)
+            if is_new:
+                self.stats['states_learned'] += 1
+            unique_rows[i] = row
+        
+        # Reward (see calculate_reward)
+        rewards = np.select(
+            [load_time < 1000, load_time < 3000], [1.0, 0.5], default=-0.5
+        )
+        rewards += np.minimum(interactions / 10, 1.0)
+        rewards -= error_rate * 2
+        rewards += np.where((session_duration > 60) & (session_duration < 600), 0.5, 0.0)
+        
+        return unique_rows[inverse.ravel()], rewards
+    
     def get_best_action(self, state: str) -> str:
         """
         Get best action for a given state (with epsilon-greedy exploration)
@@ -178,51 +441,120 @@ class UXOptimizer:
             return np.random.choice(self.actions)
         else:
             # Exploit: best known action
-            if state in self.q_table and self.q_table[state]:
-                return max(self.q_table[state], key=self.q_table[state].get)
+            best_action = self.q_table.best_action(state)
+            if best_action is not None:
+                return best_action
             else:
                 return np.random.choice(self.actions)
     
+    def refresh_recommendations(self):
+        """
+        Rebuild recommendation entries for Q-table rows changed since the
+        current snapshot and publish a new snapshot
+        """
+        current = self.recommendations
+        if self.q_table.version < current.version:
+            # The Q-table was replaced (reload): rebuild from scratch
+            current = current._replace(version=-1, entries=MappingProxyType({}))
+        
+        rows = self.q_table.changed_rows(current.version)
+        if len(rows) == 0 and current.version >= 0:
+            return
+        
+        values = self.q_table.values[rows]
+        learned = ~np.isnan(values)
+        best = np.where(learned, values, -np.inf).argmax(axis=1)
+        
+        entries = dict(current.entries)
+        for i, row in enumerate(rows.tolist()):
+            if not learned[i].any():
+                continue
+            
+            action = best[i]
+            entries[self.q_table.states[row]] = {
+                'action': self.actions[action],
+                'confidence': float(values[i, action]),
+                'all_actions': {
+                    self.actions[j]: float(values[i, j]) for j in np.flatnonzero(learned[i])
+                }
+            }
+        
+        self.recommendations = RecommendationSnapshot(
+            version=self.q_table.version,
+            etag=self.etag(),
+            built_at=time.time(),
+            entries=MappingProxyType(entries)
+        )
+    
+    def etag(self) -> str:
+        """
+        ETag of the recommendations: the checkpoint generation the Q-table
+        was loaded from, the same in every process serving it, plus this
+        process's writer id and table version once it has learned since
+        """
+        base = self.table_generation or 'empty'
+        if self.q_table.version == self.table_version:
+            return f'W/"{base}"'
+        return f'W/"{base}-{self.checkpoints.writer}-{self.q_table.version}"'
+    
+    def lookup(
+        self,
+        states: Iterable[str],
+        snapshot: Optional[RecommendationSnapshot] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Recommendations for state keys from a snapshot (read-only)
+        Unknown states get no action and zero confidence
+        """
+        snapshot = snapshot or self.recommendations
+        results = {}
+        
+        for state in states:
+            entry = snapshot.entries.get(state)
+            results[state] = entry if entry is not None else {
+                'action': None, 'confidence': 0.0, 'all_actions': {}
+            }
+        
+        return results
+    
     async def recommend_optimization(self, current_state: Dict[str, Any]) -> Dict[str, Any]:
         """
         Recommend UX optimization based on current state
+        Served from the recommendation snapshot (greedy, no exploration)
         """
         try:
-            state = self.extract_state(current_state)
-            best_action = self.get_best_action(state)
-            confidence = self.q_table[state][best_action] if state in self.q_table else 0
+            state = state_key(current_state)
+            entry = self.recommendations.entries.get(state)
             
             self.stats['recommendations'] += 1
             
-            return {
-                'action': best_action,
-                'confidence': float(confidence),
-                'state': state,
-                'all_actions': dict(self.q_table[state]) if state in self.q_table else {}
-            }
+            if entry is None:
+                return {'action': 'no_action', 'confidence': 0.0, 'state': state, 'all_actions': {}}
+            
+            return {'state': state, **entry}
             
         except Exception as e:
             logger.error(f"❌ Recommendation failed: {str(e)}")
             return {'action': 'no_action', 'confidence': 0.0}
     
     async def save_model(self):
-        """Save Q-table to disk"""
-        try:
-            self.model_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            checkpoint = {
-                'q_table': dict(self.q_table),
-                'states': self.states,
-                'stats': self.stats
-            }
-            
-            with open(self.model_path, 'wb') as f:
-                pickle.dump(checkpoint, f)
-            
-            logger.info(f"💾 UX optimizer saved to {self.model_path}")
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to save model: {str(e)}")
+        """Write a full checkpoint now (serialized off the event loop)"""
+        await self.checkpoints.checkpoint(full=True)
+    
+    def checkpoint_snapshot(self, full: bool) -> Dict[str, Any]:
+        """In-memory copy of the model state for the checkpoint manager"""
+        self.checkpoint_version = self.q_table.version
+        return {
+            'table': self.q_table.snapshot(full),
+            'stats': dict(self.stats)
+        }
+    
+    def write_checkpoint(self, snapshot: Dict[str, Any], directory: Path):
+        """Serialize a snapshot into a checkpoint directory (worker thread)"""
+        QTable.write_snapshot(snapshot['table'], directory)
+        
+        with open(directory / 'stats.json', 'w', encoding='utf-8') as f:
+            json.dump(snapshot['stats'], f)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get model statistics"""
@@ -232,5 +564,9 @@ class UXOptimizer:
             'states_learned': self.stats['states_learned'],
             'recommendations': self.stats['recommendations'],
             'avg_reward': self.stats['avg_reward'],
-            'q_table_size': len(self.q_table)
+            'q_table_size': self.q_table.learned_states(),
+            'q_table_bytes': int(self.q_table.values.nbytes),
+            'recommendation_states': len(self.recommendations.entries),
+            'recommendation_etag': self.recommendations.etag,
+            'checkpoints': self.checkpoints.get_stats()
         }
@@ -6,12 +6,15 @@ Este router maneja la configuración, control de autonomía y gestión de accion
 para el sistema de monitoreo de la plataforma BeZhas Web3.
 """
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Depends, Header, Request, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Literal, Union, Optional, Dict, Any
 from datetime import datetime
 import logging
 
+from core.status import etag_matches
+
 # Configurar logger
 logger = logging.getLogger("aegis.control")
 
@@ -48,7 +51,7 @@ class TriggerActionRequest(BaseModel):
 # --- Configuración de Anomalías ---
 class ThresholdRequest(BaseModel):
     """Request para ajustar el umbral de detección de anomalías"""
-    level: float = Field(..., ge=0.0, le=1.0, description="Nivel de sensibilidad (0.0 = mínimo, 1.0 = máximo)")
+    level: float = Field(..., ge=0.0, le=1.0, description="Score de anomalía a partir del cual se alerta (0.0-1.0)")
     
     class Config:
         schema_extra = {
@@ -131,70 +134,189 @@ router = APIRouter(
 )
 
 
+# ============================================================================
+# DEPENDENCIAS: SERVICIOS COMPARTIDOS
+# ============================================================================
+
+def requires_service(name: str):
+    """
+    Dependencia que obtiene un servicio publicado en app.state por main.py
+    Responde 503 si el servicio no está disponible en este modo de despliegue
+    """
+    def dependency(request: Request):
+        service = getattr(request.app.state, name, None)
+        if service is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Servicio '{name}' no disponible en este despliegue"
+            )
+        return service
+    
+    return dependency
+
+
+def optional_service(name: str):
+    """Como requires_service, pero devuelve None si el servicio no está disponible"""
+    def dependency(request: Request):
+        return getattr(request.app.state, name, None)
+    
+    return dependency
+
+
+def auditor(request: Request):
+    """
+    Dependencia que registra acciones del administrador en el log de auditoría
+    Devuelve una función `record(action, target, details, critical)` que responde
+    con el recibo del registro (None si el log no está disponible)
+    """
+    audit_log = getattr(request.app.state, 'audit_log', None)
+    client = request.client.host if request.client else None
+    
+    async def record(
+        action: str,
+        target: Optional[str] = None,
+        details: Optional[Dict[str, Any]] = None,
+        critical: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        if audit_log is None:
+            return None
+        return await audit_log.record(action, actor='admin', target=target, details=details, client=client, critical=critical)
+    
+    return record
+
+
+def audit_warning(receipt: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Aviso a incluir en la respuesta si el registro crítico de una acción no
+    quedó guardado en MongoDB (None si quedó guardado). La acción se aplica
+    igualmente: una pausa de emergencia no puede depender de MongoDB, y el
+    registro se reintenta en el siguiente lote.
+    """
+    if receipt is None:
+        return "Log de auditoría no disponible; la acción no ha quedado registrada"
+    if not receipt['durable']:
+        return "El registro de auditoría aún no está guardado en MongoDB; se reintentará en el siguiente lote"
+    return None
+
+
+def retrain_status_data(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Vista del estado de un job de re-entrenamiento para el dashboard"""
+    progress = job['progress']
+    fraction = progress.get('fraction', 0.0)
+    
+    # ETA extrapolado del tiempo transcurrido y la fracción completada
+    eta_seconds = None
+    if job['status'] == 'running' and progress.get('started_at') and 0 < fraction < 1:
+        elapsed = (datetime.now() - datetime.fromisoformat(progress['started_at'])).total_seconds()
+        eta_seconds = elapsed / fraction * (1 - fraction)
+    
+    return {
+        "job_id": job['job_id'],
+        "status": job['status'],  # queued | running | completed | failed | cancelled | interrupted
+        "progress": fraction,
+        "current_step": progress.get('phase', 'queued'),
+        "eta_minutes": round(eta_seconds / 60, 1) if eta_seconds is not None else None,
+        "events_loaded": progress.get('processed', 0),
+        "events_total": progress.get('total'),
+        "metrics": (job['result'] or {}).get('metrics'),
+        "error": job['error'],
+        "started_at": job['created_at'],
+        "updated_at": job['updated_at']
+    }
+
+
 # ============================================================================
 # ENDPOINTS: SECCIÓN DE CONTROL
 # ============================================================================
 
 @router.put("/control/set_mode", response_model=StandardResponse)
-async def set_mode(request: SetModeRequest):
+async def set_mode(
+    request: SetModeRequest,
+    control_state=Depends(requires_service('control_state')),
+    audit=Depends(auditor)
+):
     """
     Cambia el modo de operación de Aegis
     
     - **autonomous**: La IA ejecuta acciones automáticamente
     - **suggest**: La IA solo sugiere acciones y espera aprobación
+    
+    El cambio se guarda en Redis y se propaga a todos los workers (pub/sub),
+    después de guardar su registro de auditoría (si no se puede, se aplica
+    igualmente y la respuesta lo indica con `warning`).
     """
     logger.info(f"Cambiando modo de operación a: {request.mode}")
     
-    # TODO: Guardar el modo en la base de datos o configuración persistente
-    # TODO: Notificar al sistema de IA sobre el cambio de modo
-    # TODO: Registrar el cambio en el log de auditoría
+    receipt = await audit('control.set_mode', details={
+        'mode': request.mode, 'previous_mode': control_state.state.mode
+    }, critical=True)
+    state = await control_state.update(mode=request.mode)
     
     return StandardResponse(
         status="success",
         message=f"Modo cambiado a '{request.mode}' exitosamente",
-        data={"mode": request.mode, "changed_at": datetime.utcnow().isoformat()}
+        data={
+            "mode": state.mode, "version": state.version, "changed_at": state.updated_at,
+            "audit": receipt, "warning": audit_warning(receipt)
+        }
     )
 
 
 @router.post("/control/pause", response_model=StandardResponse)
-async def pause_system():
+async def pause_system(
+    control_state=Depends(requires_service('control_state')),
+    audit=Depends(auditor)
+):
     """
     Pausa de emergencia del sistema Aegis
     
     Detiene todas las operaciones automáticas de la IA hasta nueva orden.
+    La ingesta sigue almacenando y puntuando eventos, pero el motor de
+    decisiones y el auto-healer no actúan en ningún worker.
+    Pausa aunque no se pueda guardar el registro de auditoría (ver `warning`).
     """
     logger.warning("⚠️ Pausa de emergencia activada por el administrador")
     
-    # TODO: Detener todos los workers y procesos de IA
+    receipt = await audit('control.pause', details={'previous_version': control_state.state.version}, critical=True)
+    state = await control_state.update(paused=True)
+    
     # TODO: Pausar listeners de Web3
-    # TODO: Marcar el sistema como 'PAUSED' en la base de datos
     # TODO: Enviar notificación de emergencia al equipo
-    # TODO: Registrar evento crítico en el log de auditoría
     
     return StandardResponse(
         status="success",
         message="Sistema Aegis pausado. Todas las operaciones automáticas detenidas.",
-        data={"paused_at": datetime.utcnow().isoformat(), "status": "PAUSED"}
+        data={
+            "paused_at": state.updated_at, "status": "PAUSED", "version": state.version,
+            "audit": receipt, "warning": audit_warning(receipt)
+        }
     )
 
 
 @router.post("/control/resume", response_model=StandardResponse)
-async def resume_system():
+async def resume_system(
+    control_state=Depends(requires_service('control_state')),
+    audit=Depends(auditor)
+):
     """
     Resume las operaciones del sistema Aegis después de una pausa
+    Reanuda aunque no se pueda guardar el registro de auditoría (ver `warning`).
     """
     logger.info("Reanudando operaciones del sistema Aegis")
     
-    # TODO: Reactivar workers y procesos de IA
+    receipt = await audit('control.resume', details={'previous_version': control_state.state.version}, critical=True)
+    state = await control_state.update(paused=False)
+    
     # TODO: Reanudar listeners de Web3
-    # TODO: Marcar el sistema como 'ACTIVE' en la base de datos
     # TODO: Verificar estado de salud del sistema antes de reanudar
-    # TODO: Registrar evento en el log de auditoría
     
     return StandardResponse(
         status="success",
         message="Sistema Aegis reanudado. Operaciones normales restauradas.",
-        data={"resumed_at": datetime.utcnow().isoformat(), "status": "ACTIVE"}
+        data={
+            "resumed_at": state.updated_at, "status": "ACTIVE", "version": state.version,
+            "audit": receipt, "warning": audit_warning(receipt)
+        }
     )
 
 
@@ -203,12 +325,15 @@ async def trigger_action(request: TriggerActionRequest):
     """
     Ejecuta una acción manual de mantenimiento
     
-    Acciones disponibles:
+    Acciones previstas:
     - **purge_cache**: Limpia la caché del sistema
     - **reindex_feeds**: Re-indexa los feeds de contenido
     - **restart_web3_listeners**: Reinicia los listeners de blockchain
+    
+    Ninguna está implementada todavía: responde 501 sin registrar en el log
+    de auditoría una acción que no se ha ejecutado.
     """
-    logger.info(f"Ejecutando acción manual: {request.action}")
+    logger.info(f"Acción manual solicitada: {request.action}")
     
     action_handlers = {
         "purge_cache": "Limpieza de caché",
@@ -220,53 +345,88 @@ async def trigger_action(request: TriggerActionRequest):
     # TODO: Para 'purge_cache': Limpiar Redis o caché en memoria
     # TODO: Para 'reindex_feeds': Llamar al servicio de indexación
     # TODO: Para 'restart_web3_listeners': Reiniciar conexiones Web3
-    # TODO: Registrar la acción en el log de auditoría
     # TODO: Notificar al equipo si la acción falla
+    # TODO: Registrar la acción como crítica en el log de auditoría antes de ejecutarla
     
-    return StandardResponse(
-        status="success",
-        message=f"{action_handlers[request.action]} ejecutada exitosamente",
-        data={
-            "action": request.action,
-            "executed_at": datetime.utcnow().isoformat(),
-            "executor": "admin"
-        }
+    raise HTTPException(
+        status_code=status.HTTP_501_NOT_IMPLEMENTED,
+        detail=f"{action_handlers[request.action]} aún no está implementada"
     )
 
 
+async def decide_suggestion(suggestion_store, suggestion_id: str, decision: str, feedback: Optional[str]):
+    """Aprueba o rechaza una sugerencia; 404 si no existe, 409 si ya no está pendiente"""
+    try:
+        if decision == 'approved':
+            suggestion = await suggestion_store.approve(suggestion_id, feedback)
+        else:
+            suggestion = await suggestion_store.reject(suggestion_id, feedback)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Sugerencia {suggestion_id} no encontrada"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    
+    return suggestion_store.public(suggestion)
+
+
 @router.post("/control/approve_action/{suggestion_id}", response_model=StandardResponse)
-async def approve_action(suggestion_id: str, request: Optional[ActionDecisionRequest] = None):
+async def approve_action(
+    suggestion_id: str,
+    request: Optional[ActionDecisionRequest] = None,
+    suggestion_store=Depends(requires_service('suggestion_store')),
+    control_state=Depends(requires_service('control_state')),
+    audit=Depends(auditor)
+):
     """
-    Aprueba una sugerencia de acción de la IA
+    Aprueba una sugerencia de acción de la IA y ejecuta la acción
     
     Cuando el modo es 'suggest', la IA propone acciones que requieren aprobación manual.
+    Una sugerencia solo puede decidirse mientras está pendiente (las no
+    aprobadas expiran pasado AEGIS_SUGGESTION_TTL_MINUTES sin repetirse).
     """
     logger.info(f"Aprobando sugerencia: {suggestion_id}")
     
-    # TODO: Buscar la sugerencia en la base de datos por suggestion_id
-    # TODO: Validar que la sugerencia existe y está en estado 'pending'
-    # TODO: Marcar la sugerencia como 'approved'
-    # TODO: Ejecutar la acción aprobada
-    # TODO: Guardar el feedback del administrador si se proporciona
+    if control_state.state.paused:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Aegis está en pausa, reanuda el sistema antes de ejecutar acciones"
+        )
+    
     # TODO: Actualizar métricas de aprobación para el modelo de IA
-    # TODO: Registrar la decisión en el log de auditoría
     
     feedback = request.feedback if request else None
+    suggestion = await decide_suggestion(suggestion_store, suggestion_id, 'approved', feedback)
     
+    executed = suggestion.get('executed', False)
+    receipt = await audit('suggestion.approve', target=suggestion_id, details={
+        'action': suggestion['type'], 'executed': executed, 'feedback': feedback
+    }, critical=True)
     return StandardResponse(
         status="success",
-        message=f"Sugerencia {suggestion_id} aprobada y ejecutada",
+        message=f"Sugerencia {suggestion_id} aprobada" + (" y ejecutada" if executed else ", la acción no se completó"),
         data={
             "suggestion_id": suggestion_id,
             "status": "approved",
+            "executed": executed,
             "feedback": feedback,
-            "approved_at": datetime.utcnow().isoformat()
+            "approved_at": suggestion['decided_at'],
+            "suggestion": suggestion,
+            "audit": receipt,
+            "warning": audit_warning(receipt)
         }
     )
 
 
 @router.post("/control/reject_action/{suggestion_id}", response_model=StandardResponse)
-async def reject_action(suggestion_id: str, request: Optional[ActionDecisionRequest] = None):
+async def reject_action(
+    suggestion_id: str,
+    request: Optional[ActionDecisionRequest] = None,
+    suggestion_store=Depends(requires_service('suggestion_store')),
+    audit=Depends(auditor)
+):
     """
     Rechaza una sugerencia de acción de la IA
     
@@ -274,15 +434,14 @@ async def reject_action(suggestion_id: str, request: Optional[ActionDecisionRequ
     """
     logger.info(f"Rechazando sugerencia: {suggestion_id}")
     
-    # TODO: Buscar la sugerencia en la base de datos por suggestion_id
-    # TODO: Validar que la sugerencia existe y está en estado 'pending'
-    # TODO: Marcar la sugerencia como 'rejected'
-    # TODO: Guardar el feedback del administrador (importante para el aprendizaje)
     # TODO: Actualizar métricas de rechazo para el modelo de IA
     # TODO: Si hay feedback, usar como dato de entrenamiento
-    # TODO: Registrar la decisión en el log de auditoría
     
     feedback = request.feedback if request else None
+    suggestion = await decide_suggestion(suggestion_store, suggestion_id, 'rejected', feedback)
+    receipt = await audit('suggestion.reject', target=suggestion_id, details={
+        'action': suggestion['type'], 'feedback': feedback
+    })
     
     return StandardResponse(
         status="success",
@@ -291,7 +450,9 @@ async def reject_action(suggestion_id: str, request: Optional[ActionDecisionRequ
             "suggestion_id": suggestion_id,
             "status": "rejected",
             "feedback": feedback,
-            "rejected_at": datetime.utcnow().isoformat()
+            "rejected_at": suggestion['decided_at'],
+            "suggestion": suggestion,
+            "audit": receipt
         }
     )
 
@@ -301,35 +462,58 @@ async def reject_action(suggestion_id: str, request: Optional[ActionDecisionRequ
 # ============================================================================
 
 @router.put("/config/anomaly_threshold", response_model=StandardResponse)
-async def set_anomaly_threshold(request: ThresholdRequest):
+async def set_anomaly_threshold(
+    request: ThresholdRequest,
+    limit: int = 100,
+    control_state=Depends(requires_service('control_state')),
+    ml_models=Depends(optional_service('ml_models')),
+    audit=Depends(auditor)
+):
     """
     Ajusta el umbral de detección de anomalías
     
-    - **0.0**: Sensibilidad mínima (solo anomalías muy obvias)
-    - **1.0**: Sensibilidad máxima (detecta cualquier desviación pequeña)
+    Un evento genera alerta cuando su score de anomalía supera `level`:
+    - **Valores bajos**: más sensible (detecta desviaciones pequeñas, más falsos positivos)
+    - **Valores altos**: menos sensible (solo anomalías muy obvias)
+    
+    El umbral se guarda en el estado de control (Redis) y se propaga a todos los
+    workers, que lo aplican de inmediato a la ingesta y al motor de decisiones.
+    `impact` muestra su efecto sobre los eventos que este proceso puntuó
+    recientemente (calculado con los scores ya almacenados, sin volver a
+    ejecutar el modelo) y hasta `limit` eventos que pasan a considerarse
+    anómalos; es `null` si este proceso no puntúa eventos (modo solo control,
+    o ingesta por streams, donde puntúan los workers).
     
     Recomendado: 0.7 para balance entre detección y falsos positivos
     """
     logger.info(f"Ajustando umbral de anomalías a: {request.level}")
     
-    # TODO: Guardar el nuevo umbral en la configuración de la base de datos
-    # TODO: Actualizar el modelo de detección de anomalías con el nuevo umbral
-    # TODO: Recalcular anomalías recientes con el nuevo umbral (opcional)
-    # TODO: Registrar el cambio en el log de auditoría
+    previous = control_state.state.anomaly_threshold
+    state = await control_state.update(anomaly_threshold=request.level)
+    
+    detector = (ml_models or {}).get('anomaly')
+    impact = detector.threshold_impact(previous, state.anomaly_threshold, limit) if detector else None
+    receipt = await audit('config.anomaly_threshold', details={
+        'previous_threshold': previous, 'threshold': state.anomaly_threshold, 'version': state.version
+    })
     
     return StandardResponse(
         status="success",
         message=f"Umbral de detección ajustado a {request.level}",
         data={
-            "threshold": request.level,
-            "updated_at": datetime.utcnow().isoformat(),
-            "recommendation": "0.7 para balance óptimo"
+            "previous_threshold": previous,
+            "threshold": state.anomaly_threshold,
+            "version": state.version,
+            "impact": impact,
+            "updated_at": state.updated_at,
+            "recommendation": "0.7 para balance óptimo",
+            "audit": receipt
         }
     )
 
 
 @router.post("/model/mark_false_positive", response_model=StandardResponse)
-async def mark_false_positive(request: FalsePositiveRequest):
+async def mark_false_positive(request: FalsePositiveRequest, audit=Depends(auditor)):
     """
     Marca un log como falso positivo
     
@@ -344,7 +528,8 @@ async def mark_false_positive(request: FalsePositiveRequest):
     # TODO: Agregar el log a la cola de datos de re-entrenamiento
     # TODO: Actualizar métricas de precisión del modelo
     # TODO: Si se acumulan N falsos positivos, sugerir re-entrenamiento
-    # TODO: Registrar la acción en el log de auditoría
+    
+    receipt = await audit('model.mark_false_positive', target=request.log_id, details={'reason': request.reason})
     
     return StandardResponse(
         status="success",
@@ -353,7 +538,8 @@ async def mark_false_positive(request: FalsePositiveRequest):
             "log_id": request.log_id,
             "marked_as": "false_positive",
             "reason": request.reason,
-            "marked_at": datetime.utcnow().isoformat()
+            "marked_at": datetime.utcnow().isoformat(),
+            "audit": receipt
         }
     )
 
@@ -361,66 +547,169 @@ async def mark_false_positive(request: FalsePositiveRequest):
 @router.post("/model/retrain", response_model=StandardResponse)
 async def retrain_model(
     include_false_positives: bool = True,
-    include_approved_actions: bool = True
+    include_approved_actions: bool = True,
+    minutes: Optional[int] = None,
+    max_events: Optional[int] = None,
+    sample_size: Optional[int] = None,
+    shadow: bool = False,
+    job_manager=Depends(requires_service('job_manager')),
+    ml_models=Depends(requires_service('ml_models')),
+    audit=Depends(auditor)
 ):
     """
-    Inicia un trabajo de re-entrenamiento del modelo de IA
-    
-    Usa los datos históricos de:
-    - Falsos positivos marcados
-    - Acciones aprobadas/rechazadas
-    - Nuevos datos de comportamiento
-    
-    El proceso puede tardar varios minutos.
+    Inicia un trabajo de re-entrenamiento del detector de anomalías
+    
+    El job se ejecuta en segundo plano:
+    - Recorre la telemetría de MongoDB por bloques (todo el historial, o solo los
+      últimos `minutes` / los `max_events` más recientes) y conserva una muestra
+      estratificada por segmento de tamaño `sample_size` (memoria acotada)
+    - Entrena el Isolation Forest en un proceso separado
+    - Valida el modelo candidato con un conjunto de holdout
+    - Sustituye el modelo en vivo de forma atómica (la ingesta nunca se detiene),
+      o con `shadow=true` lo registra como candidato en sombra (ver /model/shadow)
+    
+    Consultar el progreso en /model/retrain/status/{job_id}
     """
+    if 'anomaly' not in ml_models:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="El detector de anomalías no está cargado (modo solo control)"
+        )
+    
+    running = [
+        job for job in job_manager.list_jobs('retrain_anomaly')
+        if job['status'] in ('queued', 'running')
+    ]
+    if running:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Ya hay un re-entrenamiento en curso: {running[0]['job_id']}"
+        )
+    
     logger.info("Iniciando job de re-entrenamiento del modelo")
     
-    # TODO: Crear un job de re-entrenamiento en segundo plano (Celery/RQ)
-    # TODO: Recopilar datos de entrenamiento:
-    #       - Logs marcados como falsos positivos
-    #       - Sugerencias aprobadas/rechazadas
-    #       - Nuevos datos de comportamiento
-    # TODO: Validar que hay suficientes datos para re-entrenar
-    # TODO: Ejecutar el pipeline de entrenamiento
-    # TODO: Validar el nuevo modelo con datos de test
-    # TODO: Si el modelo es mejor, deployarlo automáticamente
-    # TODO: Notificar al equipo cuando termine el entrenamiento
-    # TODO: Registrar métricas del nuevo modelo
+    job = job_manager.submit('retrain_anomaly', {
+        "include_false_positives": include_false_positives,
+        "include_approved_actions": include_approved_actions,
+        "minutes": minutes,
+        "max_events": max_events,
+        "sample_size": sample_size,
+        "shadow": shadow
+    })
+    receipt = await audit('model.retrain', target=job.job_id, details=job.params)
     
     return StandardResponse(
         status="success",
         message="Re-entrenamiento iniciado. Esto puede tardar varios minutos.",
         data={
-            "job_id": f"retrain_job_{datetime.utcnow().timestamp()}",
-            "status": "running",
-            "started_at": datetime.utcnow().isoformat(),
+            **retrain_status_data(job.to_dict()),
             "include_false_positives": include_false_positives,
-            "include_approved_actions": include_approved_actions
+            "include_approved_actions": include_approved_actions,
+            "audit": receipt
         }
     )
 
 
 @router.get("/model/retrain/status/{job_id}", response_model=StandardResponse)
-async def get_retrain_status(job_id: str):
+async def get_retrain_status(
+    job_id: str,
+    job_manager=Depends(requires_service('job_manager'))
+):
     """
     Obtiene el estado de un trabajo de re-entrenamiento
+    (fase actual, progreso, ETA y métricas de validación)
     """
     logger.info(f"Consultando estado del job: {job_id}")
     
-    # TODO: Buscar el estado del job en la base de datos o cola de jobs
-    # TODO: Retornar el progreso, métricas y ETA
+    job = job_manager.get(job_id)
+    if job is None or job['type'] != 'retrain_anomaly':
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job de re-entrenamiento {job_id} no encontrado"
+        )
     
-    # Mock response
     return StandardResponse(
         status="success",
         message="Estado del re-entrenamiento",
-        data={
-            "job_id": job_id,
-            "status": "running",  # running | completed | failed
-            "progress": 0.45,
-            "current_step": "training",
-            "eta_minutes": 15
-        }
+        data=retrain_status_data(job)
+    )
+
+
+@router.get("/model/shadow", response_model=StandardResponse)
+async def get_shadow_comparison(
+    shadow_evaluator=Depends(requires_service('shadow_evaluator'))
+):
+    """
+    Compara los modelos candidatos en sombra con el modelo en vivo
+    
+    Sobre una muestra del tráfico real: distribución de scores, tasa de
+    alertas, tasa de acuerdo con el modelo en vivo y latencia por evento.
+    """
+    return StandardResponse(
+        status="success",
+        message=f"{len(shadow_evaluator.candidates)} candidatos en evaluación",
+        data=await shadow_evaluator.get_comparison()
+    )
+
+
+@router.post("/model/shadow/{name}/promote", response_model=StandardResponse)
+async def promote_shadow_candidate(
+    name: str,
+    shadow_evaluator=Depends(requires_service('shadow_evaluator')),
+    audit=Depends(auditor)
+):
+    """
+    Promueve un candidato en sombra a modelo en vivo (sustitución atómica)
+    """
+    logger.info(f"Promoviendo candidato en sombra: {name}")
+    
+    try:
+        comparison = await shadow_evaluator.promote(name)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Candidato {name} no encontrado"
+        )
+    except RuntimeError as e:
+        # The checkpoint could not be written: the live model was kept
+        logger.error(f"❌ {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"No se pudo guardar el checkpoint del candidato {name}; el modelo en vivo no ha cambiado"
+        )
+    
+    receipt = await audit('model.shadow_promote', target=name, critical=True)
+    
+    return StandardResponse(
+        status="success",
+        message=f"Candidato {name} promovido a modelo en vivo",
+        data={"name": name, "shadow_metrics": comparison, "audit": receipt, "warning": audit_warning(receipt)}
+    )
+
+
+@router.delete("/model/shadow/{name}", response_model=StandardResponse)
+async def discard_shadow_candidate(
+    name: str,
+    shadow_evaluator=Depends(requires_service('shadow_evaluator')),
+    audit=Depends(auditor)
+):
+    """
+    Descarta un candidato en sombra
+    """
+    try:
+        await shadow_evaluator.remove_candidate(name)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Candidato {name} no encontrado"
+        )
+    
+    receipt = await audit('model.shadow_discard', target=name)
+    
+    return StandardResponse(
+        status="success",
+        message=f"Candidato {name} descartado",
+        data={"name": name, "audit": receipt}
     )
 
 
@@ -429,19 +718,23 @@ async def get_retrain_status(job_id: str):
 # ============================================================================
 
 @router.put("/config/telemetry", response_model=StandardResponse)
-async def set_telemetry_config(request: TelemetryConfigRequest):
+async def set_telemetry_config(
+    request: TelemetryConfigRequest,
+    control_state=Depends(requires_service('control_state')),
+    audit=Depends(auditor)
+):
     """
     Habilita o deshabilita la telemetría del frontend
     
     La telemetría recopila eventos de usuario para análisis y mejora del sistema.
+    Deshabilitada, la ingesta acepta los eventos y los descarta.
     """
     logger.info(f"Configurando telemetría: enabled={request.enabled}")
     
-    # TODO: Guardar la configuración en la base de datos
-    # TODO: Si se deshabilita, detener la recopilación de datos
-    # TODO: Si se habilita, reanudar la recopilación
+    state = await control_state.update(telemetry_enabled=request.enabled)
+    receipt = await audit('config.telemetry', details={'enabled': state.telemetry_enabled, 'version': state.version})
+    
     # TODO: Notificar al frontend del cambio de configuración
-    # TODO: Registrar el cambio en el log de auditoría
     
     status_text = "habilitada" if request.enabled else "deshabilitada"
     
@@ -449,14 +742,20 @@ async def set_telemetry_config(request: TelemetryConfigRequest):
         status="success",
         message=f"Telemetría {status_text} exitosamente",
         data={
-            "telemetry_enabled": request.enabled,
-            "updated_at": datetime.utcnow().isoformat()
+            "telemetry_enabled": state.telemetry_enabled,
+            "version": state.version,
+            "updated_at": state.updated_at,
+            "audit": receipt
         }
     )
 
 
 @router.put("/config/telemetry_samplerate", response_model=StandardResponse)
-async def set_telemetry_samplerate(request: SamplerateRequest):
+async def set_telemetry_samplerate(
+    request: SamplerateRequest,
+    control_state=Depends(requires_service('control_state')),
+    audit=Depends(auditor)
+):
     """
     Ajusta la tasa de muestreo de telemetría
     
@@ -465,13 +764,16 @@ async def set_telemetry_samplerate(request: SamplerateRequest):
     - **1.0**: Se recopilan todos los eventos (máxima granularidad)
     
     Recomendado: 0.1 para producción, 1.0 para debugging
+    
+    Se muestrean sesiones completas (hash del sessionId) antes de validar los
+    eventos; los eventos conservados llevan sampleWeight = 1 / rate.
     """
     logger.info(f"Ajustando tasa de muestreo de telemetría a: {request.rate}")
     
-    # TODO: Guardar la nueva tasa en la configuración de la base de datos
-    # TODO: Actualizar el servicio de telemetría con la nueva tasa
+    state = await control_state.update(telemetry_samplerate=request.rate)
+    receipt = await audit('config.telemetry_samplerate', details={'rate': state.telemetry_samplerate, 'version': state.version})
+    
     # TODO: Notificar al frontend del cambio
-    # TODO: Registrar el cambio en el log de auditoría
     
     percentage = int(request.rate * 100)
     
@@ -479,82 +781,197 @@ async def set_telemetry_samplerate(request: SamplerateRequest):
         status="success",
         message=f"Tasa de muestreo ajustada a {percentage}%",
         data={
-            "samplerate": request.rate,
+            "samplerate": state.telemetry_samplerate,
             "percentage": percentage,
-            "updated_at": datetime.utcnow().isoformat()
+            "version": state.version,
+            "updated_at": state.updated_at,
+            "audit": receipt
         }
     )
 
 
+# ============================================================================
+# ENDPOINTS: AUDITORÍA
+# ============================================================================
+
+@router.get("/audit", response_model=StandardResponse)
+async def get_audit_log(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    action: Optional[str] = None,
+    actor: Optional[str] = None,
+    audit_log=Depends(requires_service('audit_log'))
+):
+    """
+    Consulta el log de auditoría (más recientes primero)
+    
+    - **action**: p. ej. `control.pause`, `suggestion.approve`, `healing.executed`
+    - **actor**: `admin` (acciones del dashboard) o `aegis` (acciones automáticas)
+    
+    Para la página siguiente, pasar `next_cursor` como `cursor`.
+    """
+    if not 1 <= limit <= 500:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="limit debe estar entre 1 y 500"
+        )
+    
+    try:
+        page = await audit_log.page(limit, cursor, action, actor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+    
+    return StandardResponse(
+        status="success",
+        message=f"{len(page['records'])} registros de auditoría",
+        data={**page, "limit": limit}
+    )
+
+
+@router.get("/audit/verify", response_model=StandardResponse)
+async def verify_audit_log(
+    chain: Optional[str] = None,
+    audit_log=Depends(requires_service('audit_log'))
+):
+    """
+    Verifica la cadena de hashes del log de auditoría
+    
+    Cada proceso escribe su propia cadena (campo `chain` de los registros; por
+    defecto, la de este proceso). Un registro modificado o eliminado rompe la
+    cadena y se informa el primer `seq` inválido.
+    """
+    result = await audit_log.verify(chain)
+    
+    return StandardResponse(
+        status="success",
+        message="Cadena de auditoría íntegra" if result['valid'] else f"Cadena de auditoría alterada en seq {result['seq']}",
+        data=result
+    )
+
+
 # ============================================================================
 # ENDPOINTS: ESTADO Y MONITOREO
 # ============================================================================
 
 @router.get("/status", response_model=StandardResponse)
-async def get_system_status():
+async def get_system_status(
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
+    control_state=Depends(requires_service('control_state')),
+    status_aggregator=Depends(requires_service('status_aggregator'))
+):
     """
     Obtiene el estado general del sistema Aegis
+    
+    Los componentes se verifican en segundo plano cada
+    AEGIS_STATUS_INTERVAL_SECONDS segundos (con timeout por componente) y esta
+    consulta devuelve la última instantánea, sin esperar a ninguna dependencia.
+    Admite `If-None-Match`: responde 304 mientras nada haya cambiado.
     """
-    logger.info("Consultando estado del sistema")
+    state = control_state.state
+    snapshot = status_aggregator.snapshot
+    
+    # La instantánea y el estado de control cambian por separado
+    etag = f'W/"{status_aggregator.digest}-{state.version}"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
     
-    # TODO: Obtener el estado real de todos los componentes
-    # TODO: Verificar conexión con base de datos
     # TODO: Verificar conexión con blockchain (Web3)
-    # TODO: Verificar estado de los workers de IA
-    # TODO: Obtener métricas actuales de rendimiento
     
+    components = dict(snapshot['components'])
+    components['telemetry'] = {'status': 'enabled' if state.telemetry_enabled else 'disabled'}
+    
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
     return StandardResponse(
         status="success",
-        message="Sistema operando normalmente",
+        message="Sistema operando normalmente" if snapshot['status'] == 'healthy' else f"Estado del sistema: {snapshot['status']}",
         data={
-            "system_status": "ACTIVE",
-            "mode": "autonomous",
-            "uptime_hours": 72.5,
-            "components": {
-                "database": "healthy",
-                "web3_listeners": "healthy",
-                "ai_workers": "healthy",
-                "telemetry": "enabled"
-            },
-            "metrics": {
-                "anomalies_detected_24h": 15,
-                "actions_executed_24h": 8,
-                "false_positives_rate": 0.05
-            }
+            "system_status": "PAUSED" if state.paused else "ACTIVE",
+            "health": snapshot['status'],
+            "ready": snapshot['ready'],
+            "mode": state.mode,
+            "control_version": state.version,
+            "uptime_hours": round(status_aggregator.uptime() / 3600, 2),
+            "components": components,
+            "telemetry_samplerate": state.telemetry_samplerate,
+            "metrics": components.get('monitor', {}).get('metrics', {}),
+            "checked_at": snapshot['checked_at']
         }
     )
 
 
+@router.get("/stream")
+async def stream_events(
+    events: Optional[str] = None,
+    min_score: float = 0.0,
+    anomaly_types: Optional[str] = None,
+    event_broadcaster=Depends(requires_service('event_broadcaster'))
+):
+    """
+    Eventos en vivo para el dashboard (Server-Sent Events)
+    
+    Tipos: `anomaly`, `healing`, `suggestion`, `metrics` (solo los valores que
+    cambiaron) y `status` (cambios en la salud de los componentes).
+    
+    Filtros por cliente:
+    - **events**: tipos separados por comas (por defecto todos)
+    - **min_score**: score mínimo de las anomalías
+    - **anomaly_types**: tipos de anomalía separados por comas
+    
+    Un cliente lento no acumula eventos sin límite: las actualizaciones de una
+    misma sugerencia, de métricas y de estado se fusionan, y si la cola se
+    llena se descartan los eventos más antiguos y se envía un evento
+    `dropped` con la cantidad perdida.
+    """
+    def split(value: Optional[str]):
+        return {item.strip() for item in value.split(',') if item.strip()} if value else None
+    
+    try:
+        subscriber = event_broadcaster.subscriber(split(events), min_score, split(anomaly_types))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return StreamingResponse(
+        event_broadcaster.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/suggestions/pending", response_model=StandardResponse)
-async def get_pending_suggestions(limit: int = 20):
+async def get_pending_suggestions(
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    suggestion_store=Depends(requires_service('suggestion_store'))
+):
     """
     Obtiene la lista de sugerencias pendientes de aprobación
     
-    Solo relevante cuando el sistema está en modo 'suggest'
+    Solo relevante cuando el sistema está en modo 'suggest'.
+    Ordenadas por confianza (mayor primero) y antigüedad (más antigua primero).
+    Para la página siguiente, pasar `next_cursor` como `cursor` (es null en la
+    última página).
     """
-    logger.info("Obteniendo sugerencias pendientes")
-    
-    # TODO: Consultar la base de datos por sugerencias en estado 'pending'
-    # TODO: Ordenar por prioridad o timestamp
-    # TODO: Incluir información detallada de cada sugerencia
-    # TODO: Limitar los resultados según el parámetro 'limit'
+    if not 1 <= limit <= 500:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="limit debe estar entre 1 y 500"
+        )
+    
+    try:
+        page = suggestion_store.page(limit, cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
     
-    # Mock response
     return StandardResponse(
         status="success",
-        message=f"Sugerencias pendientes obtenidas",
+        message="Sugerencias pendientes obtenidas",
         data={
-            "suggestions": [
-                {
-                    "id": "sug_12345",
-                    "type": "block_user",
-                    "target": "0xABC123...",
-                    "reason": "Comportamiento sospechoso detectado",
-                    "confidence": 0.89,
-                    "created_at": "2025-11-02T10:30:00Z"
-                }
-            ],
-            "total": 1,
+            **page,
             "limit": limit
         }
     )
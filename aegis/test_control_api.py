@@ -107,16 +107,26 @@ def test_retrain_model():
         }
     )
     print_response(response)
+    
+    if response.status_code == 200:
+        return response.json()["data"]["job_id"]
 
 
-def test_retrain_status():
+def test_retrain_status(job_id=None):
     """Test: Consultar estado de re-entrenamiento"""
     print("📈 Consultando estado del job de re-entrenamiento...")
-    job_id = "retrain_job_1730505600.0"
+    job_id = job_id or "retrain_anomaly_000000000000"
     response = requests.get(f"{API_URL}/model/retrain/status/{job_id}")
     print_response(response)
 
 
+def test_get_shadow_comparison():
+    """Test: Comparar candidatos en sombra con el modelo en vivo"""
+    print("🔬 Consultando la evaluación en sombra...")
+    response = requests.get(f"{API_URL}/model/shadow")
+    print_response(response)
+
+
 def test_set_telemetry():
     """Test: Habilitar telemetría"""
     print("📡 Habilitando telemetría...")
@@ -145,13 +155,32 @@ def test_get_status():
 
 
 def test_get_pending_suggestions():
-    """Test: Obtener sugerencias pendientes"""
+    """Test: Obtener sugerencias pendientes (y la página siguiente si existe)"""
     print("📋 Obteniendo sugerencias pendientes...")
     response = requests.get(
         f"{API_URL}/suggestions/pending",
         params={"limit": 10}
     )
     print_response(response)
+    
+    if response.status_code == 200 and response.json()["data"]["next_cursor"]:
+        print("📋 Siguiente página...")
+        response = requests.get(
+            f"{API_URL}/suggestions/pending",
+            params={"limit": 10, "cursor": response.json()["data"]["next_cursor"]}
+        )
+        print_response(response)
+
+
+def test_get_audit_log():
+    """Test: Consultar el registro de auditoría y verificar su cadena"""
+    print("🧾 Obteniendo registro de auditoría...")
+    response = requests.get(f"{API_URL}/audit", params={"limit": 10})
+    print_response(response)
+
+    print("🔐 Verificando la cadena de auditoría...")
+    response = requests.get(f"{API_URL}/audit/verify")
+    print_response(response)
 
 
 def run_all_tests():
@@ -170,8 +199,9 @@ def run_all_tests():
         # Tests de configuración
         test_set_threshold()
         test_mark_false_positive()
-        test_retrain_model()
-        test_retrain_status()
+        job_id = test_retrain_model()
+        test_retrain_status(job_id)
+        test_get_shadow_comparison()
         
         # Tests de telemetría
         test_set_telemetry()
@@ -185,6 +215,9 @@ def run_all_tests():
         test_pause_system()
         test_resume_system()
 
+        # Tests de auditoría
+        test_get_audit_log()
+
         print("\n" + "="*60)
         print("✅ TODOS LOS TESTS COMPLETADOS")
         print("="*60 + "\n")
@@ -215,12 +248,14 @@ def interactive_menu():
         print("  8. Marcar falso positivo")
         print("  9. Iniciar re-entrenamiento")
         print("  10. Consultar estado de re-entrenamiento")
+        print("  16. Comparar modelos en sombra")
         print("\nTELEMETRÍA:")
         print("  11. Habilitar/deshabilitar telemetría")
         print("  12. Ajustar tasa de muestreo")
         print("\nMONITOREO:")
         print("  13. Obtener estado del sistema")
         print("  14. Ver sugerencias pendientes")
+        print("  17. Ver registro de auditoría")
         print("\nOTROS:")
         print("  15. Ejecutar todos los tests")
         print("  0. Salir")
@@ -261,6 +296,10 @@ def interactive_menu():
             test_get_pending_suggestions()
         elif choice == "15":
             run_all_tests()
+        elif choice == "16":
+            test_get_shadow_comparison()
+        elif choice == "17":
+            test_get_audit_log()
         else:
             print("❌ Opción inválida")
         
@@ -0,0 +1,169 @@
+"""
+Tests for AuditLog: group commits and verification of the hash chain
+"""
+
+from typing import Dict, Any, List
+
+import pytest
+
+from core.audit import AuditLog, GENESIS, record_hash
+
+
+class FakeDatabase:
+    """The audit methods of DatabaseManager over a list of stored records"""
+
+    def __init__(self):
+        self.is_connected = True
+        self.records = []
+        self.fail = False
+
+    async def store_audit_records(self, records: List[Dict[str, Any]]) -> bool:
+        if self.fail:
+            return False
+        self.records.extend(dict(record) for record in records)
+        return True
+
+    async def get_audit_chain(self, chain: str, after_seq: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        records = sorted(
+            (record for record in self.records if record['chain'] == chain and record['seq'] > after_seq),
+            key=lambda record: record['seq']
+        )
+        return [dict(record) for record in records[:limit]]
+
+    def stored(self, seq: int) -> Dict[str, Any]:
+        return next(record for record in self.records if record['seq'] == seq)
+
+
+def audit_log(db: FakeDatabase, records: int = 5) -> AuditLog:
+    log = AuditLog(db)
+    for i in range(records):
+        log.append('control.set_mode', actor='admin', target='aegis', details={'mode': f"mode-{i}"})
+    return log
+
+
+def test_records_are_chained_by_hash():
+    log = audit_log(FakeDatabase(), records=3)
+    records = list(log.pending)
+
+    assert [record['seq'] for record in records] == [1, 2, 3]
+    assert records[0]['prev_hash'] == GENESIS
+    assert records[1]['prev_hash'] == records[0]['hash']
+    assert records[2]['prev_hash'] == records[1]['hash']
+    assert log.last_hash == records[2]['hash']
+
+
+@pytest.mark.asyncio
+async def test_verify_valid_chain():
+    db = FakeDatabase()
+    log = audit_log(db)
+
+    result = await log.verify()
+
+    # verify() commits this process's pending records first
+    assert result == {'chain': log.chain, 'valid': True, 'checked': 5, 'last_seq': 5}
+    assert not log.pending
+
+
+@pytest.mark.asyncio
+async def test_verify_detects_an_edited_record():
+    db = FakeDatabase()
+    log = audit_log(db)
+    await log.flush()
+
+    db.stored(3)['details'] = {'mode': 'manual'}
+    result = await log.verify()
+
+    assert not result['valid']
+    assert result['seq'] == 3 and result['checked'] == 2
+    assert result['problem'] == "record content does not match its hash"
+
+
+@pytest.mark.asyncio
+async def test_verify_detects_a_rehashed_record():
+    db = FakeDatabase()
+    log = audit_log(db)
+    await log.flush()
+
+    # Editing a record and recomputing its hash breaks the next record's link
+    record = db.stored(2)
+    record['actor'] = 'someone-else'
+    record['hash'] = record_hash(record)
+    result = await log.verify()
+
+    assert not result['valid']
+    assert result['seq'] == 3
+    assert result['problem'] == "previous hash does not match"
+
+
+@pytest.mark.asyncio
+async def test_verify_detects_a_deleted_record():
+    db = FakeDatabase()
+    log = audit_log(db)
+    await log.flush()
+
+    db.records.remove(db.stored(4))
+    result = await log.verify()
+
+    assert not result['valid']
+    assert result['seq'] == 5
+    assert result['problem'] == "missing records after seq 3"
+
+
+@pytest.mark.asyncio
+async def test_verify_other_chain():
+    db = FakeDatabase()
+    other = audit_log(db, records=2)
+    await other.flush()
+    log = audit_log(db, records=1)
+
+    result = await log.verify(other.chain)
+
+    assert result['valid'] and result['checked'] == 2
+    assert log.pending  # Only this process's own chain is committed first
+
+
+@pytest.mark.asyncio
+async def test_failed_commit_keeps_records_pending():
+    db = FakeDatabase()
+    log = audit_log(db, records=2)
+    db.fail = True
+
+    assert not await log.flush()
+    assert len(log.pending) == 2 and log.stats['failed_commits'] == 1
+
+    db.fail = False
+    log.append('control.pause', actor='admin')
+    assert await log.flush()
+    assert not log.pending
+    assert (await log.verify())['checked'] == 3
+
+
+@pytest.mark.asyncio
+async def test_critical_record_is_durable_once_stored():
+    db = FakeDatabase()
+    log = AuditLog(db)
+    await log.start()
+    try:
+        receipt = await log.record('control.pause', actor='admin', critical=True)
+    finally:
+        await log.stop()
+
+    assert receipt['durable']
+    assert db.stored(receipt['seq'])['hash'] == receipt['hash']
+
+
+@pytest.mark.asyncio
+async def test_records_without_mongodb_are_not_durable():
+    db = FakeDatabase()
+    db.is_connected = False
+    log = AuditLog(db)
+    await log.start()
+    try:
+        receipt = await log.record('control.pause', actor='admin', critical=True)
+        result = await log.verify()
+    finally:
+        await log.stop()
+
+    assert not receipt['durable']
+    assert result == {'chain': log.chain, 'valid': True, 'checked': 0, 'last_seq': 0}
+    assert len(log.pending) == 1
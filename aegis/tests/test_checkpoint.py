@@ -0,0 +1,191 @@
+"""
+Tests for CheckpointManager: generation chains, interleaved writers and
+verification on load
+"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+import utils.checkpoint as checkpoint
+from utils.checkpoint import CheckpointManager
+
+
+class Model:
+    """Dict of values checkpointed as full copies or as the keys changed since the last write"""
+
+    def __init__(self):
+        self.values = {}
+        self.changed = set()
+
+    def snapshot(self, full: bool):
+        keys = self.values.keys() if full else self.changed
+        snapshot = {key: self.values[key] for key in keys}
+        self.changed = set()
+        return snapshot
+
+    @staticmethod
+    def write(snapshot, directory):
+        with open(directory / 'values.json', 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+
+    def set(self, key, value):
+        self.values[key] = value
+        self.changed.add(key)
+
+
+def manager(directory, model=None, **kwargs):
+    model = model or Model()
+    return CheckpointManager('test', directory, model.snapshot, model.write, full_every=10, **kwargs)
+
+
+def restore(chain):
+    """Replay a chain the way a model would: the full generation, then each delta"""
+    values = {}
+    for path, _ in chain:
+        with open(path / 'values.json', 'r', encoding='utf-8') as f:
+            values.update(json.load(f))
+    return values
+
+
+@pytest.mark.asyncio
+async def test_chain_is_full_then_deltas(tmp_path):
+    model = Model()
+    writer = manager(tmp_path, model)
+    for i in range(4):
+        model.set(f"k{i}", i)
+        await writer.checkpoint()
+
+    reader = manager(tmp_path)
+    chain = reader.chain()
+
+    assert [manifest['kind'] for _, manifest in chain] == ['full', 'delta', 'delta', 'delta']
+    assert [manifest['parent_generation'] for _, manifest in chain] == [None, 1, 2, 3]
+    assert restore(chain) == model.values
+    assert reader.generation == 4 and reader.parent == 4
+    assert not reader.force_full
+
+
+def test_empty_directory_has_no_chain(tmp_path):
+    assert manager(tmp_path / 'missing').chain() == []
+
+
+@pytest.mark.asyncio
+async def test_chain_follows_parents_of_interleaved_writers(tmp_path):
+    first, second = Model(), Model()
+    first_writer, second_writer = manager(tmp_path, first), manager(tmp_path, second)
+
+    first.set('a', 1)
+    await first_writer.checkpoint()   # gen 1, full
+    second.set('b', 1)
+    await second_writer.checkpoint()  # gen 2, full
+    first.set('a', 2)
+    await first_writer.checkpoint()   # gen 3, delta on 1
+    second.set('b', 2)
+    await second_writer.checkpoint()  # gen 4, delta on 2
+
+    chain = manager(tmp_path).chain()
+
+    assert [path.name for path, _ in chain] == ['gen-000002', 'gen-000004']
+    assert restore(chain) == {'b': 2}
+    assert {manifest['writer'] for _, manifest in chain} == {second_writer.writer}
+
+
+@pytest.mark.asyncio
+async def test_unreadable_delta_falls_back_to_an_earlier_generation(tmp_path):
+    model = Model()
+    writer = manager(tmp_path, model)
+    for i in range(3):
+        model.set('k', i)
+        await writer.checkpoint()
+
+    (tmp_path / 'gen-000003' / 'values.json').write_text('{"k": 99, "x": 1}', encoding='utf-8')
+
+    reader = manager(tmp_path)
+    chain = reader.chain()
+
+    assert [path.name for path, _ in chain] == ['gen-000001', 'gen-000002']
+    assert restore(chain) == {'k': 1}
+    assert reader.force_full  # The next checkpoint must not build on the skipped generation
+
+
+@pytest.mark.asyncio
+async def test_delta_whose_parent_is_missing_is_skipped(tmp_path):
+    model = Model()
+    writer = manager(tmp_path, model)
+    model.set('k', 0)
+    await writer.checkpoint()        # gen 1, full
+    model.set('k', 1)
+    await writer.checkpoint()        # gen 2, delta on 1
+    model.set('k', 2)
+    await writer.checkpoint(full=True)  # gen 3, full
+    model.set('k', 3)
+    await writer.checkpoint()        # gen 4, delta on 3
+
+    shutil.rmtree(tmp_path / 'gen-000003')
+
+    chain = manager(tmp_path).chain()
+
+    assert [path.name for path, _ in chain] == ['gen-000001', 'gen-000002']
+    assert restore(chain) == {'k': 1}
+
+
+@pytest.mark.asyncio
+async def test_generations_not_published_are_ignored(tmp_path):
+    model = Model()
+    writer = manager(tmp_path, model)
+    model.set('k', 0)
+    await writer.checkpoint()
+    model.set('k', 1)
+    await writer.checkpoint()
+
+    # A crash after renaming the generation but before replacing LATEST
+    (tmp_path / 'LATEST').write_text('gen-000001', encoding='utf-8')
+
+    assert [path.name for path, _ in manager(tmp_path).chain()] == ['gen-000001']
+
+
+@pytest.mark.asyncio
+async def test_load_hashes_only_files_modified_since_written(tmp_path, monkeypatch):
+    monkeypatch.delenv('AEGIS_CHECKPOINT_VERIFY', raising=False)
+    model = Model()
+    model.set('k', 'a' * 100)
+    await manager(tmp_path, model).checkpoint()
+
+    hashed = []
+    digest = checkpoint.file_digest
+    monkeypatch.setattr(checkpoint, 'file_digest', lambda path: hashed.append(path) or digest(path))
+
+    reader = manager(tmp_path)
+    assert len(reader.chain()) == 1
+    assert hashed == []
+
+    # Same size, new content: the changed mtime makes the load hash it
+    path = tmp_path / 'gen-000001' / 'values.json'
+    stat = path.stat()
+    path.write_text(path.read_text(encoding='utf-8').replace('a', 'b'), encoding='utf-8')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert manager(tmp_path).chain() == []
+    assert hashed == [path]
+
+
+@pytest.mark.asyncio
+async def test_explicit_verify_hashes_every_file(tmp_path):
+    model = Model()
+    model.set('k', 'a' * 100)
+    writer = manager(tmp_path, model)
+    path = await writer.checkpoint()
+
+    # Rewritten with the recorded size and mtime: only a digest tells
+    values = path / 'values.json'
+    stat = values.stat()
+    values.write_text(values.read_text(encoding='utf-8').replace('a', 'b'), encoding='utf-8')
+    os.utime(values, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    manifest = writer.read_manifest(path)
+    writer.verify(path, manifest)
+    with pytest.raises(ValueError):
+        writer.verify(path, manifest, digests=True)
@@ -0,0 +1,70 @@
+"""
+Tests for CompiledForest: scores match IsolationForest.score_samples
+"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from models.compiled_forest import CompiledForest
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    X_train = rng.lognormal(size=(2000, 8))
+    X_test = np.vstack([rng.lognormal(size=(1000, 8)), rng.lognormal(mean=3, size=(20, 8))])
+    return X_train, X_test
+
+
+@pytest.mark.parametrize('params', [
+    {'n_estimators': 50},
+    {'n_estimators': 30, 'max_features': 0.5},  # Trees fitted on feature subsets
+    {'n_estimators': 30, 'max_samples': 64, 'contamination': 0.1},
+])
+def test_scores_match_sklearn(data, params):
+    X_train, X_test = data
+    model = IsolationForest(random_state=42, **params).fit(X_train)
+
+    compiled = CompiledForest.from_sklearn(model)
+
+    np.testing.assert_allclose(compiled.score_samples(X_test), model.score_samples(X_test), rtol=0, atol=1e-12)
+
+
+def test_fused_scaler_matches_scaled_input(data):
+    X_train, X_test = data
+    scaler = StandardScaler().fit(X_train)
+    model = IsolationForest(n_estimators=50, random_state=42).fit(scaler.transform(X_train))
+
+    compiled = CompiledForest.from_sklearn(model, scaler)
+
+    # Up to float32 rounding at split boundaries (sklearn compares float32 inputs)
+    np.testing.assert_allclose(
+        compiled.score_samples(X_test), model.score_samples(scaler.transform(X_test)), rtol=0, atol=1e-9
+    )
+
+
+def test_single_row(data):
+    X_train, X_test = data
+    model = IsolationForest(n_estimators=20, random_state=0).fit(X_train)
+
+    compiled = CompiledForest.from_sklearn(model)
+
+    assert compiled.score_samples(X_test[0]).shape == (1,)
+    assert compiled.score_samples(X_test[0])[0] == pytest.approx(model.score_samples(X_test[:1])[0], abs=1e-12)
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_saved_forest_scores_the_same(data, tmp_path, mmap):
+    X_train, X_test = data
+    scaler = StandardScaler().fit(X_train)
+    model = IsolationForest(n_estimators=20, random_state=0).fit(scaler.transform(X_train))
+    compiled = CompiledForest.from_sklearn(model, scaler)
+
+    compiled.save(tmp_path)
+    loaded = CompiledForest.load(tmp_path, mmap=mmap)
+
+    assert CompiledForest.exists(tmp_path)
+    assert isinstance(loaded.feature, np.memmap) == mmap
+    np.testing.assert_array_equal(loaded.score_samples(X_test), compiled.score_samples(X_test))
@@ -0,0 +1,234 @@
+"""
+Tests for SuggestionStore: decisions and flushes against an in-memory
+stand-in for the suggestions collection
+"""
+
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import pytest
+
+from core.suggestions import SuggestionStore
+
+
+class FakeDatabase:
+    """The suggestion methods of DatabaseManager, with the same conditional updates"""
+
+    def __init__(self):
+        self.is_connected = True
+        self.documents = {}   # id -> stored suggestion
+        self.failing = set()  # Ids whose changes are not stored
+        self.writes = 0
+
+    async def write_suggestions(
+        self,
+        inserts: List[Dict[str, Any]],
+        merges: List[Dict[str, Any]],
+        expirations: List[Dict[str, Any]],
+        decisions: List[Dict[str, Any]] = ()
+    ) -> List[str]:
+        self.writes += 1
+        changes = [*inserts, *merges, *expirations, *decisions]
+        if not self.is_connected:
+            return [change['id'] for change in changes]
+
+        failed = [change['id'] for change in changes if change['id'] in self.failing]
+        now = datetime.utcnow()
+
+        for suggestion in inserts:
+            if suggestion['id'] not in failed:
+                self.documents.setdefault(suggestion['id'], {**suggestion, 'updated_at': now})
+        for merge in merges:
+            stored = self.documents.get(merge['id'])
+            if merge['id'] not in failed and stored and stored['status'] == 'pending':
+                stored['occurrences'] += merge['occurrences']
+                stored['confidence'] = max(stored['confidence'], merge['confidence'])
+        for suggestion in expirations:
+            stored = self.documents.get(suggestion['id'])
+            if suggestion['id'] not in failed and stored and stored['status'] == 'pending':
+                stored.update(status='expired', decided_at=suggestion['decided_at'])
+        for suggestion in decisions:
+            stored = self.documents.get(suggestion['id'])
+            if suggestion['id'] not in failed and stored and stored['status'] == 'pending':
+                stored.update(status=suggestion['status'], feedback=suggestion.get('feedback'),
+                              decided_at=suggestion['decided_at'])
+        return failed
+
+    async def decide_suggestion(self, suggestion_id: str, status: str, feedback: Optional[str],
+                                decided_at: str) -> Optional[Dict[str, Any]]:
+        stored = self.documents.get(suggestion_id)
+        if stored is None or stored['status'] != 'pending':
+            return None
+        stored.update(status=status, feedback=feedback, decided_at=decided_at)
+        return dict(stored)
+
+    async def get_suggestion(self, suggestion_id: str) -> Optional[Dict[str, Any]]:
+        stored = self.documents.get(suggestion_id)
+        return dict(stored) if stored else None
+
+    async def get_suggestions(self, status=None, updated_since=None, limit=None) -> List[Dict[str, Any]]:
+        return [
+            dict(document) for document in self.documents.values()
+            if (status is None or document['status'] == status)
+            and (updated_since is None or document['updated_at'] > updated_since)
+        ]
+
+    async def update_suggestion(self, suggestion_id: str, fields: Dict[str, Any]):
+        if suggestion_id in self.documents:
+            self.documents[suggestion_id].update(fields)
+
+
+async def suggest(store: SuggestionStore, target: str = 'api', confidence: float = 0.8) -> Dict[str, Any]:
+    return await store.add('restart_service', 'error_spike', target, 'Error rate above baseline', confidence)
+
+
+@pytest.mark.asyncio
+async def test_flush_stores_new_suggestions():
+    db = FakeDatabase()
+    store = SuggestionStore(db)
+    suggestion = await suggest(store)
+
+    assert await store.flush()
+    assert db.documents[suggestion['id']]['status'] == 'pending'
+    assert not store.dirty and not store.unsaved
+
+    # Nothing changed: no write
+    writes = db.writes
+    assert await store.flush()
+    assert db.writes == writes
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_changes_for_the_next_one():
+    db = FakeDatabase()
+    store = SuggestionStore(db)
+    suggestion = await suggest(store)
+    db.failing.add(suggestion['id'])
+
+    assert not await store.flush()
+    assert suggestion['id'] in store.dirty and suggestion['id'] in store.unsaved
+    assert suggestion['id'] not in db.documents
+
+    db.failing.clear()
+    assert await store.flush()
+    assert db.documents[suggestion['id']]['occurrences'] == 1
+    assert not store.dirty and not store.unsaved
+
+
+@pytest.mark.asyncio
+async def test_merges_of_a_failed_flush_add_up_with_later_ones():
+    db = FakeDatabase()
+    store = SuggestionStore(db)
+    suggestion = await suggest(store)
+    assert await store.flush()
+
+    await suggest(store, confidence=0.9)
+    db.failing.add(suggestion['id'])
+    assert not await store.flush()
+    assert store.merged[suggestion['id']] == 1
+
+    await suggest(store)
+    db.failing.clear()
+    assert await store.flush()
+    assert db.documents[suggestion['id']]['occurrences'] == 3
+    assert db.documents[suggestion['id']]['confidence'] == 0.9
+
+
+@pytest.mark.asyncio
+async def test_decide_stored_suggestion_once():
+    db = FakeDatabase()
+    store = SuggestionStore(db)
+    suggestion = await suggest(store)
+
+    decided = await store.decide(suggestion['id'], 'approved', 'looks right')
+
+    assert decided['status'] == 'approved'
+    assert db.documents[suggestion['id']]['feedback'] == 'looks right'
+    assert suggestion['id'] not in store.pending
+    assert store.stats['approved'] == 1
+
+    with pytest.raises(ValueError):
+        await store.decide(suggestion['id'], 'rejected')
+    assert db.documents[suggestion['id']]['status'] == 'approved'
+
+
+@pytest.mark.asyncio
+async def test_decide_unknown_suggestion():
+    store = SuggestionStore(FakeDatabase())
+
+    with pytest.raises(KeyError):
+        await store.decide('sug_missing', 'approved')
+
+
+@pytest.mark.asyncio
+async def test_decision_taken_by_another_process_wins():
+    db = FakeDatabase()
+    store = SuggestionStore(db)
+    suggestion = await suggest(store)
+    assert await store.flush()
+
+    db.documents[suggestion['id']]['status'] = 'rejected'
+
+    with pytest.raises(ValueError, match='rejected'):
+        await store.decide(suggestion['id'], 'approved')
+    assert suggestion['id'] not in store.pending
+
+
+@pytest.mark.asyncio
+async def test_suggestion_not_stored_is_decided_locally_and_stored_later():
+    db = FakeDatabase()
+    store = SuggestionStore(db)
+    suggestion = await suggest(store)
+    db.is_connected = False
+
+    decided = await store.decide(suggestion['id'], 'rejected', 'false positive')
+
+    assert decided['status'] == 'rejected'
+    assert suggestion['id'] not in store.pending
+    assert suggestion['id'] in store.dirty and suggestion['id'] in store.unsaved
+
+    db.is_connected = True
+    assert await store.flush()
+    assert db.documents[suggestion['id']]['status'] == 'rejected'
+    assert db.documents[suggestion['id']]['feedback'] == 'false positive'
+
+
+@pytest.mark.asyncio
+async def test_merge_left_by_a_failed_flush_does_not_undo_a_decision():
+    db = FakeDatabase()
+    store = SuggestionStore(db)
+    suggestion = await suggest(store)
+    assert await store.flush()
+
+    await suggest(store)  # Merged: dirty again
+    db.failing.add(suggestion['id'])
+    await store.decide(suggestion['id'], 'approved')
+
+    # Stored before: decided in MongoDB although the merge is still queued
+    assert db.documents[suggestion['id']]['status'] == 'approved'
+    assert suggestion['id'] in store.merged
+
+    db.failing.clear()
+    assert await store.flush()
+    assert db.documents[suggestion['id']]['status'] == 'approved'
+    assert db.documents[suggestion['id']]['occurrences'] == 1
+
+
+@pytest.mark.asyncio
+async def test_stored_suggestion_decided_without_mongodb_is_flushed_as_a_decision():
+    db = FakeDatabase()
+    store = SuggestionStore(db)
+    approved, rejected = await suggest(store), await suggest(store, target='worker')
+    assert await store.flush()
+    db.is_connected = False
+
+    await store.decide(approved['id'], 'approved')
+    await store.decide(rejected['id'], 'rejected')
+    assert not await store.flush()
+
+    # Another process approved the second one meanwhile: the conditional update keeps its decision
+    db.is_connected = True
+    db.documents[rejected['id']]['status'] = 'approved'
+    assert await store.flush()
+    assert db.documents[approved['id']]['status'] == 'approved'
+    assert db.documents[rejected['id']]['status'] == 'approved'
@@ -0,0 +1,149 @@
+"""
+Tests for TelemetrySampler: per-session sampling of JSON array and NDJSON bodies
+"""
+
+import json
+from types import SimpleNamespace
+from typing import Dict, Any, List
+
+import pytest
+
+from core.telemetry_sampler import TelemetrySampler, session_hash, HASH_SPACE
+
+
+def events(count: int = 200) -> List[Dict[str, Any]]:
+    return [
+        {'sessionId': f"session-{i % 50}", 'eventType': 'click', 'sequence': i}
+        for i in range(count)
+    ]
+
+
+def ndjson(items: List[Any]) -> bytes:
+    return b'\n'.join(json.dumps(item).encode('utf-8') for item in items) + b'\n'
+
+
+async def chunked(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def kept_sessions(kept: List[Dict[str, Any]]) -> set:
+    return {event['sessionId'] for event in kept}
+
+
+def test_full_rate_keeps_every_event():
+    sampler = TelemetrySampler()
+    body = json.dumps(events()).encode('utf-8')
+
+    kept, received = sampler.sample_array(body, 1.0)
+
+    assert received == 200 and len(kept) == 200
+    assert all(event['sampleWeight'] == 1.0 for event in kept)
+
+
+def test_sessions_are_kept_whole_by_hash():
+    sampler = TelemetrySampler()
+    cutoff = 0.3 * HASH_SPACE
+
+    kept, received = sampler.sample_array(json.dumps(events()).encode('utf-8'), 0.3)
+
+    assert received == 200
+    assert kept_sessions(kept) == {
+        event['sessionId'] for event in events() if session_hash(event['sessionId']) < cutoff
+    }
+    assert len(kept) == 4 * len(kept_sessions(kept))  # Every event of a kept session
+    assert all(event['sampleWeight'] == pytest.approx(1 / 0.3) for event in kept)
+    assert sampler.get_stats()['kept'] == len(kept)
+
+
+def test_lowering_the_rate_only_drops_sessions():
+    sampler = TelemetrySampler()
+    body = json.dumps(events()).encode('utf-8')
+
+    higher = kept_sessions(sampler.sample_array(body, 0.6)[0])
+    lower = kept_sessions(sampler.sample_array(body, 0.2)[0])
+
+    assert lower < higher
+
+
+def test_client_sample_weight_is_overridden():
+    body = json.dumps([{'sessionId': 'session-1', 'sampleWeight': 100}]).encode('utf-8')
+
+    kept, _ = TelemetrySampler().sample_array(body, 1.0)
+
+    assert kept[0]['sampleWeight'] == 1.0
+
+
+@pytest.mark.parametrize('rate', [1.0, 0.5, 0.01])
+def test_array_rejects_non_object_items_at_any_rate(rate):
+    body = json.dumps([{'sessionId': 'session-1'}, 'not an event']).encode('utf-8')
+
+    with pytest.raises(ValueError, match='item 1'):
+        TelemetrySampler().sample_array(body, rate)
+
+
+def test_array_rejects_other_bodies():
+    with pytest.raises(ValueError):
+        TelemetrySampler().sample_array(b'{"sessionId": "session-1"}', 0.5)
+    with pytest.raises(ValueError):
+        TelemetrySampler().sample_array(b'[{"sessionId": ', 0.5)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('chunk_size', [7, 64, 100000])
+async def test_ndjson_keeps_the_same_events_as_the_array(chunk_size):
+    sampler = TelemetrySampler()
+    body = ndjson(events())
+
+    kept, received = await sampler.sample_ndjson(chunked(body, chunk_size), 0.3)
+    expected, _ = sampler.sample_array(json.dumps(events()).encode('utf-8'), 0.3)
+
+    assert received == 200
+    assert kept == expected
+
+
+@pytest.mark.asyncio
+async def test_ndjson_without_trailing_newline_or_with_blank_lines():
+    body = b'\n' + ndjson(events(10)).rstrip(b'\n').replace(b'\n', b'\n\n')
+
+    kept, received = await TelemetrySampler().sample_ndjson(chunked(body, 16), 1.0)
+
+    assert received == 10
+    assert [event['sequence'] for event in kept] == list(range(10))
+
+
+@pytest.mark.asyncio
+async def test_ndjson_session_id_is_read_from_the_outer_object():
+    kept_id = next(f"s{i}" for i in range(1000) if session_hash(f"s{i}") < 0.5 * HASH_SPACE)
+    dropped_id = next(f"s{i}" for i in range(1000) if session_hash(f"s{i}") >= 0.5 * HASH_SPACE)
+    lines = [
+        {'metadata': {'sessionId': kept_id}, 'sessionId': dropped_id},  # Nested first: decoded
+        {'sessionId': kept_id, 'metadata': {'sessionId': dropped_id}},
+        {'metadata': {'sessionId': kept_id}},  # No top-level sessionId: the empty session
+        {'sessionId': kept_id + '\\"', 'sequence': 1},  # Escaped in the raw line
+    ]
+
+    kept, received = await TelemetrySampler().sample_ndjson(chunked(ndjson(lines), 1000), 0.5)
+
+    expected = [line for line in lines if session_hash(str(line.get('sessionId', ''))) < 0.5 * HASH_SPACE]
+    assert received == 4
+    assert [{key: value for key, value in event.items() if key != 'sampleWeight'} for event in kept] == expected
+    assert lines[1] in expected and lines[0] not in expected
+
+
+@pytest.mark.asyncio
+async def test_ndjson_rejects_non_object_lines():
+    body = ndjson([{'sessionId': 'session-1'}, [1, 2]])
+
+    with pytest.raises(ValueError):
+        await TelemetrySampler().sample_ndjson(chunked(body, 1000), 0.5)
+
+
+def test_rate_follows_the_control_state():
+    control_state = SimpleNamespace(state=SimpleNamespace(telemetry_enabled=True, telemetry_samplerate=0.25))
+    sampler = TelemetrySampler(control_state)
+
+    assert sampler.rate == 0.25
+    control_state.state.telemetry_enabled = False
+    assert sampler.rate == 0.0
+    assert TelemetrySampler().rate == 1.0
@@ -4,5 +4,7 @@ Utils Package
 
 from .database import DatabaseManager
 from .redis_manager import RedisManager
+from .stream_bus import StreamBus
+from .checkpoint import CheckpointManager
 
-__all__ = ['DatabaseManager', 'RedisManager']
+__all__ = ['DatabaseManager', 'RedisManager', 'StreamBus', 'CheckpointManager']
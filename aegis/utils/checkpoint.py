@@ -0,0 +1,468 @@
+"""
+Checkpoint Manager
+Background, crash-safe checkpoints for learned models
+Snapshots are taken in memory on the event loop and serialized on a worker
+thread into numbered generation directories, published by atomic rename
+Each generation's manifest records the size, mtime and sha256 of every
+file, and each delta the generation it builds on
+"""
+
+import logging
+from typing import Dict, Any, List, Optional, Callable, Tuple, BinaryIO, Awaitable
+from datetime import datetime
+from pathlib import Path
+from contextlib import contextmanager
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import socket
+import threading
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: generations are only serialized within the process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+GENERATION_PREFIX = 'gen-'
+LATEST_FILE = 'LATEST'
+MANIFEST_FILE = 'manifest.json'
+LOCK_FILE = '.lock'
+MANIFEST_FORMAT = 3  # 2: manifests list files with sizes and digests, 3: deltas record their parent
+
+
+def fsync_dir(path: Path):
+    """Flush a directory entry (makes renames inside it durable)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # Not supported on this platform (e.g. Windows)
+
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def file_digest(path: Path) -> str:
+    """sha256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def atomic_write(path: Path, write: Callable[[BinaryIO], None]):
+    """
+    Write a file atomically: temp file in the same directory, fsync, rename
+    Readers see either the old or the new content, never a partial file
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+
+    with open(tmp_path, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+    fsync_dir(path.parent)
+
+
+@contextmanager
+def directory_lock(directory: Path):
+    """Exclusive lock on a checkpoint directory, held across processes"""
+    with open(Path(directory) / LOCK_FILE, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class CheckpointManager:
+    """
+    Generational checkpoints for one model
+
+    The model supplies two callables:
+        snapshot(full) -> in-memory copy of its state (called on the event loop,
+                          must be cheap and independent of later mutations)
+        write(snapshot, directory) -> serialize a snapshot into a directory
+                          (called on a worker thread)
+
+    Each checkpoint is written to a hidden temp directory private to the
+    writing process, fsynced and renamed to gen-NNNNNN; the LATEST file is
+    then replaced atomically. Allocating the generation number and publishing
+    it happen under an exclusive lock on the directory, so processes sharing
+    it never publish the same number. A crash at any point leaves the
+    previous generation intact.
+
+    Restoring verifies every file against the manifest: its size, and its
+    sha256 only if its mtime changed since it was written, so memory-mapped
+    files are not read in full at load (AEGIS_CHECKPOINT_VERIFY=sha256 hashes
+    every file, like verify(digests=True)); a generation that fails is
+    skipped like an unreadable one and the next checkpoint is written full.
+    Models may store large arrays as separate .npy files so loaders can
+    memory-map them and processes share the pages through the page cache.
+
+    Checkpoints run when mark_dirty() has accumulated every_updates updates
+    or every interval seconds if anything changed. When full_every > 0, the
+    model may write delta generations between full ones (snapshot(False)).
+    A delta records its writer and parent_generation, the generation the
+    writer's state was last written to or restored from: processes sharing
+    the directory interleave their generations, and restoring follows the
+    parents of the newest generation back to a full one. A generation
+    whose chain is incomplete is skipped like an unreadable one.
+
+    on_checkpoint, if given, is awaited with each generation directory
+    written (e.g. to publish it to other processes).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        directory: Path,
+        snapshot: Callable[[bool], Any],
+        write: Callable[[Any, Path], None],
+        interval: Optional[float] = None,
+        every_updates: Optional[int] = None,
+        keep: Optional[int] = None,
+        full_every: Optional[int] = None,
+        on_checkpoint: Optional[Callable[[Path], Awaitable[None]]] = None
+    ):
+        self.name = name
+        self.directory = Path(directory)
+        self.snapshot = snapshot
+        self.write = write
+        self.on_checkpoint = on_checkpoint
+
+        self.interval = float(interval if interval is not None else os.getenv('AEGIS_CHECKPOINT_INTERVAL', 60))
+        self.every_updates = int(every_updates if every_updates is not None else os.getenv('AEGIS_CHECKPOINT_EVERY_UPDATES', 1000))
+        self.keep = max(1, int(keep if keep is not None else os.getenv('AEGIS_CHECKPOINT_KEEP', 3)))
+        self.full_every = int(full_every if full_every is not None else 0)
+        self.verify_digests = os.getenv('AEGIS_CHECKPOINT_VERIFY', 'size') == 'sha256'
+
+        self.generation = 0
+        self.writer = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.parent = None  # Generation the model state was last written to or restored from
+        self.since_full = 0
+        self.force_full = True
+        self.pending_updates = 0
+
+        self.trigger = None
+        self.lock = None
+        self.task = None
+        self.is_running = False
+
+        self.stats = {
+            'checkpoints': 0,
+            'full': 0,
+            'delta': 0,
+            'failures': 0,
+            'last_checkpoint': None,
+            'last_duration_ms': None
+        }
+
+    async def start(self):
+        """Start the background checkpoint loop"""
+        if self.is_running:
+            return
+
+        self.trigger = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.is_running = True
+        self.task = asyncio.create_task(self.run_loop())
+        logger.info(f"💾 Checkpointing {self.name} to {self.directory} (every {self.interval:.0f}s or {self.every_updates} updates)")
+
+    async def stop(self):
+        """Stop the loop, writing a final checkpoint if anything changed"""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        self.trigger.set()
+        await asyncio.gather(self.task, return_exceptions=True)
+        self.task = None
+
+        if self.pending_updates:
+            await self.checkpoint()
+
+    def mark_dirty(self, updates: int = 1):
+        """Record model updates; wakes the loop once enough have accumulated"""
+        self.pending_updates += updates
+        if self.pending_updates >= self.every_updates and self.trigger is not None:
+            self.trigger.set()
+
+    async def run_loop(self):
+        """Checkpoint on the update trigger or the interval, whichever comes first"""
+        while self.is_running:
+            try:
+                await asyncio.wait_for(self.trigger.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self.trigger.clear()
+            if self.is_running and self.pending_updates:
+                await self.checkpoint()
+
+    async def checkpoint(self, full: bool = False) -> Optional[Path]:
+        """
+        Snapshot the model now and write it on a worker thread
+        Returns the generation directory, or None if writing failed
+        """
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+
+        async with self.lock:
+            full = (
+                full or self.force_full or self.full_every <= 0
+                or self.since_full >= self.full_every or not self.has_parent()
+            )
+            updates = self.pending_updates
+            self.pending_updates = 0
+
+            started = datetime.now()
+            snapshot = self.snapshot(full)
+
+            try:
+                path = await asyncio.to_thread(self.write_generation, snapshot, full, updates)
+
+            except Exception as e:
+                # The snapshot's changes are lost for deltas: next one must be full
+                self.pending_updates += updates
+                self.force_full = True
+                self.stats['failures'] += 1
+                logger.error(f"❌ Failed to checkpoint {self.name}: {str(e)}")
+                return None
+
+            self.force_full = False
+            self.since_full = 0 if full else self.since_full + 1
+
+            self.stats['checkpoints'] += 1
+            self.stats['full' if full else 'delta'] += 1
+            self.stats['last_checkpoint'] = path.name
+            self.stats['last_duration_ms'] = (datetime.now() - started).total_seconds() * 1000
+
+            logger.info(f"💾 {self.name} checkpoint {path.name} ({'full' if full else 'delta'})")
+
+        if self.on_checkpoint is not None:
+            try:
+                await self.on_checkpoint(path)
+            except Exception as e:
+                logger.error(f"❌ Failed to publish {self.name} checkpoint {path.name}: {str(e)}")
+        return path
+
+    def write_generation(self, snapshot: Any, full: bool, updates: int) -> Path:
+        """Write one generation (worker thread)"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # Serialized outside the lock, into a directory no other writer uses
+        tmp_dir = self.directory / f".tmp-{os.getpid()}-{threading.get_ident()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir()
+
+        try:
+            self.write(snapshot, tmp_dir)
+
+            # Flush every file and record its size, mtime and digest
+            files = {}
+            for path in sorted(tmp_dir.iterdir()):
+                with open(path, 'rb') as f:
+                    os.fsync(f.fileno())
+                stat = path.stat()
+                files[path.name] = {
+                    'bytes': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_digest(path)
+                }
+
+            with directory_lock(self.directory):
+                # Another process may have pruned it since the snapshot
+                if not full and not self.has_parent():
+                    raise ValueError(f"parent generation {self.parent} was pruned, writing the next checkpoint full")
+
+                generation = max(self.generation, self.latest_generation()) + 1
+                name = f"{GENERATION_PREFIX}{generation:06d}"
+
+                manifest = {
+                    'format': MANIFEST_FORMAT,
+                    'generation': generation,
+                    'kind': 'full' if full else 'delta',
+                    'writer': self.writer,
+                    'parent_generation': None if full else self.parent,
+                    'updates': updates,
+                    'created_at': datetime.now().isoformat(),
+                    'files': files
+                }
+                with open(tmp_dir / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                fsync_dir(tmp_dir)
+
+                final_dir = self.directory / name
+                os.replace(tmp_dir, final_dir)
+                fsync_dir(self.directory)
+
+                atomic_write(self.directory / LATEST_FILE, lambda f: f.write(name.encode('utf-8')))
+
+                self.generation = generation
+                self.parent = generation
+                self.prune()
+
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        return final_dir
+
+    def has_parent(self) -> bool:
+        """Whether the generation a delta would build on is still on disk"""
+        return self.parent is not None and (self.directory / f"{GENERATION_PREFIX}{self.parent:06d}").exists()
+
+    def generations(self) -> List[Tuple[int, Path]]:
+        """Published generations, oldest first"""
+        if not self.directory.exists():
+            return []
+
+        generations = []
+        for path in self.directory.glob(f"{GENERATION_PREFIX}*"):
+            try:
+                generations.append((int(path.name[len(GENERATION_PREFIX):]), path))
+            except ValueError:
+                continue
+
+        return sorted(generations)
+
+    def latest_generation(self) -> int:
+        generations = self.generations()
+        return generations[-1][0] if generations else 0
+
+    def read_manifest(self, path: Path) -> Dict[str, Any]:
+        with open(path / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def verify(self, path: Path, manifest: Dict[str, Any], digests: Optional[bool] = None):
+        """
+        Check a generation's files against its manifest (raises ValueError)
+        Sizes always; digests=True hashes every file, otherwise only files
+        whose mtime differs from the one recorded (default: verify_digests)
+        """
+        if digests is None:
+            digests = self.verify_digests
+
+        for name, expected in manifest.get('files', {}).items():
+            file_path = path / name
+            if not file_path.exists():
+                raise ValueError(f"missing {name}")
+            stat = file_path.stat()
+            if stat.st_size != expected['bytes']:
+                raise ValueError(f"{name} is {stat.st_size} bytes, expected {expected['bytes']}")
+
+            modified = expected.get('mtime_ns', stat.st_mtime_ns) != stat.st_mtime_ns
+            if (digests or modified) and file_digest(file_path) != expected['sha256']:
+                raise ValueError(f"{name} does not match its sha256")
+
+    @staticmethod
+    def parent_of(number: int, manifest: Dict[str, Any], numbers: List[int]) -> Optional[int]:
+        """Generation a delta builds on (format 2 deltas: the one published before it)"""
+        if manifest.get('format', 2) >= 3:
+            parent = manifest.get('parent_generation')
+            return parent if parent is not None and parent < number else None
+
+        older = [n for n in numbers if n < number]
+        return older[-1] if older else None
+
+    def chain(self) -> List[Tuple[Path, Dict[str, Any]]]:
+        """
+        Generations needed to restore the latest state: a full generation
+        followed by the deltas built on it, up to the newest generation
+        whose chain is complete
+        """
+        latest_file = self.directory / LATEST_FILE
+        latest = None
+        if latest_file.exists():
+            latest = int(latest_file.read_text(encoding='utf-8').strip()[len(GENERATION_PREFIX):])
+
+        # Generations never published through LATEST are ignored
+        paths = {number: path for number, path in self.generations() if latest is None or number <= latest}
+        numbers = sorted(paths)
+        manifests = {}
+
+        def load(number: int) -> Optional[Dict[str, Any]]:
+            if number not in manifests:
+                try:
+                    manifest = self.read_manifest(paths[number])
+                    self.verify(paths[number], manifest)
+                except Exception as e:
+                    logger.warning(f"⚠️  Skipping unreadable checkpoint {paths[number].name}: {str(e)}")
+                    manifest = None
+                manifests[number] = manifest
+            return manifests[number]
+
+        skipped = False
+        for number in reversed(numbers):
+            chain = []
+            link = number
+            while link in paths and load(link) is not None:
+                manifest = manifests[link]
+                chain.append((paths[link], manifest))
+                if manifest['kind'] == 'full':
+                    chain.reverse()
+                    self.generation = max(self.generation, number)
+                    self.parent = number
+                    # After skipping a generation, write the next one full
+                    self.force_full = skipped
+                    return chain
+                link = self.parent_of(link, manifest, numbers)
+
+            if chain:
+                logger.warning(f"⚠️  Skipping checkpoint {paths[number].name}: the generation it builds on is missing or unreadable")
+            skipped = True
+
+        return []
+
+    def prune(self):
+        """
+        Keep the last `keep` full generations, the deltas written after
+        them and the generations those deltas build on
+        """
+        manifests = {}
+        for number, path in self.generations():
+            try:
+                manifests[number] = self.read_manifest(path)
+            except Exception:
+                continue
+
+        full = [number for number, manifest in sorted(manifests.items()) if manifest['kind'] == 'full']
+        if len(full) <= self.keep:
+            return
+
+        oldest_kept = full[-self.keep]
+        numbers = sorted(manifests)
+        kept = set()
+        for number in numbers:
+            link = number if number >= oldest_kept else None
+            while link in manifests and link not in kept:
+                kept.add(link)
+                if manifests[link]['kind'] == 'full':
+                    break
+                link = self.parent_of(link, manifests[link], numbers)
+
+        for number, path in self.generations():
+            if number < oldest_kept and number not in kept:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get checkpoint statistics"""
+        return {
+            **self.stats,
+            'generation': self.generation,
+            'pending_updates': self.pending_updates
+        }
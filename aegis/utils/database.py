@@ -5,7 +5,9 @@ Handles MongoDB connections and operations
 
 import logging
 from motor.motor_asyncio import AsyncIOMotorClient
-from typing import Dict, Any, List
+from pymongo import UpdateOne, ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError
+from typing import Dict, Any, List, Optional, AsyncIterator
 from datetime import datetime, timedelta
 import os
 
@@ -42,9 +44,13 @@ class DatabaseManager:
             self.collections['healing_logs'] = self.db['healing_logs']
             self.collections['alerts'] = self.db['alerts']
             self.collections['gas_analysis'] = self.db['gas_analysis']
+            self.collections['log_templates'] = self.db['log_templates']
+            self.collections['suggestions'] = self.db['suggestions']
+            self.collections['audit_log'] = self.db['audit_log']
             
             # Test connection
             await self.client.admin.command('ping')
+            await self.ensure_indexes()
             
             self.is_connected = True
             logger.info("✅ MongoDB connected")
@@ -53,6 +59,23 @@ class DatabaseManager:
             logger.error(f"❌ Failed to connect to MongoDB: {str(e)}")
             logger.warning("⚠️  Running without database persistence")
     
+    async def ensure_indexes(self):
+        """Create the indexes of collections queried by key or time"""
+        try:
+            suggestions = self.collections['suggestions']
+            await suggestions.create_index([('id', ASCENDING)], unique=True)
+            await suggestions.create_index([('status', ASCENDING), ('confidence', DESCENDING), ('created_ts', ASCENDING)])
+            await suggestions.create_index([('updated_at', ASCENDING)])
+            
+            audit_log = self.collections['audit_log']
+            await audit_log.create_index([('chain', ASCENDING), ('seq', ASCENDING)], unique=True)
+            await audit_log.create_index([('ts', DESCENDING), ('chain', DESCENDING), ('seq', DESCENDING)])
+            await audit_log.create_index([('action', ASCENDING), ('ts', DESCENDING)])
+            await audit_log.create_index([('actor', ASCENDING), ('ts', DESCENDING)])
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to create indexes: {str(e)}")
+    
     async def disconnect(self):
         """Disconnect from MongoDB"""
         if self.client:
@@ -64,11 +87,11 @@ class DatabaseManager:
         await self.disconnect()
         await self.connect()
     
-    async def store_telemetry(self, events: List[Dict[str, Any]]):
-        """Store telemetry events"""
+    async def store_telemetry(self, events: List[Dict[str, Any]]) -> bool:
+        """Store telemetry events (False if they could not be stored)"""
         if not self.is_connected:
             logger.warning("Database not connected, skipping store")
-            return
+            return False
         
         try:
             # Add timestamps
@@ -78,14 +101,16 @@ class DatabaseManager:
             if events:
                 await self.collections['telemetry'].insert_many(events)
                 logger.debug(f"💾 Stored {len(events)} telemetry events")
+            return True
             
         except Exception as e:
             logger.error(f"❌ Failed to store telemetry: {str(e)}")
+            return False
     
-    async def store_web3_events(self, events: List[Dict[str, Any]]):
-        """Store Web3 blockchain events"""
+    async def store_web3_events(self, events: List[Dict[str, Any]]) -> bool:
+        """Store Web3 blockchain events (False if they could not be stored)"""
         if not self.is_connected:
-            return
+            return False
         
         try:
             for event in events:
@@ -94,14 +119,16 @@ class DatabaseManager:
             if events:
                 await self.collections['web3_events'].insert_many(events)
                 logger.debug(f"💾 Stored {len(events)} Web3 events")
+            return True
             
         except Exception as e:
             logger.error(f"❌ Failed to store Web3 events: {str(e)}")
+            return False
     
-    async def store_logs(self, events: List[Dict[str, Any]]):
-        """Store application logs"""
+    async def store_logs(self, events: List[Dict[str, Any]]) -> bool:
+        """Store application logs (False if they could not be stored)"""
         if not self.is_connected:
-            return
+            return False
         
         try:
             for event in events:
@@ -110,9 +137,298 @@ class DatabaseManager:
             if events:
                 await self.collections['logs'].insert_many(events)
                 logger.debug(f"💾 Stored {len(events)} log events")
+            return True
             
         except Exception as e:
             logger.error(f"❌ Failed to store logs: {str(e)}")
+            return False
+    
+    async def upsert_log_templates(self, templates: List[Dict[str, Any]]) -> List[int]:
+        """
+        Store or update mined log templates (one document per template)
+        Several processes mine the same templates: occurrences are added to
+        the stored count and first/last seen only move outwards
+        Returns the ids of the templates not stored (empty once all are)
+        """
+        if not templates:
+            return []
+        if not self.is_connected:
+            return [template['template_id'] for template in templates]
+        
+        try:
+            await self.collections['log_templates'].bulk_write([
+                UpdateOne(
+                    {'template_id': template['template_id']},
+                    {
+                        '$set': {'template': template['template'], 'updated_at': datetime.now()},
+                        '$inc': {'count': template['occurrences']},
+                        '$min': {'first_seen': template['first_seen']},
+                        '$max': {'last_seen': template['last_seen']}
+                    },
+                    upsert=True
+                )
+                for template in templates
+            ], ordered=False)
+            logger.debug(f"💾 Stored {len(templates)} log templates")
+            return []
+            
+        except BulkWriteError as e:
+            # Unordered: the other templates were stored, and must not be added twice
+            logger.error(f"❌ Failed to store log templates: {str(e)}")
+            return [templates[error['index']]['template_id'] for error in e.details.get('writeErrors', [])]
+        except Exception as e:
+            logger.error(f"❌ Failed to store log templates: {str(e)}")
+            return [template['template_id'] for template in templates]
+    
+    async def get_log_templates(self) -> List[Dict[str, Any]]:
+        """Get all stored log templates"""
+        if not self.is_connected:
+            return []
+        
+        try:
+            cursor = self.collections['log_templates'].find({}, {'_id': 0})
+            return await cursor.to_list(length=None)
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to get log templates: {str(e)}")
+            return []
+    
+    async def write_suggestions(
+        self,
+        inserts: List[Dict[str, Any]],
+        merges: List[Dict[str, Any]],
+        expirations: List[Dict[str, Any]],
+        decisions: List[Dict[str, Any]] = ()
+    ) -> List[str]:
+        """
+        Write suggestion changes in one bulk write
+        Returns the ids whose change was not stored (empty once all are)
+        Merges, expirations and decisions only apply to suggestions still pending:
+            inserts: new suggestions (whole documents)
+            merges: id, occurrences to add, confidence and expiry (kept
+                    if higher than the stored ones)
+            expirations: id and expiry time; ignored if another process
+                    pushed the expiry back meanwhile
+            decisions: id, status, feedback and decision time of
+                    suggestions decided while they could not be stored
+        """
+        changes = [*inserts, *merges, *expirations, *decisions]
+        if not self.is_connected:
+            return [change['id'] for change in changes]
+        
+        operations = [
+            UpdateOne(
+                {'id': suggestion['id']},
+                {'$setOnInsert': suggestion, '$currentDate': {'updated_at': True}},
+                upsert=True
+            )
+            for suggestion in inserts
+        ]
+        operations += [
+            UpdateOne(
+                {'id': merge['id'], 'status': 'pending'},
+                {
+                    '$inc': {'occurrences': merge['occurrences']},
+                    '$max': {
+                        'confidence': merge['confidence'],
+                        'last_seen_at': merge['last_seen_at'],
+                        'expires_ts': merge['expires_ts'],
+                        'expires_at': merge['expires_at']
+                    },
+                    '$currentDate': {'updated_at': True}
+                }
+            )
+            for merge in merges
+        ]
+        operations += [
+            UpdateOne(
+                {'id': suggestion['id'], 'status': 'pending', 'expires_ts': {'$lte': suggestion['expires_ts']}},
+                {
+                    '$set': {'status': 'expired', 'decided_at': suggestion['decided_at']},
+                    '$currentDate': {'updated_at': True}
+                }
+            )
+            for suggestion in expirations
+        ]
+        operations += [
+            UpdateOne(
+                {'id': suggestion['id'], 'status': 'pending'},
+                {
+                    '$set': {
+                        'status': suggestion['status'],
+                        'feedback': suggestion.get('feedback'),
+                        'decided_at': suggestion['decided_at']
+                    },
+                    '$currentDate': {'updated_at': True}
+                }
+            )
+            for suggestion in decisions
+        ]
+        if not operations:
+            return []
+        
+        try:
+            await self.collections['suggestions'].bulk_write(operations, ordered=False)
+            logger.debug(f"💾 Stored {len(operations)} suggestion changes")
+            return []
+            
+        except BulkWriteError as e:
+            # Unordered: the other operations were applied (a duplicate
+            # insert means another process stored the suggestion first)
+            failed = [
+                changes[error['index']]['id'] for error in e.details.get('writeErrors', [])
+                if error['code'] != 11000
+            ]
+            if failed:
+                logger.error(f"❌ Failed to store {len(failed)} suggestion changes: {str(e)}")
+            return failed
+        except Exception as e:
+            logger.error(f"❌ Failed to store suggestions: {str(e)}")
+            return [change['id'] for change in changes]
+    
+    async def decide_suggestion(
+        self,
+        suggestion_id: str,
+        status: str,
+        feedback: Optional[str],
+        decided_at: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Move a suggestion out of pending, atomically: of concurrent decisions
+        (from any process) exactly one matches
+        Returns the decided suggestion, None if it is not pending (or does
+        not exist); raises on storage errors
+        """
+        return await self.collections['suggestions'].find_one_and_update(
+            {'id': suggestion_id, 'status': 'pending'},
+            {
+                '$set': {'status': status, 'feedback': feedback, 'decided_at': decided_at},
+                '$currentDate': {'updated_at': True}
+            },
+            projection={'_id': 0},
+            return_document=ReturnDocument.AFTER
+        )
+    
+    async def update_suggestion(self, suggestion_id: str, fields: Dict[str, Any]):
+        """Set fields of a stored suggestion"""
+        if not self.is_connected:
+            return
+        
+        try:
+            await self.collections['suggestions'].update_one(
+                {'id': suggestion_id},
+                {'$set': fields, '$currentDate': {'updated_at': True}}
+            )
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to update suggestion: {str(e)}")
+    
+    async def get_suggestion(self, suggestion_id: str) -> Optional[Dict[str, Any]]:
+        """Get one suggestion by id"""
+        if not self.is_connected:
+            return None
+        
+        try:
+            return await self.collections['suggestions'].find_one({'id': suggestion_id}, {'_id': 0})
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to get suggestion: {str(e)}")
+            return None
+    
+    async def get_suggestions(
+        self,
+        status: Optional[str] = None,
+        updated_since: Optional[datetime] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Get suggestions by status and/or last update (oldest update first)"""
+        if not self.is_connected:
+            return []
+        
+        try:
+            query = {}
+            if status:
+                query['status'] = status
+            if updated_since:
+                query['updated_at'] = {'$gte': updated_since}
+            
+            cursor = self.collections['suggestions'].find(query, {'_id': 0}).sort('updated_at', 1)
+            return await cursor.to_list(length=limit)
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to get suggestions: {str(e)}")
+            return []
+    
+    async def store_audit_records(self, records: List[Dict[str, Any]]) -> bool:
+        """
+        Append audit records in one write
+        Returns True once all of them are stored (records already stored by
+        an earlier, unacknowledged attempt count as stored)
+        """
+        if not self.is_connected:
+            return False
+        
+        try:
+            await self.collections['audit_log'].insert_many([dict(record) for record in records], ordered=False)
+            return True
+            
+        except BulkWriteError as e:
+            if all(error['code'] == 11000 for error in e.details.get('writeErrors', [])):
+                return True
+            logger.error(f"❌ Failed to store audit records: {str(e)}")
+            return False
+        except Exception as e:
+            logger.error(f"❌ Failed to store audit records: {str(e)}")
+            return False
+    
+    async def get_audit_records(
+        self,
+        action: Optional[str] = None,
+        actor: Optional[str] = None,
+        before: Optional[tuple] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Audit records newest first, optionally before a (ts, chain, seq) key"""
+        if not self.is_connected:
+            return []
+        
+        try:
+            query = {}
+            if action:
+                query['action'] = action
+            if actor:
+                query['actor'] = actor
+            if before:
+                ts, chain, seq = before
+                query['$or'] = [
+                    {'ts': {'$lt': ts}},
+                    {'ts': ts, 'chain': {'$lt': chain}},
+                    {'ts': ts, 'chain': chain, 'seq': {'$lt': seq}}
+                ]
+            
+            cursor = self.collections['audit_log'].find(query, {'_id': 0}).sort(
+                [('ts', DESCENDING), ('chain', DESCENDING), ('seq', DESCENDING)]
+            ).limit(limit)
+            return await cursor.to_list(length=limit)
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to get audit records: {str(e)}")
+            return []
+    
+    async def get_audit_chain(self, chain: str, after_seq: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Records of one audit chain in sequence order"""
+        if not self.is_connected:
+            return []
+        
+        try:
+            cursor = self.collections['audit_log'].find(
+                {'chain': chain, 'seq': {'$gt': after_seq}}, {'_id': 0}
+            ).sort('seq', ASCENDING).limit(limit)
+            return await cursor.to_list(length=limit)
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to get audit chain: {str(e)}")
+            return []
     
     async def store_healing_log(self, healing_data: Dict[str, Any]):
         """Store healing attempt log"""
@@ -175,6 +491,52 @@ class DatabaseManager:
             logger.error(f"❌ Failed to get recent telemetry: {str(e)}")
             return []
     
+    def telemetry_query(self, minutes: Optional[int] = None) -> Dict[str, Any]:
+        """Query for telemetry stored in the last N minutes (all when None)"""
+        if not minutes:
+            return {}
+        return {'stored_at': {'$gte': datetime.now() - timedelta(minutes=minutes)}}
+    
+    async def count_telemetry(self, minutes: Optional[int] = None) -> int:
+        """Count stored telemetry events"""
+        if not self.is_connected:
+            return 0
+        return await self.collections['telemetry'].count_documents(self.telemetry_query(minutes))
+    
+    async def iter_telemetry(
+        self,
+        minutes: Optional[int] = None,
+        limit: Optional[int] = None,
+        chunk_size: int = 5000,
+        projection: Optional[Dict[str, Any]] = None,
+        newest_first: bool = True
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Stream stored telemetry in chunks, newest first (or in natural
+        order, which needs no sort, for full-history scans)
+        Never holds more than one chunk of documents in memory
+        """
+        if not self.is_connected:
+            raise RuntimeError("MongoDB is not connected")
+        
+        cursor = self.collections['telemetry'].find(
+            self.telemetry_query(minutes), projection
+        ).batch_size(chunk_size)
+        if newest_first:
+            cursor = cursor.sort('stored_at', -1)
+        if limit:
+            cursor = cursor.limit(limit)
+        
+        chunk = []
+        async for doc in cursor:
+            chunk.append(doc)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        
+        if chunk:
+            yield chunk
+    
     async def get_recent_logs(self, minutes: int = 5, level: str = None) -> List[Dict[str, Any]]:
         """Get recent log events"""
         if not self.is_connected:
@@ -0,0 +1,227 @@
+"""
+Stream Bus
+Redis Streams transport between the ingestion API and the processing workers
+"""
+
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+import json
+import os
+
+from redis.exceptions import ResponseError
+
+logger = logging.getLogger(__name__)
+
+
+class StreamBus:
+    """
+    Append-only ingestion bus backed by Redis Streams
+
+    Each ingest kind (telemetry, web3, log) has its own stream. The API
+    appends whole batches as single entries; workers read them through a
+    consumer group, acknowledge processed entries and reclaim entries left
+    pending by consumers that died.
+    """
+
+    KINDS = ('telemetry', 'web3', 'log')
+
+    def __init__(self, redis_manager):
+        self.redis = redis_manager
+
+        # Stream configuration
+        self.prefix = os.getenv('AEGIS_STREAM_PREFIX', 'aegis:ingest')
+        self.group = os.getenv('AEGIS_STREAM_GROUP', 'aegis-workers')
+        self.maxlen = int(os.getenv('AEGIS_STREAM_MAXLEN', 100000))
+
+        # Where the next XAUTOCLAIM scan resumes, per stream
+        self.reclaim_cursors: Dict[str, str] = {}
+
+        self.stats = {
+            'published_batches': 0,
+            'published_events': 0,
+            'acked': 0,
+            'reclaimed': 0,
+            'dead_lettered': 0
+        }
+
+    @property
+    def client(self):
+        return self.redis.client
+
+    @property
+    def is_connected(self) -> bool:
+        return self.redis.is_connected
+
+    def stream_key(self, kind: str) -> str:
+        """Stream name for an ingest kind"""
+        return f"{self.prefix}:{kind}"
+
+    def dead_letter_key(self, kind: str) -> str:
+        """Dead-letter stream name for an ingest kind"""
+        return f"{self.prefix}:{kind}:dead"
+
+    def kind_of(self, stream: str) -> str:
+        """Ingest kind for a stream name"""
+        return stream.rsplit(':', 1)[-1]
+
+    async def publish(self, kind: str, payloads: List[Dict[str, Any]]) -> str:
+        """
+        Append a batch of events to the stream of the given kind
+        Raises if Redis is unavailable so the caller can reject the request
+        """
+        if not self.is_connected:
+            raise ConnectionError("Redis not connected, cannot publish to stream")
+
+        entry_id = await self.client.xadd(
+            self.stream_key(kind),
+            {
+                'kind': kind,
+                'count': len(payloads),
+                'payload': json.dumps(payloads, default=str)
+            },
+            maxlen=self.maxlen,
+            approximate=True
+        )
+
+        self.stats['published_batches'] += 1
+        self.stats['published_events'] += len(payloads)
+
+        return entry_id
+
+    async def ensure_groups(self):
+        """Create the consumer group on every stream (idempotent)"""
+        for kind in self.KINDS:
+            try:
+                # Start from the beginning so batches published before the
+                # first worker came up are not skipped
+                await self.client.xgroup_create(
+                    self.stream_key(kind), self.group, id='0', mkstream=True
+                )
+                logger.info(f"✅ Created consumer group {self.group} on {self.stream_key(kind)}")
+            except ResponseError as e:
+                if 'BUSYGROUP' not in str(e):
+                    raise
+
+    def decode_entry(self, fields: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Decode the event payloads of a stream entry"""
+        return json.loads(fields['payload'])
+
+    async def read(
+        self,
+        consumer: str,
+        count: int = 10,
+        block_ms: int = 5000
+    ) -> List[Tuple[str, str, Dict[str, str]]]:
+        """
+        Read new entries for a consumer from all ingest streams
+        Returns a list of (kind, entry_id, fields)
+        """
+        response = await self.client.xreadgroup(
+            self.group,
+            consumer,
+            {self.stream_key(kind): '>' for kind in self.KINDS},
+            count=count,
+            block=block_ms
+        )
+
+        entries = []
+        for stream, messages in response or []:
+            kind = self.kind_of(stream)
+            for entry_id, fields in messages:
+                entries.append((kind, entry_id, fields))
+
+        return entries
+
+    async def ack(self, kind: str, entry_ids: List[str]):
+        """Acknowledge processed entries"""
+        if not entry_ids:
+            return
+
+        await self.client.xack(self.stream_key(kind), self.group, *entry_ids)
+        self.stats['acked'] += len(entry_ids)
+
+    async def reclaim(
+        self,
+        kind: str,
+        consumer: str,
+        min_idle_ms: int,
+        count: int = 10
+    ) -> List[Tuple[str, Dict[str, str], int]]:
+        """
+        Take over entries pending longer than min_idle_ms on other consumers
+        Each call scans the pending list from where the previous one stopped,
+        starting over once Redis reports the end of the list
+        Returns a list of (entry_id, fields, times_delivered)
+        """
+        response = await self.client.xautoclaim(
+            self.stream_key(kind),
+            self.group,
+            consumer,
+            min_idle_ms,
+            start_id=self.reclaim_cursors.get(kind, '0-0'),
+            count=count
+        )
+        self.reclaim_cursors[kind] = response[0]
+        claimed = [(entry_id, fields) for entry_id, fields in response[1] if fields]
+
+        if not claimed:
+            return []
+
+        # Delivery counts drive the dead-letter decision
+        pending = await self.client.xpending_range(
+            self.stream_key(kind),
+            self.group,
+            min=claimed[0][0],
+            max=claimed[-1][0],
+            count=len(claimed) * 2
+        )
+        deliveries = {p['message_id']: p['times_delivered'] for p in pending}
+
+        self.stats['reclaimed'] += len(claimed)
+
+        return [
+            (entry_id, fields, deliveries.get(entry_id, 1))
+            for entry_id, fields in claimed
+        ]
+
+    async def dead_letter(self, kind: str, entry_id: str, fields: Dict[str, str], reason: str):
+        """Move a poisoned entry to the dead-letter stream and acknowledge it"""
+        await self.client.xadd(
+            self.dead_letter_key(kind),
+            {**fields, 'source_id': entry_id, 'reason': reason},
+            maxlen=self.maxlen,
+            approximate=True
+        )
+        await self.ack(kind, [entry_id])
+        self.stats['dead_lettered'] += 1
+        logger.error(f"☠️  Dead-lettered {kind} entry {entry_id}: {reason}")
+
+    async def get_backlog(self) -> Dict[str, Any]:
+        """Pending and lag information per stream"""
+        backlog = {}
+
+        if not self.is_connected:
+            return backlog
+
+        for kind in self.KINDS:
+            try:
+                groups = await self.client.xinfo_groups(self.stream_key(kind))
+                group = next((g for g in groups if g['name'] == self.group), None)
+                backlog[kind] = {
+                    'length': await self.client.xlen(self.stream_key(kind)),
+                    'pending': group['pending'] if group else 0,
+                    'consumers': group['consumers'] if group else 0,
+                    'lag': group.get('lag') if group else None
+                }
+            except ResponseError:
+                backlog[kind] = {'length': 0, 'pending': 0, 'consumers': 0, 'lag': None}
+
+        return backlog
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get stream bus statistics"""
+        return {
+            'prefix': self.prefix,
+            'group': self.group,
+            **self.stats
+        }
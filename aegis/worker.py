@@ -0,0 +1,57 @@
+"""
+BeZhas Aegis - Stream Processing Worker
+Consumes ingestion batches from Redis Streams and runs scoring, storage and healing.
+Run alongside an API started with AEGIS_INGEST_MODE=stream; scale each tier independently.
+"""
+
+import asyncio
+import logging
+import signal
+
+import main
+from main import TelemetryEvent, Web3Event, LogEvent
+from core.stream_worker import StreamWorker
+
+logger = logging.getLogger("aegis.worker")
+
+
+async def run_worker():
+    """Start the processing services and consume the ingestion streams until stopped"""
+    logger.info("🚀 Starting Aegis stream worker...")
+
+    main.PROCESS_ROLE = 'worker'  # Learns the UX optimizer and publishes its checkpoints
+    await main.start_services()
+    await main.connect_stream_bus()
+
+    worker = StreamWorker(
+        main.stream_bus,
+        handlers={
+            'telemetry': lambda payloads: main.process_telemetry_batch(
+                [TelemetryEvent(**p) for p in payloads], raise_errors=True
+            ),
+            'web3': lambda payloads: main.process_web3_batch(
+                [Web3Event(**p) for p in payloads], raise_errors=True
+            ),
+            'log': lambda payloads: main.process_log_batch(
+                [LogEvent(**p) for p in payloads], raise_errors=True
+            ),
+        }
+    )
+    await worker.start()
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    logger.info("🎉 Aegis stream worker ready!")
+    await stop_event.wait()
+
+    logger.info("🛑 Shutting down Aegis stream worker...")
+    await worker.stop()
+    await main.stop_services()
+    logger.info("✅ Aegis stream worker stopped cleanly")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())